@@ -5,7 +5,6 @@ from base64 import b64decode, b64encode
 from binascii import hexlify, unhexlify
 from hashlib import sha1
 
-from twisted.internet import reactor
 from twisted.internet.task import deferLater
 from twisted.web import http
 from twisted.web.server import NOT_DONE_YET
@@ -52,7 +51,7 @@ class DHTBlockEndpoint(BaseEndpoint, BlockListener):
         """
         # Check if the block is not null, and if it belongs to this peer
         if block and block.public_key == self.trustchain.my_peer.public_key.key_to_bin():
-            deferLater(reactor, 0, self.publish_latest_block, block)
+            deferLater(self.dht._reactor, 0, self.publish_latest_block, block)
 
     def should_sign(self, block):
         pass
@@ -147,7 +146,7 @@ class DHTBlockEndpoint(BaseEndpoint, BlockListener):
 
             # On the off chance that the block is actually empty, avoid publishing it
             if total_chunks > 0:
-                deferLater(reactor, 0, publish_chunk, None, 0, 0)
+                deferLater(self.dht._reactor, 0, publish_chunk, None, 0, 0)
 
     def render_GET(self, request):
         """
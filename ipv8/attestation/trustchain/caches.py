@@ -4,7 +4,6 @@ from binascii import hexlify
 from functools import reduce
 import logging
 
-from twisted.internet import reactor
 from twisted.internet.defer import Deferred
 from twisted.python.failure import Failure
 
@@ -141,14 +140,14 @@ class CrawlRequestCache(NumberCache):
 
         if self.total_half_blocks_expected == 0:
             self.community.request_cache.pop(u"crawl", self.number)
-            reactor.callFromThread(self.crawl_deferred.callback, [])
+            self.community._reactor.callFromThread(self.crawl_deferred.callback, [])
         elif len(self.received_half_blocks) >= self.total_half_blocks_expected:
             self.community.request_cache.pop(u"crawl", self.number)
-            reactor.callFromThread(self.crawl_deferred.callback, self.received_half_blocks)
+            self.community._reactor.callFromThread(self.crawl_deferred.callback, self.received_half_blocks)
 
     def received_empty_response(self):
         self.community.request_cache.pop(u"crawl", self.number)
-        reactor.callFromThread(self.crawl_deferred.callback, self.received_half_blocks)
+        self.community._reactor.callFromThread(self.crawl_deferred.callback, self.received_half_blocks)
 
     def on_timeout(self):
         self._logger.info("Timeout for crawl with id %d", self.number)
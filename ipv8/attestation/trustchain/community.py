@@ -12,7 +12,6 @@ import struct
 from functools import wraps
 from threading import RLock
 
-from twisted.internet import reactor
 from twisted.internet.defer import Deferred, succeed, fail
 from twisted.internet.task import LoopingCall
 
@@ -21,7 +20,8 @@ from .block import TrustChainBlock, ValidationResult, EMPTY_PK, GENESIS_SEQ, UNK
 from .caches import CrawlRequestCache, HalfBlockSignCache, IntroCrawlTimeout, ChainCrawlCache
 from .database import TrustChainDB
 from ...community import Community
-from ...lazy_community import lazy_wrapper, lazy_wrapper_unsigned, lazy_wrapper_unsigned_wd
+from ...lazy_community import (lazy_wrapper, lazy_wrapper_unsigned, lazy_wrapper_unsigned_batch,
+                               lazy_wrapper_unsigned_wd)
 from ...messaging.payload_headers import BinMemberAuthenticationPayload, GlobalTimeDistributionPayload
 from .payload import *
 from ...peer import Peer
@@ -72,12 +72,12 @@ class TrustChainCommunity(Community):
         self.decode_map.update({
             chr(1): self.received_half_block,
             chr(2): self.received_crawl_request,
-            chr(3): self.received_crawl_response,
             chr(4): self.received_half_block_pair,
             chr(5): self.received_half_block_broadcast,
             chr(6): self.received_half_block_pair_broadcast,
             chr(7): self.received_empty_crawl_response,
         })
+        self.add_batch_message_handler(3, self.received_crawl_responses)
 
     def do_db_cleanup(self):
         """
@@ -330,13 +330,40 @@ class TrustChainCommunity(Community):
         if block1.block_id not in self.relayed_broadcasts and payload.ttl > 0:
             self.send_block_pair(block1, block2, ttl=payload.ttl - 1)
 
+    def verify_block_signatures(self, blocks):
+        """
+        Verify the signatures of multiple blocks, only once for signatures that occur multiple times.
+
+        The valid signatures are remembered by our signature cache, so validating these blocks afterwards does not
+        verify their signatures again.
+
+        :param blocks: the blocks to verify the signatures of
+        :return: for each block, whether its signature is valid
+        :rtype: [bool]
+        """
+        items = []
+        for block in blocks:
+            try:
+                items.append((self.signature_cache.key_from_public_bin(block.public_key), block.pack(signature=False),
+                              block.signature))
+            except Exception:
+                items.append(None)
+        validity = iter(self.signature_cache.verify_signatures([item for item in items if item is not None]))
+        return [next(validity) if item is not None else False for item in items]
+
     def validate_persist_block(self, block):
         """
         Validate a block and if it's valid, persist it. Return the validation result.
         :param block: The block to validate and persist.
         :return: [ValidationResult]
         """
-        validation = block.validate(self.persistence)
+        # Validate with our signature cache, without keeping the cache in the block
+        crypto = block.crypto
+        block.crypto = self.signature_cache
+        try:
+            validation = block.validate(self.persistence)
+        finally:
+            block.crypto = crypto
         if validation[0] == ValidationResult.invalid:
             pass
         elif not self.persistence.contains(block):
@@ -375,8 +402,8 @@ class TrustChainCommunity(Community):
         if self.request_cache.has(u'sign', link_block_id_int):
             cache = self.request_cache.pop(u'sign', link_block_id_int)
 
-            # We cannot guarantee that we're on a reactor thread so make sure we do this Twisted stuff on the reactor.
-            reactor.callFromThread(cache.sign_deferred.callback, (blk, self.persistence.get_linked(blk)))
+            # We cannot guarantee that we're on the scheduler thread, so make sure we do this Twisted stuff there.
+            self._reactor.callFromThread(cache.sign_deferred.callback, (blk, self.persistence.get_linked(blk)))
 
         # Is this a request, addressed to us, and have we not signed it already?
         if (blk.link_sequence_number != UNKNOWN_SEQ
@@ -417,7 +444,7 @@ class TrustChainCommunity(Community):
         """
         cache = ChainCrawlCache(self, peer, known_chain_length=latest_block_num)
         self.request_cache.add(cache)
-        reactor.callFromThread(self.send_next_partial_chain_crawl_request, cache)
+        self._reactor.callFromThread(self.send_next_partial_chain_crawl_request, cache)
 
     def crawl_lowest_unknown(self, peer, latest_block_num=None):
         """
@@ -594,14 +621,30 @@ class TrustChainCommunity(Community):
         self.endpoint.send(peer.address, packet)
 
     @synchronized
-    @lazy_wrapper_unsigned_wd(GlobalTimeDistributionPayload, CrawlResponsePayload)
-    def received_crawl_response(self, source_address, dist, payload, data):
-        self.received_half_block(source_address, data[:-12])  # We cut off a few bytes to make it a BlockPayload
-
-        block = self.get_block_class(payload.type).from_payload(payload, self.serializer)
-        cache = self.request_cache.get(u"crawl", payload.crawl_id)
-        if cache:
-            cache.received_block(block, payload.total_count)
+    @lazy_wrapper_unsigned_batch(GlobalTimeDistributionPayload, CrawlResponsePayload)
+    def received_crawl_responses(self, messages):
+        """
+        We've received one or more crawl responses, the signatures of their blocks are verified at once.
+
+        A malformed crawl response is dropped without affecting the other responses in the batch.
+        """
+        received = []
+        for source_address, _, payload in messages:
+            try:
+                received.append((source_address, payload,
+                                  self.get_block_class(payload.type).from_payload(payload, self.serializer)))
+            except Exception:
+                self.logger.warning("Dropping malformed crawl response from %s", str(source_address), exc_info=True)
+        self.verify_block_signatures([block for _, _, block in received])
+
+        for source_address, payload, block in received:
+            try:
+                self.process_half_block(block, Peer(payload.public_key, source_address)).addErrback(lambda _: None)
+                cache = self.request_cache.get(u"crawl", payload.crawl_id)
+                if cache:
+                    cache.received_block(block, payload.total_count)
+            except Exception:
+                self.logger.warning("Failed to process crawl response from %s", str(source_address), exc_info=True)
 
     @lazy_wrapper_unsigned_wd(GlobalTimeDistributionPayload, EmptyCrawlResponsePayload)
     def received_empty_crawl_response(self, source_address, dist, payload, data):
@@ -220,12 +220,13 @@ class AttestationCommunity(Community):
     def send_attestation(self, socket_address, blob):
         # If we want to serve this request send the attestation in chunks of 800 bytes
         sequence_number = 0
+        blob_hash = sha1(blob).digest()
+        auth = BinMemberAuthenticationPayload(self.my_peer.public_key.key_to_bin()).to_pack_list()
         for i in range(0, len(blob), 800):
             blob_chunk = blob[i:i + 800]
 
             global_time = self.claim_global_time()
-            auth = BinMemberAuthenticationPayload(self.my_peer.public_key.key_to_bin()).to_pack_list()
-            payload = AttestationChunkPayload(sha1(blob).digest(), sequence_number, blob_chunk).to_pack_list()
+            payload = AttestationChunkPayload(blob_hash, sequence_number, blob_chunk).to_pack_list()
             dist = GlobalTimeDistributionPayload(global_time).to_pack_list()
             packet = self._ez_pack(self._prefix, 2, [auth, dist, payload])
             self.endpoint.send(socket_address, packet)
@@ -14,13 +14,16 @@ from binascii import hexlify
 from random import choice, random
 from socket import error, gethostbyname
 from time import time
+from timeit import default_timer
 from traceback import format_exception
 
 from .lazy_community import EZPackOverlay, lazy_wrapper, lazy_wrapper_unsigned
 from .messaging.anonymization.endpoint import TunnelEndpoint
+from .messaging.interfaces.fragmentation import FRAGMENT_MSG_ID, Fragmenter
 from .messaging.payload import (IntroductionRequestPayload, IntroductionResponsePayload, PuncturePayload,
                                 PunctureRequestPayload)
 from .messaging.payload_headers import BinMemberAuthenticationPayload, GlobalTimeDistributionPayload
+from .util import cast_to_bin
 
 
 _DEFAULT_ADDRESSES = [
@@ -74,6 +77,7 @@ class Community(EZPackOverlay):
 
         self._prefix = b'\x00' + self.version + self.master_peer.mid
         self.logger.debug("Launching %s with prefix %s.", self.__class__.__name__, hexlify(self._prefix))
+        self.endpoint.add_prefix_listener(self, self._prefix)
 
         self.max_peers = max_peers
         self.anonymize = anonymize
@@ -115,6 +119,14 @@ class Community(EZPackOverlay):
             chr(235): self.on_deprecated_message
         }
 
+        self.batch_decode_map = {}
+        # Sends messages which are too large for a single datagram, see send_fragmented
+        self.fragmenter = Fragmenter(self.endpoint, self._prefix + cast_to_bin(chr(FRAGMENT_MSG_ID)),
+                                     self.on_reassembled)
+        self.decode_map[chr(FRAGMENT_MSG_ID)] = self.on_fragment
+        # The endpoint which measures the latency of the handlers, if any (it may be wrapped, e.g. by a TunnelEndpoint)
+        self._statistics_endpoint = self.endpoint if getattr(self.endpoint, 'add_handler_latency', None) else None
+
         self.deprecated_message_names = {
             chr(255): "reserved-255",
             chr(254): "on-missing-sequence",
@@ -156,6 +168,48 @@ class Community(EZPackOverlay):
                                (msg_num, self.decode_map[chr(msg_num)]))
         self.decode_map[chr(msg_num)] = callback
 
+    def add_batch_message_handler(self, msg_num, callback):
+        """
+        Add a handler for a message identifier, which accepts consecutive messages with this identifier in one call.
+
+        The callback is called with a list of (source address, data) tuples: the messages with this identifier which
+        were received in a batch without other messages in between. Messages that are not received in a batch (through
+        on_packet) are delivered to the callback as a batch of one.
+
+        :param msg_num: the message id to listen for
+        :type msg_num: int
+        :param callback: the callback function for this message id
+        :type callback: function
+        :returns: None
+        """
+        self.add_message_handler(msg_num, lambda source_address, data: callback([(source_address, data)]))
+        self.batch_decode_map[chr(msg_num)] = callback
+
+    def send_fragmented(self, address, packet):
+        """
+        Send a packet of any size, up to MAX_MESSAGE_SIZE, in fragments which are acknowledged and retransmitted.
+
+        The other side reassembles the packet and handles it like any other packet.
+
+        :param address: the address to send the packet to
+        :param packet: the packet, as created by ezr_pack
+        :return: a Deferred that fires with True once the packet is delivered, or False if the peer is not reachable
+        """
+        return self.fragmenter.send(address, packet)
+
+    def on_fragment(self, source_address, data):
+        self.fragmenter.on_fragment(source_address, data)
+
+    def on_reassembled(self, source_address, packet):
+        if packet[22:23] == cast_to_bin(chr(FRAGMENT_MSG_ID)):
+            self.logger.warning("Received nested fragment from (%s, %d)", *source_address)
+            return
+        self.on_packet((source_address, packet))
+
+    def unload(self):
+        self.fragmenter.shutdown_task_manager()
+        super(Community, self).unload()
+
     def on_deprecated_message(self, source_address, data):
         self.logger.warning("Received deprecated message: %s from (%s, %d)",
                             self.deprecated_message_names[data[22]], *source_address)
@@ -319,14 +373,71 @@ class Community(EZPackOverlay):
             return
         msg_id = chr(ord(data[22:23]))
         if msg_id in self.decode_map:
-            try:
-                self.decode_map[msg_id](source_address, data)
-            except:
-                self.logger.error("Exception occurred while handling packet!\n"
-                                  + ''.join(format_exception(*sys.exc_info())))
+            self._call_message_handler(msg_id, 1, self.decode_map[msg_id], source_address, data)
         elif warn_unknown:
             self.logger.warning("Received unknown message: %d from (%s, %d)", ord(msg_id), *source_address)
 
+    def on_packets(self, packets, warn_unknown=True):
+        """
+        Callback for when multiple packets are received on this endpoint at once.
+
+        Verified peers are looked up once per source address and the packets are handled in the order of arrival.
+        Handlers added through add_batch_message_handler receive every run of consecutive packets with their message
+        identifier in a single call, other handlers are called once per packet.
+
+        :param packets: the received packets, in (source, binary string) format.
+        """
+        now = time()
+        seen_addresses = set()
+        # The (message identifier, packets) of every run of consecutive packets with the same message identifier
+        runs = []
+        for packet in packets:
+            source_address, data = packet
+            if source_address not in seen_addresses:
+                seen_addresses.add(source_address)
+                probable_peer = self.network.get_verified_by_address(source_address)
+                if probable_peer:
+                    probable_peer.last_response = now
+            if self._prefix != data[:22]:
+                continue
+            msg_id = chr(ord(data[22:23]))
+            if runs and runs[-1][0] == msg_id:
+                runs[-1][1].append(packet)
+            else:
+                runs.append((msg_id, [packet]))
+
+        for msg_id, run in runs:
+            if msg_id in self.batch_decode_map:
+                self._call_message_handler(msg_id, len(run), self.batch_decode_map[msg_id], run)
+            elif msg_id in self.decode_map:
+                for source_address, data in run:
+                    self._call_message_handler(msg_id, 1, self.decode_map[msg_id], source_address, data)
+            elif warn_unknown:
+                for source_address, _ in run:
+                    self.logger.warning("Received unknown message: %d from (%s, %d)", ord(msg_id), *source_address)
+
+    def _call_message_handler(self, msg_id, num_packets, handler, *args):
+        """
+        Call the handler of a message, measuring its latency if statistics are enabled for this community.
+
+        :param msg_id: the message identifier, as a character
+        :param num_packets: the number of packets the handler is called with
+        """
+        statistics_endpoint = self._statistics_endpoint
+        if statistics_endpoint is None or not statistics_endpoint.is_enabled(self._prefix):
+            self._call_handler(handler, *args)
+            return
+        start = default_timer()
+        self._call_handler(handler, *args)
+        statistics_endpoint.add_handler_latency(self._prefix, ord(msg_id), default_timer() - start, num_packets)
+
+    def _call_handler(self, handler, *args):
+        try:
+            handler(*args)
+        except:
+            self.logger.error("Exception occurred while handling packet!\n"
+                              + ''.join(format_exception(*sys.exc_info())))
+
     def walk_to(self, address):
         packet = self.create_introduction_request(address)
         self.endpoint.send(address, packet)
@@ -16,6 +16,11 @@ default = {
         'level': "INFO"
     },
     'walker_interval': 0.5,
+    'address_book_size': 100000,
+    'network_snapshot': {
+        'file': None,
+        'interval': 60.0
+    },
     'overlays': [
         {
             'class': 'DiscoveryCommunity',
@@ -119,7 +119,7 @@ class ECCrypto(object):
         Returns the signature of DIGEST made using EC.
         """
         assert isinstance(ec, Key), ec
-        assert isinstance(data, (bytes, str)), type(data)
+        assert isinstance(data, (bytes, str, bytearray, memoryview)), type(data)
         return ec.signature(data)
 
     def is_valid_signature(self, ec, data, signature):
@@ -135,6 +135,19 @@ class ECCrypto(object):
         except:
             return False
 
+    def verify_signatures(self, items):
+        """
+        Returns, for each (EC, DIGEST, SIGNATURE) tuple, whether SIGNATURE matches the DIGEST made using EC.
+
+        This is a convenience loop over is_valid_signature, it is not faster than verifying the signatures one by one:
+        neither libsodium nor OpenSSL offer batch verification. Implementations with state (see SignatureCache) use it
+        to skip signatures they already verified.
+
+        @param items: the list of (EC, DIGEST, SIGNATURE) tuples to verify
+        @rtype: [bool]
+        """
+        return [bool(self.is_valid_signature(ec, data, signature)) for ec, data, signature in items]
+
 
 # ECCrypto should be stateless.
 # Therefore we can expose a global singleton for efficiency.
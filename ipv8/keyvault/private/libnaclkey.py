@@ -44,6 +44,9 @@ class LibNaCLSK(PrivateKey, LibNaCLPK):
         :param msg: the message to sign
         :return: the signature for the message
         """
+        if not isinstance(msg, bytes):
+            # libnacl only accepts bytes, not other buffers
+            msg = memoryview(msg).tobytes()
         return self.key.signature(msg)
 
     def key_to_bin(self):
@@ -39,7 +39,7 @@ class LibNaCLPK(PublicKey):
         :param signature: the given signature
         :param msg: the given message
         """
-        return self.veri.verify(signature + msg)
+        return libnacl.crypto_sign_verify_detached(signature, msg, self.veri.vk)
 
     def key_to_bin(self):
         """
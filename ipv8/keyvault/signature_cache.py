@@ -0,0 +1,169 @@
+from __future__ import absolute_import
+
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+
+DEFAULT_KEY_CACHE_SIZE = 1024
+DEFAULT_SIGNATURE_CACHE_SIZE = 4096
+
+
+class SignatureCache(object):
+    """
+    Remembers recently parsed public keys and recently verified signatures.
+
+    Public keys are cached by their binary format. Valid signatures are cached by (key, digest of data, signature):
+    seeing the same signed data twice (e.g. a retransmission) then only costs a hash instead of a verification.
+    Both caches are bounded and evict the least recently used entries first.
+
+    This object offers the public key and signature verification methods of ECCrypto, so it can take its place
+    wherever signatures are checked.
+    """
+
+    def __init__(self, crypto, key_cache_size=DEFAULT_KEY_CACHE_SIZE,
+                 signature_cache_size=DEFAULT_SIGNATURE_CACHE_SIZE):
+        """
+        Create a new cache.
+
+        :param crypto: the ECCrypto instance to parse keys and verify signatures with on a cache miss
+        :param key_cache_size: the maximum number of public keys to remember, 0 to disable
+        :param signature_cache_size: the maximum number of valid signatures to remember, 0 to disable
+        """
+        self.crypto = crypto
+        self.key_cache_size = key_cache_size
+        self.signature_cache_size = signature_cache_size
+
+        self.key_hits = 0
+        self.key_misses = 0
+        self.signature_hits = 0
+        self.signature_misses = 0
+
+        self._keys = OrderedDict()
+        self._signatures = OrderedDict()
+        self._lock = Lock()
+
+    def _lookup(self, cache, entry):
+        """
+        Get a value from a cache and mark it as recently used, the caller should hold the lock.
+
+        :return: the cached value or None
+        """
+        value = cache.pop(entry, None)
+        if value is not None:
+            cache[entry] = value
+        return value
+
+    def _store(self, cache, entry, value, size):
+        """
+        Add a value to a cache, evicting the least recently used value if the cache is full.
+        """
+        if size <= 0:
+            return
+        with self._lock:
+            cache[entry] = value
+            while len(cache) > size:
+                cache.popitem(last=False)
+
+    def key_from_public_bin(self, string):
+        """
+        Get the key from a public key in binary format.
+        """
+        with self._lock:
+            key = self._lookup(self._keys, string)
+            if key is not None:
+                self.key_hits += 1
+                return key
+            self.key_misses += 1
+        key = self.crypto.key_from_public_bin(string)
+        self._store(self._keys, string, key, self.key_cache_size)
+        return key
+
+    def is_valid_public_bin(self, string):
+        """
+        Returns True if the input is a valid public key.
+        """
+        try:
+            self.key_from_public_bin(string)
+        except:
+            return False
+        return True
+
+    def get_signature_length(self, key):
+        """
+        Returns the length, in bytes, of each signature made using the key.
+        """
+        return self.crypto.get_signature_length(key)
+
+    def is_valid_signature(self, key, data, signature):
+        """
+        Returns True when the signature matches the data signed with the key.
+
+        Keys are matched by identity, so keys should be retrieved through key_from_public_bin to benefit from the cache.
+        """
+        entry = (key, sha256(data).digest(), signature)
+        with self._lock:
+            if self._lookup(self._signatures, entry):
+                self.signature_hits += 1
+                return True
+            self.signature_misses += 1
+        valid = self.crypto.is_valid_signature(key, data, signature)
+        if valid:
+            self._store(self._signatures, entry, True, self.signature_cache_size)
+        return valid
+
+    def verify_signatures(self, items):
+        """
+        Returns, for each (key, data, signature) tuple, whether the signature matches the data signed with the key.
+
+        Signatures that are cached are not verified, and signatures that occur multiple times in the list are only
+        verified once. All other signatures are verified one by one by the underlying crypto.
+
+        :param items: the list of (key, data, signature) tuples to verify
+        :rtype: [bool]
+        """
+        validity = [False] * len(items)
+        entries = [(key, sha256(data).digest(), signature) for key, data, signature in items]
+        misses = {}
+        with self._lock:
+            for index, entry in enumerate(entries):
+                if entry in misses:
+                    misses[entry].append(index)
+                elif self._lookup(self._signatures, entry):
+                    validity[index] = True
+                else:
+                    misses[entry] = [index]
+            self.signature_hits += len(items) - len(misses)
+            self.signature_misses += len(misses)
+
+        missed = list(misses.items())
+        results = self.crypto.verify_signatures([items[indices[0]] for _, indices in missed])
+        for (entry, indices), valid in zip(missed, results):
+            if valid:
+                self._store(self._signatures, entry, True, self.signature_cache_size)
+            for index in indices:
+                validity[index] = valid
+        return validity
+
+    def clear(self):
+        """
+        Forget all cached keys and signatures.
+        """
+        with self._lock:
+            self._keys.clear()
+            self._signatures.clear()
+
+    def get_statistics(self):
+        """
+        Get the cache sizes and hit/miss counters.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "keys": len(self._keys),
+                "key_hits": self.key_hits,
+                "key_misses": self.key_misses,
+                "signatures": len(self._signatures),
+                "signature_hits": self.signature_hits,
+                "signature_misses": self.signature_misses
+            }
@@ -4,6 +4,7 @@ from functools import wraps
 
 from .messaging.payload_headers import BinMemberAuthenticationPayload, GlobalTimeDistributionPayload
 from .keyvault.crypto import default_eccrypto
+from .keyvault.signature_cache import SignatureCache
 from .overlay import Overlay
 from .peer import Peer
 from .util import cast_to_bin
@@ -30,15 +31,20 @@ def lazy_wrapper(*payloads):
         @wraps(func)
         def wrapper(self, source_address, data):
             # UNPACK
-            auth, remainder = self.serializer.unpack_to_serializables([BinMemberAuthenticationPayload, ], data[23:])
+            auth, _ = self.serializer.unpack_to_serializables([BinMemberAuthenticationPayload, ], data, 23)
+            if self.verification_pool:
+                self._verify_signature_later(auth, source_address, data, payloads,
+                                             lambda peer, unpacked: func(self, peer, *unpacked))
+                return
             signature_valid, remainder = self._verify_signature(auth, data)
-            unpacked = self.serializer.ez_unpack_serializables(payloads, remainder[23:])
+            unpacked = self.serializer.ez_unpack_serializables(payloads, remainder, 23)
             # ASSERT
             if not signature_valid:
                 raise PacketDecodingError("Incoming packet %s has an invalid signature" %
                                           str([payload_class.__name__ for payload_class in payloads]))
             # PRODUCE
-            return func(self, Peer(auth.public_key_bin, source_address), *unpacked)
+            peer = Peer(self.signature_cache.key_from_public_bin(auth.public_key_bin), source_address)
+            return func(self, peer, *unpacked)
         return wrapper
     return decorator
 
@@ -65,16 +71,21 @@ def lazy_wrapper_wd(*payloads):
         @wraps(func)
         def wrapper(self, source_address, data):
             # UNPACK
-            auth, remainder = self.serializer.unpack_to_serializables([BinMemberAuthenticationPayload, ], data[23:])
+            auth, _ = self.serializer.unpack_to_serializables([BinMemberAuthenticationPayload, ], data, 23)
+            if self.verification_pool:
+                self._verify_signature_later(auth, source_address, data, payloads,
+                                             lambda peer, unpacked: func(self, peer, *(unpacked + [data])))
+                return
             signature_valid, remainder = self._verify_signature(auth, data)
-            unpacked = self.serializer.ez_unpack_serializables(payloads, remainder[23:])
+            unpacked = self.serializer.ez_unpack_serializables(payloads, remainder, 23)
             # ASSERT
             if not signature_valid:
                 raise PacketDecodingError("Incoming packet %s has an invalid signature" %
                                           str([payload_class.__name__ for payload_class in payloads]))
             # PRODUCE
             output = unpacked + [data]
-            return func(self, Peer(auth.public_key_bin, source_address), *output)
+            peer = Peer(self.signature_cache.key_from_public_bin(auth.public_key_bin), source_address)
+            return func(self, peer, *output)
         return wrapper
     return decorator
 
@@ -100,7 +111,7 @@ def lazy_wrapper_unsigned(*payloads):
         @wraps(func)
         def wrapper(self, source_address, data):
             # UNPACK
-            unpacked = self.serializer.ez_unpack_serializables(payloads, data[23:])
+            unpacked = self.serializer.ez_unpack_serializables(payloads, data, 23)
             return func(self, source_address, *unpacked)
         return wrapper
     return decorator
@@ -139,8 +150,97 @@ def lazy_wrapper_unsigned_wd(*payloads):
     return decorator
 
 
+def lazy_wrapper_batch(*payloads):
+    """
+    This function wrapper will unpack the BinMemberAuthenticationPayload of a batch of messages for you.
+
+    You can now write your authenticated and signed batch functions as follows:
+
+    ::
+
+        @lazy_wrapper_batch(GlobalTimeDistributionPayload, IntroductionRequestPayload)
+        def on_messages(messages):
+            '''
+            :type messages: [(Peer, GlobalTimeDistributionPayload, IntroductionRequestPayload)]
+            '''
+            pass
+
+    Register these functions using Community.add_batch_message_handler. Messages that cannot be unpacked or that
+    have an invalid signature are dropped from the batch.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, packets):
+            messages = self._ez_unpack_signed_batch(packets, payloads)
+            if messages:
+                return func(self, messages)
+        return wrapper
+    return decorator
+
+
+def lazy_wrapper_unsigned_batch(*payloads):
+    """
+    This function wrapper will unpack the payloads of a batch of messages for you.
+
+    You can now write your non-authenticated batch functions as follows:
+
+    ::
+
+        @lazy_wrapper_unsigned_batch(GlobalTimeDistributionPayload, IntroductionRequestPayload)
+        def on_messages(messages):
+            '''
+            :type messages: [(str, GlobalTimeDistributionPayload, IntroductionRequestPayload)]
+            '''
+            pass
+
+    Register these functions using Community.add_batch_message_handler. Messages that cannot be unpacked are
+    dropped from the batch.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, packets):
+            messages = self._ez_unpack_batch(packets, self._ez_unpack_unsigned, payloads)
+            if messages:
+                return func(self, messages)
+        return wrapper
+    return decorator
+
+
 class EZPackOverlay(Overlay):
 
+    def __init__(self, *args, **kwargs):
+        super(EZPackOverlay, self).__init__(*args, **kwargs)
+        self.signature_cache = self.get_signature_cache()
+        self.verification_pool = self.get_verification_pool()
+
+    def unload(self):
+        super(EZPackOverlay, self).unload()
+        if self.verification_pool:
+            self.verification_pool.stop()
+
+    def get_signature_cache(self):
+        """
+        Get a SignatureCache for this Overlay.
+
+        Override this to change the sizes of the public key and signature caches of this Overlay.
+        """
+        return SignatureCache(default_eccrypto)
+
+    def get_verification_pool(self):
+        """
+        Get a VerificationPool for this Overlay, or None to verify signatures on the calling thread.
+
+        When a pool is returned, the signatures of packets handled by lazy_wrapper and lazy_wrapper_wd are verified
+        on its worker threads. The handlers are then called on the reactor thread, in order of arrival per peer, and
+        their return value is no longer passed to the caller. For example:
+
+        ::
+
+            def get_verification_pool(self):
+                return VerificationPool(self.signature_cache.is_valid_signature, workers=4)
+        """
+        return None
+
     def ezr_pack(self, msg_num, *payloads, **kwargs):
         """
         The easier way to pack your messages. Supply with the message number and the Payloads you want to serialize.
@@ -162,25 +262,126 @@ class EZPackOverlay(Overlay):
             format_list_list += [payload.to_pack_list()]
         return self._ez_pack(self._prefix, msg_num, format_list_list, sig)
 
-    def _ez_pack(self, prefix, msg_num, format_list_list, sig=True):
-        packet = prefix + cast_to_bin(chr(msg_num))
-        for format_list in format_list_list:
-            packet += self.serializer.pack_multiple(format_list)[0]
+    def _ez_pack(self, prefix, msg_num, format_list_list, sig=True, key=None):
+        """
+        Pack a message into a single, preallocated, buffer.
+
+        :param prefix: the prefix of the message
+        :param msg_num: the message number of the message
+        :param format_list_list: the list of Serializer pack lists to pack after the prefix and message number
+        :param sig: whether or not to sign this message
+        :param key: the private key to sign with, defaults to our own key
+        :return: the serialized message
+        :rtype: bytes
+        """
+        key = key or self.my_peer.key
+        packet, offset = self.serializer.pack_multiple_lists(format_list_list, prefix + cast_to_bin(chr(msg_num)),
+                                                             default_eccrypto.get_signature_length(key) if sig else 0)
         if sig:
-            packet += default_eccrypto.create_signature(self.my_peer.key, packet)
-        return packet
+            packet[offset:] = default_eccrypto.create_signature(key, memoryview(packet)[:offset])
+        return bytes(packet)
+
+    def _split_signature(self, auth, data):
+        """
+        Split a signed packet into its signed data and signature.
+
+        The returned remainder is the packet without its signature, offset by the length of the authentication.
+        In memoryview mode, the remainder is a memoryview of the given data.
+
+        :param auth: the unpacked authentication of the packet
+        :type auth: BinMemberAuthenticationPayload
+        :param data: the signed packet
+        :return: the public key, the signed data, the signature and the remainder of the packet
+        """
+        public_key = self.signature_cache.key_from_public_bin(auth.public_key_bin)
+        signature_length = self.signature_cache.get_signature_length(public_key)
+        buffer = memoryview(data) if self.serializer.memoryview_mode else data
+        remainder = buffer[2 + len(auth.public_key_bin):-signature_length]
+        return public_key, data[:-signature_length], data[-signature_length:], remainder
 
     def _verify_signature(self, auth, data):
-        ec = default_eccrypto
-        public_key = ec.key_from_public_bin(auth.public_key_bin)
-        signature_length = ec.get_signature_length(public_key)
-        remainder = data[2 + len(auth.public_key_bin):-signature_length]
-        signature = data[-signature_length:]
-        return ec.is_valid_signature(public_key, data[:-signature_length], signature), remainder
+        """
+        Verify the signature of a signed packet.
+
+        :param auth: the unpacked authentication of the packet
+        :type auth: BinMemberAuthenticationPayload
+        :param data: the signed packet
+        :return: whether the signature is valid and the remainder of the packet (see _split_signature)
+        """
+        public_key, signed_data, signature, remainder = self._split_signature(auth, data)
+        return self.signature_cache.is_valid_signature(public_key, signed_data, signature), remainder
+
+    def _verify_signature_later(self, auth, source_address, data, payloads, callback):
+        """
+        Unpack a signed packet and verify its signature on the verification pool.
+
+        If the signature is valid, the callback is called on the reactor thread with the Peer and unpacked payloads.
+        The packet is dropped if the signature is invalid or if the verification pool is full.
+        """
+        public_key, signed_data, signature, remainder = self._split_signature(auth, data)
+        unpacked = self.serializer.ez_unpack_serializables(payloads, remainder, 23)
+        peer = Peer(public_key, source_address)
+
+        def on_verified(signature_valid):
+            if signature_valid:
+                callback(peer, unpacked)
+            else:
+                self.logger.warning("Incoming packet %s has an invalid signature",
+                                    str([payload_class.__name__ for payload_class in payloads]))
+
+        if not self.verification_pool.submit(peer.mid, public_key, signed_data, signature, on_verified):
+            self.logger.debug("Dropping packet from %s, the verification queue is full", peer)
+
+    def _ez_split_signed(self, payloads, source_address, data):
+        auth, _ = self.serializer.unpack_to_serializables([BinMemberAuthenticationPayload, ], data, 23)
+        public_key, signed_data, signature, remainder = self._split_signature(auth, data)
+        return Peer(public_key, source_address), (public_key, signed_data, signature), remainder
+
+    def _ez_unpack_verified(self, payloads, peer, remainder):
+        return tuple([peer] + self.serializer.ez_unpack_serializables(payloads, remainder, 23))
+
+    def _ez_unpack_unsigned(self, payloads, source_address, data):
+        return tuple([source_address] + self.serializer.ez_unpack_serializables(payloads, data, 23))
+
+    def _ez_unpack_signed_batch(self, packets, payloads):
+        """
+        Unpack a batch of signed packets, verifying their signatures through the signature cache.
+
+        :param packets: the list of (source address, data) tuples to unpack
+        :param payloads: the payload classes to unpack
+        :return: the list of unpacked messages, with valid signatures
+        """
+        split = self._ez_unpack_batch(packets, self._ez_split_signed, payloads)
+        validity = self.signature_cache.verify_signatures([signed for _, signed, _ in split])
+        verified = []
+        for (peer, _, remainder), signature_valid in zip(split, validity):
+            if signature_valid:
+                verified.append((peer, remainder))
+            else:
+                self.logger.warning("Incoming packet %s from %s has an invalid signature",
+                                    str([payload_class.__name__ for payload_class in payloads]), peer)
+        return self._ez_unpack_batch(verified, self._ez_unpack_verified, payloads)
+
+    def _ez_unpack_batch(self, packets, unpack, payloads):
+        """
+        Unpack a batch of packets, dropping the packets that fail to unpack.
+
+        :param packets: the list of (source, data) tuples to unpack
+        :param unpack: the function to unpack a single packet with, given the payloads, source and data
+        :param payloads: the payload classes to unpack
+        :return: the list of unpacked messages
+        """
+        messages = []
+        for source, data in packets:
+            try:
+                messages.append(unpack(payloads, source, data))
+            except Exception:
+                self.logger.warning("Dropping undecodable packet from %s", str(source), exc_info=True)
+        return messages
 
     def _ez_unpack_auth(self, payload_class, data):
         # UNPACK
-        auth, remainder = self.serializer.unpack_to_serializables([BinMemberAuthenticationPayload, ], data[23:])
+        auth, _ = self.serializer.unpack_to_serializables([BinMemberAuthenticationPayload, ], data, 23)
         signature_valid, remainder = self._verify_signature(auth, data)
 
         # ASSERT
@@ -189,7 +390,7 @@ class EZPackOverlay(Overlay):
 
         # UNPACK
         format = [GlobalTimeDistributionPayload, payload_class]
-        dist, payload = self.serializer.ez_unpack_serializables(format, remainder[23:])
+        dist, payload = self.serializer.ez_unpack_serializables(format, remainder, 23)
 
         # PRODUCE
         return auth, dist, payload
@@ -197,7 +398,7 @@ class EZPackOverlay(Overlay):
     def _ez_unpack_noauth(self, payload_class, data, global_time=True):
         # UNPACK
         format = [GlobalTimeDistributionPayload, payload_class] if global_time else [payload_class]
-        unpacked = self.serializer.ez_unpack_serializables(format, data[23:])
+        unpacked = self.serializer.ez_unpack_serializables(format, data, 23)
         # PRODUCE
         return unpacked if global_time else unpacked[0]
 
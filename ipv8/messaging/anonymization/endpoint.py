@@ -4,8 +4,6 @@ from __future__ import division
 import time
 from collections import deque
 
-from twisted.internet import reactor
-
 from .tunnel import CIRCUIT_STATE_CLOSING, CIRCUIT_STATE_READY
 
 
@@ -57,15 +55,15 @@ class TunnelEndpoint(object):
                 self.tunnel_community.send_data((circuit_address,), circuit_id, address, ('0.0.0.0', 0), packet)
 
     def notify_listeners(self, packet, from_tunnel=False):
-        for listener in self._listeners:
+        for listener in self._get_listeners(packet[1]):
             # Anonymized communities should ignore traffic received from the socket
             # Non-anonymized communities should ignore traffic received from the TunnelCommunity
             if getattr(listener, 'anonymize', False) != from_tunnel:
                 continue
             if listener.use_main_thread:
-                reactor.callFromThread(self._deliver_later, listener, packet)
-            elif reactor.running:
-                reactor.callInThread(self._deliver_later, listener, packet)
+                self._scheduler.callFromThread(self._deliver_later, listener, packet)
+            elif self._scheduler.running:
+                self._scheduler.callInThread(self._deliver_later, listener, packet)
 
     def __getattribute__(self, item):
         try:
@@ -1,7 +1,7 @@
 from __future__ import absolute_import
 
 import socket
-from struct import pack, unpack_from
+from struct import Struct, pack, unpack_from
 
 from cryptography.exceptions import InvalidTag
 
@@ -17,6 +17,10 @@ ADDRESS_TYPE_DOMAIN_NAME = 0x02
 
 NO_CRYPTO_PACKETS = [2, 3]
 
+# The cell header after the prefix: the cell message id (1), the circuit id and whether the message is plaintext
+CELL_HEADER = Struct('>BI?')
+CIRCUIT_ID = Struct('>I')
+
 
 def encode_address(host, port):
     if not isinstance(host, str):
@@ -163,13 +167,13 @@ class CellPayload(object):
     def unwrap(self, prefix):
         return b''.join([prefix,
                          self.message[0:1],
-                         pack('!I', self.circuit_id),
+                         CIRCUIT_ID.pack(self.circuit_id),
                          self.message[1:]])
 
     def to_bin(self, prefix):
-        return b''.join([prefix,
-                         cast_to_bin(chr(1)),
-                         pack('!I?', self.circuit_id, self.plaintext) + self.message])
+        # The (encrypted) message is replaced for every hop, so it is joined with the header as it is, instead of
+        # being packed into a preallocated buffer: for cell sized messages b''.join is faster than pack_into.
+        return b''.join([prefix, CELL_HEADER.pack(1, self.circuit_id, self.plaintext), self.message])
 
     @classmethod
     def from_bin(cls, packet):
@@ -24,6 +24,9 @@ class PexEndpointAdapter(Endpoint, EndpointListener):
     def add_listener(self, listener):
         self._listeners[listener.get_prefix()] = listener
 
+    def add_prefix_listener(self, listener, prefix):
+        self._listeners[prefix] = listener
+
     def remove_listener(self, listener):
         self._listeners.pop(listener.get_prefix(), None)
 
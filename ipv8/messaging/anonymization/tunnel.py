@@ -114,6 +114,12 @@ class Tunnel(object):
 
 
 class TunnelExitSocket(Tunnel, DatagramProtocol, TaskManager):
+    """
+    The UDP socket of an exit node, which forwards the data of a circuit to the internet and back.
+
+    Exit sockets are Twisted UDP ports and resolve hostnames with the Twisted resolver, so they only run on the Twisted
+    reactor, not on an AsyncioScheduler (see scheduler.py).
+    """
 
     def __init__(self, circuit_id, peer, overlay):
         Tunnel.__init__(self, circuit_id, peer)
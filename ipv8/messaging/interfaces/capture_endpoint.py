@@ -0,0 +1,132 @@
+"""
+Record the datagrams of an endpoint to a capture file, to replay them later.
+
+A capture file starts with CAPTURE_MAGIC and a version byte, followed by one record per datagram. Every record is a
+header (timestamp, direction, IPv4 address, port, length) followed by the datagram itself. Records are only ever
+appended, so a capture can be read while it is still being written.
+"""
+from __future__ import absolute_import
+
+import os
+import socket
+import struct
+import time
+from threading import Lock
+
+from .endpoint import EndpointListener
+
+CAPTURE_MAGIC = b"IPV8CAP"
+CAPTURE_VERSION = 1
+
+DIRECTION_IN = 0
+DIRECTION_OUT = 1
+
+RECORD_HEADER = struct.Struct(">dB4sHI")
+
+
+class CaptureWriter(object):
+    """
+    Appends datagrams to a capture file.
+    """
+
+    def __init__(self, file_path):
+        super(CaptureWriter, self).__init__()
+        self.file_path = file_path
+        self.lock = Lock()
+        self.records = 0
+        self.file = open(file_path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(CAPTURE_MAGIC + struct.pack(">B", CAPTURE_VERSION))
+
+    def write(self, timestamp, direction, address, data):
+        """
+        Append a datagram.
+
+        :param timestamp: the time at which the datagram was sent or received
+        :param direction: DIRECTION_IN or DIRECTION_OUT
+        :param address: the (IPv4 address, port) of the other side
+        :param data: the datagram
+        :return: False if the address can not be stored, True otherwise
+        """
+        try:
+            header = RECORD_HEADER.pack(timestamp, direction, socket.inet_aton(address[0]), address[1], len(data))
+        except (socket.error, struct.error, TypeError):
+            return False
+        with self.lock:
+            if self.file.closed:
+                return False
+            self.file.write(header + data)
+            self.records += 1
+        return True
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+
+
+def read_capture(file_path):
+    """
+    Read the datagrams of a capture file.
+
+    A record which was only partially written, for instance due to a crash, ends the capture.
+
+    :param file_path: the capture file to read
+    :return: a generator of (timestamp, direction, address, data) tuples
+    :raises ValueError: if the file is not a capture file
+    """
+    with open(file_path, 'rb') as f:
+        header = f.read(len(CAPTURE_MAGIC) + 1)
+        if header[:len(CAPTURE_MAGIC)] != CAPTURE_MAGIC:
+            raise ValueError("%s is not a capture file" % file_path)
+        version, = struct.unpack(">B", header[len(CAPTURE_MAGIC):])
+        if version != CAPTURE_VERSION:
+            raise ValueError("Unsupported capture version %d" % version)
+        while True:
+            record_header = f.read(RECORD_HEADER.size)
+            if len(record_header) < RECORD_HEADER.size:
+                return
+            timestamp, direction, ip, port, length = RECORD_HEADER.unpack(record_header)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield timestamp, direction, (socket.inet_ntoa(ip), port), data
+
+
+class CaptureEndpoint(EndpointListener):
+    """
+    Records all datagrams that are sent and received by an endpoint to a capture file.
+
+    Like the StatisticsEndpoint, this acts as a wrapper for the endpoint and listens to all of its packets.
+    """
+
+    def __init__(self, endpoint, file_path):
+        """
+        Start capturing the datagrams of an endpoint.
+
+        :param endpoint: the endpoint to capture
+        :param file_path: the capture file, new datagrams are appended if it exists
+        """
+        EndpointListener.__init__(self, endpoint)
+        self.endpoint = endpoint
+        self.endpoint.add_listener(self)
+        self.writer = CaptureWriter(os.path.abspath(file_path))
+
+    def __getattribute__(self, item):
+        try:
+            return object.__getattribute__(self, item)
+        except AttributeError:
+            return object.__getattribute__(self.endpoint, item)
+
+    # Endpoint methods
+    def send(self, socket_address, packet):
+        self.endpoint.send(socket_address, packet)
+        self.writer.write(time.time(), DIRECTION_OUT, socket_address, packet)
+
+    def close(self):
+        self.writer.close()
+        return self.endpoint.close()
+
+    # EndpointListener methods
+    def on_packet(self, packet):
+        source_address, data = packet
+        self.writer.write(time.time(), DIRECTION_IN, source_address, data)
@@ -2,19 +2,12 @@ from __future__ import absolute_import
 
 import abc
 import logging
-import socket
-import struct
-
-try:
-    # Especially on Android netifaces may fail.
-    # Generally, we also allow users not to have netifaces installed.
-    import netifaces
-except ImportError:
-    netifaces = None
+from collections import deque
 
 import six
 
-from twisted.internet import reactor
+from .interface_cache import get_interface_cache, get_lan_address_without_netifaces
+from ...scheduler import get_scheduler, is_in_io_thread
 
 
 class Endpoint(six.with_metaclass(abc.ABCMeta, object)):
@@ -25,6 +18,14 @@ class Endpoint(six.with_metaclass(abc.ABCMeta, object)):
     def __init__(self):
         self._logger = logging.getLogger(self.__class__.__name__)
         self._listeners = []
+        # Listeners that receive all packets and, per packet prefix, the listeners that only receive those packets
+        self._catch_all_listeners = []
+        self._prefix_listeners = {}
+        self._prefix_lengths = []
+        self._scheduler = get_scheduler()
+        self._batch_delivery = False
+        self._batch_queue = deque()
+        self._batch_scheduled = False
 
     def add_listener(self, listener):
         """
@@ -34,32 +35,177 @@ class Endpoint(six.with_metaclass(abc.ABCMeta, object)):
         """
         if not isinstance(listener, EndpointListener):
             raise IllegalEndpointListenerError(listener)
-        self._listeners.append(listener)
+        self._listeners = self._listeners + [listener]
+        self._catch_all_listeners = self._catch_all_listeners + [listener]
+
+    def add_prefix_listener(self, listener, prefix):
+        """
+        Add an EndpointListener which only receives the packets starting with the given prefix.
+
+        If the listener was already added for all packets, it will now only receive the packets with this prefix.
+
+        :raises: IllegalEndpointListenerError if the provided listener is not an EndpointListener
+        """
+        if not isinstance(listener, EndpointListener):
+            raise IllegalEndpointListenerError(listener)
+        if listener not in self._listeners:
+            self._listeners = self._listeners + [listener]
+        self._catch_all_listeners = [l for l in self._catch_all_listeners if l != listener]
+        prefix_listeners = dict(self._prefix_listeners)
+        prefix_listeners[prefix] = prefix_listeners.get(prefix, []) + [listener]
+        self._set_prefix_listeners(prefix_listeners)
 
     def remove_listener(self, listener):
         """
         Remove a listener from our listeners, if it is registered.
         """
         self._listeners = [l for l in self._listeners if l != listener]
+        self._catch_all_listeners = [l for l in self._catch_all_listeners if l != listener]
+        prefix_listeners = {}
+        for prefix, listeners in self._prefix_listeners.items():
+            listeners = [l for l in listeners if l != listener]
+            if listeners:
+                prefix_listeners[prefix] = listeners
+        self._set_prefix_listeners(prefix_listeners)
+
+    def _set_prefix_listeners(self, prefix_listeners):
+        # The lists and dicts are replaced instead of modified, so packets can be dispatched from other threads.
+        self._prefix_lengths = sorted({len(prefix) for prefix in prefix_listeners})
+        self._prefix_listeners = prefix_listeners
+
+    def _get_listeners(self, data):
+        """
+        Get the listeners that should receive a packet with the given data.
+        """
+        listeners = self._catch_all_listeners
+        for length in self._prefix_lengths:
+            prefix_listeners = self._prefix_listeners.get(data[:length])
+            if prefix_listeners:
+                listeners = listeners + prefix_listeners
+        return listeners
 
     def _deliver_later(self, listener, packet):
         """
         Ensure that the listener is still loaded when delivering the packet later.
         """
-        if reactor.running and self.is_open() and listener in self._listeners:
+        if self._scheduler.running and self.is_open() and listener in self._listeners:
             listener.on_packet(packet)
 
+    def _deliver_batch_later(self, listener, packets):
+        """
+        Ensure that the listener is still loaded when delivering the packets later.
+        """
+        if self._scheduler.running and self.is_open() and listener in self._listeners:
+            listener.on_packets(packets)
+
+    def set_batch_delivery(self, enabled):
+        """
+        Coalesce the packets received in one iteration of the scheduler into one on_packets call per listener.
+
+        :param enabled: whether to deliver packets in batches
+        """
+        self._batch_delivery = enabled
+
+    def _deliver_now(self, deliver, listener, packets):
+        """
+        Deliver packets to a listener on the current thread, without letting its errors reach the other listeners.
+        """
+        try:
+            deliver(listener, packets)
+        except Exception:
+            self._logger.exception("Exception occurred while handling packets for %s", listener)
+
+    def _notify(self, deliver, deliveries):
+        """
+        Hand packets to listeners, running deliver(listener, packets) on the right thread for each listener.
+
+        Listeners that run on the main thread are called directly if we are already on the main thread.
+
+        :param deliveries: the (listener, packets) pairs to deliver
+        """
+        in_io_thread = None
+        for listener, packets in deliveries:
+            if listener.use_main_thread:
+                if in_io_thread is None:
+                    in_io_thread = is_in_io_thread(self._scheduler)
+                if in_io_thread:
+                    self._deliver_now(deliver, listener, packets)
+                else:
+                    self._scheduler.callFromThread(deliver, listener, packets)
+            elif self._scheduler.running:
+                self._scheduler.callInThread(deliver, listener, packets)
+
+    def _notify_batch(self, packets):
+        """
+        Hand each listener the packets of a batch that are meant for it, in a single call.
+        """
+        if not self._prefix_listeners:
+            self._notify(self._deliver_batch_later, [(listener, packets) for listener in self._catch_all_listeners])
+            return
+        listener_packets = {}
+        listeners = []
+        for packet in packets:
+            for listener in self._get_listeners(packet[1]):
+                if id(listener) not in listener_packets:
+                    listener_packets[id(listener)] = []
+                    listeners.append(listener)
+                listener_packets[id(listener)].append(packet)
+        self._notify(self._deliver_batch_later,
+                     [(listener, listener_packets[id(listener)]) for listener in listeners])
+
+    def _queue_batch(self, packets):
+        """
+        Queue packets for the next batch delivery, which happens at the next iteration of the scheduler.
+        """
+        self._batch_queue.extend(packets)
+        if not self._batch_scheduled:
+            self._batch_scheduled = True
+            if is_in_io_thread(self._scheduler):
+                self._scheduler.callLater(0, self._deliver_batch)
+            else:
+                self._scheduler.callFromThread(self._deliver_batch)
+
+    def _deliver_batch(self):
+        """
+        Deliver all queued packets to the listeners, in one call per listener.
+        """
+        # Clear the flag before taking the packets: packets that are queued concurrently get a new delivery.
+        self._batch_scheduled = False
+        packets = []
+        while self._batch_queue:
+            packets.append(self._batch_queue.popleft())
+        if packets:
+            self._notify_batch(packets)
+
     def notify_listeners(self, packet):
         """
         Send data to all listeners.
 
         :param data: the data to send to all listeners.
         """
-        for listener in self._listeners:
-            if listener.use_main_thread:
-                reactor.callFromThread(self._deliver_later, listener, packet)
-            elif reactor.running:
-                reactor.callInThread(self._deliver_later, listener, packet)
+        if self._batch_delivery:
+            self._queue_batch((packet,))
+        else:
+            self._notify(self._deliver_later, [(listener, packet) for listener in self._get_listeners(packet[1])])
+
+    def notify_listeners_batch(self, packets):
+        """
+        Send multiple packets to all listeners at once.
+
+        :param packets: the list of packets to send to all listeners.
+        """
+        if self._batch_delivery:
+            self._queue_batch(packets)
+        else:
+            self._notify_batch(packets)
+
+    def is_congested(self):
+        """
+        Check if so much data is queued for sending, that bursts of traffic should be postponed.
+
+        Overlays can query this before sending many messages at once.
+        """
+        return False
 
     @abc.abstractmethod
     def assert_open(self):
@@ -101,7 +247,6 @@ class EndpointListener(six.with_metaclass(abc.ABCMeta, object)):
 
         self.endpoint = endpoint
 
-        self._netifaces_failed = netifaces is None
         self.my_estimated_lan = (self._get_lan_address(True)[0], self.endpoint._port)
         self.my_estimated_wan = self.my_estimated_lan
 
@@ -121,155 +266,37 @@ class EndpointListener(six.with_metaclass(abc.ABCMeta, object)):
         """
         pass
 
-    @staticmethod
-    def _get_interface_addresses():
-        """
-        Yields Interface instances for each available AF_INET interface found.
-
-        An Interface instance has the following properties:
-        - name          (i.e. "eth0")
-        - address       (i.e. "10.148.3.254")
-        - netmask       (i.e. "255.255.255.0")
-        - broadcast     (i.e. "10.148.3.255")
+    def on_packets(self, packets):
         """
+        Callback for when multiple packets are received on this endpoint at once.
 
-        class Interface(object):
-
-            def __init__(self, name, address, netmask, broadcast):
-                self.name = name
-                self.address = address
-                self.netmask = netmask
-                self.broadcast = broadcast
-                self._l_address, = struct.unpack_from(">L", socket.inet_aton(address))
-                self._l_netmask, = struct.unpack_from(">L", socket.inet_aton(netmask))
-
-            def __contains__(self, address):
-                assert isinstance(address, str), type(address)
-                l_address, = struct.unpack_from(">L", socket.inet_aton(address))
-                return (l_address & self._l_netmask) == (self._l_address & self._l_netmask)
-
-            def __str__(self):
-                return "<{self.__class__.__name__} \"{self.name}\" addr:{self.address} mask:{self.netmask}>".format(
-                    self=self)
+        By default, each of the packets is handled by on_packet.
 
-            def __repr__(self):
-                return "<{self.__class__.__name__} \"{self.name}\" addr:{self.address} mask:{self.netmask}>".format(
-                    self=self)
-
-        try:
-            for interface in netifaces.interfaces():
-                try:
-                    addresses = netifaces.ifaddresses(interface)
-
-                except ValueError:
-                    # some interfaces are given that are invalid, we encountered one called ppp0
-                    pass
-
-                else:
-                    for option in addresses.get(netifaces.AF_INET, []):
-                        try:
-                            # On Windows netifaces currently returns IP addresses as unicode,
-                            # and on *nix it returns str. So, we convert any unicode objects to str.
-                            # Python 3 port update: In Python 3 everything is unicode and we should do nothing.
-                            # On Python 2 the above can happen: instead of checking for unicode, we check for `not str`.
-                            unicode_to_str = lambda s: s.encode('utf-8') if s and not isinstance(s, str) else s
-                            yield Interface(interface,
-                                            unicode_to_str(option.get("addr")),
-                                            unicode_to_str(option.get("netmask")),
-                                            unicode_to_str(option.get("broadcast")))
-
-                        except TypeError:
-                            # some interfaces have no netmask configured, causing a TypeError when
-                            # trying to unpack _l_netmask
-                            pass
-        except OSError as e:
-            logger = logging.getLogger("dispersy")
-            logger.warning("failed to check network interfaces, error was: %r", e)
-
-    def _address_in_subnet(self, address, subnet):
-        """
-        Checks whether a given address is in a given subnet
-        :param address: an ip v4 address as a string formatted as four pairs of decimals separated by dots
-        :param subnet: a tuple consisting of the main address of the subnet formatted as above, and the subnet formatted as
-        an int with the number of significant bits in the address.
-        :return: True if the address is in the subnet, False otherwise
-        """
-        address = struct.unpack_from(">L", socket.inet_aton(address))[0]
-        (subnet_main, netmask) = subnet
-        subnet_main = struct.unpack_from(">L", socket.inet_aton(subnet_main))[0]
-        address >>= 32 - netmask
-        subnet_main >>= 32 - netmask
-        return address == subnet_main
-
-    def _address_is_lan_without_netifaces(self, address):
-        """
-        Checks if the given ip address is either our own address or in one of the subnet defined for local network usage
-        :param address: ip v4 address to be checked
-        :return: True if the adrress is a lan address, False otherwise
-        """
-        if address == self.get_lan_address_without_netifaces():
-            return True
-        else:
-            lan_subnets = (("192.168.0.0", 16),
-                           ("172.16.0.0", 12),
-                           ("10.0.0.0", 8))
-            return any(self._address_in_subnet(address, subnet) for subnet in lan_subnets)
+        :param packets: the received packets, in (source, binary string) format.
+        """
+        for packet in packets:
+            self.on_packet(packet)
 
     def address_is_lan(self, address):
-        if self._netifaces_failed:
-            return self._address_is_lan_without_netifaces(address)
-        else:
-            return any(address in interface for interface in self._local_interfaces)
+        return get_interface_cache().address_is_lan(address)
 
     def get_lan_address_without_netifaces(self):
         """
         # Get the local ip address by creating a socket for a (random) internet ip
         :return: the local ip address
         """
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("192.0.2.0", 80))  # TEST-NET-1, guaranteed to not be connected => no callbacks
-            local_ip = s.getsockname()[0]
-            s.close()
-            return local_ip
-        except socket.error:
-            return "0.0.0.0"
+        return get_lan_address_without_netifaces()
 
     def _get_lan_address(self, bootstrap=False):
         """
-        Attempt to get the newest lan ip of this machine, preferably with netifaces, but use the fallback if it fails
+        Get the lan ip of this machine, which is refreshed periodically by the interface cache
         :return: lan address
         """
-        if self._netifaces_failed:
-            return (self.get_lan_address_without_netifaces(), self.endpoint._port)
-        else:
-            self._local_interfaces = list(self._get_interface_addresses())
-            interface = self._guess_lan_address(self._local_interfaces)
-            return (interface.address if interface else self.get_lan_address_without_netifaces()), \
-                   (0 if bootstrap else self.endpoint._port)
-
-    def _guess_lan_address(self, interfaces, default=None):
-        """
-        Chooses the most likely Interface instance out of INTERFACES to use as our LAN address.
-
-        INTERFACES can be obtained from _get_interface_addresses()
-        DEFAULT is used when no appropriate Interface can be found
-        """
-        assert isinstance(interfaces, list), type(interfaces)
-        blacklist = ["127.0.0.1", "0.0.0.0", "255.255.255.255"]
-
-        # prefer interfaces where we have a broadcast address
-        for interface in interfaces:
-            if interface.broadcast and interface.address and interface.address not in blacklist:
-                return interface
-
-        # Exception for virtual machines/containers
-        for interface in interfaces:
-            if interface.address and interface.address not in blacklist:
-                return interface
-
-        self._netifaces_failed = True
-        return default
+        interface_cache = get_interface_cache()
+        lan_address = interface_cache.get_lan_address()
+        if interface_cache.netifaces_failed:
+            return (lan_address, self.endpoint._port)
+        return (lan_address, 0 if bootstrap else self.endpoint._port)
 
 
 class IllegalEndpointListenerError(RuntimeError):
@@ -0,0 +1,371 @@
+"""
+Reliable delivery of messages which are too large for a single datagram.
+
+A message is cut into fragments of at most FRAGMENT_SIZE bytes. The sender keeps at most WINDOW_SIZE fragments in
+flight. The receiver acknowledges the fragments it has, with the number of fragments it has received in order and a
+bitmap of the fragments it has received after those, so the sender only retransmits the fragments that were lost.
+
+Every Community has its own fragmenter, but the memory of the incomplete messages is capped for the whole process by
+a single ReassemblyBudget, so the number of loaded overlays does not multiply the memory a sender can make us reserve.
+"""
+from __future__ import absolute_import
+
+import random
+import struct
+from collections import deque
+
+from six import indexbytes
+from twisted.internet.defer import Deferred
+
+from ...taskmanager import TaskManager
+
+# The message identifier of fragments within a Community
+FRAGMENT_MSG_ID = 234
+
+FRAGMENT_DATA = 0
+FRAGMENT_ACK = 1
+
+# The number of data bytes per fragment, this keeps fragments below the minimum IPv6 MTU
+FRAGMENT_SIZE = 1200
+# The maximum number of fragments in flight per message, also the size of the acknowledgement bitmap in bits
+WINDOW_SIZE = 32
+# Acknowledge after receiving this many fragments, or after ACK_DELAY seconds
+ACK_FREQUENCY = 8
+ACK_DELAY = 0.05
+# Retransmit the unacknowledged fragments after this many seconds, and give up after MAX_RETRANSMISSIONS
+RETRANSMIT_TIMEOUT = 0.5
+MAX_RETRANSMISSIONS = 5
+# Drop incomplete messages which received no fragments for this many seconds
+REASSEMBLY_TIMEOUT = 10.0
+MAX_MESSAGE_SIZE = 2 ** 20
+DEFAULT_MAX_REASSEMBLY_BYTES = 8 * 2 ** 20
+# The number of completed messages to remember, to acknowledge retransmissions after the final acknowledgement was lost
+COMPLETED_HISTORY = 256
+
+DATA_HEADER = struct.Struct(">BIHHHI")
+ACK_HEADER = struct.Struct(">BIHI")
+
+
+class ReassemblyBudget(object):
+    """
+    The memory which may be reserved for incomplete messages, shared by fragmenters.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_REASSEMBLY_BYTES):
+        """
+        Create a new reassembly budget.
+
+        :param max_bytes: the maximum number of bytes to reserve for incomplete messages
+        """
+        super(ReassemblyBudget, self).__init__()
+        self.max_bytes = max_bytes
+        self.reserved = 0
+
+    def reserve(self, size):
+        """
+        Reserve memory for an incomplete message.
+
+        :return: whether the message fits in the budget
+        """
+        if self.reserved + size > self.max_bytes:
+            return False
+        self.reserved += size
+        return True
+
+    def release(self, size):
+        self.reserved -= size
+
+
+# The reassembly budget of all fragmenters of this process, unless they are given their own
+REASSEMBLY_BUDGET = ReassemblyBudget()
+
+
+class OutgoingMessage(object):
+    """
+    The sending side of a fragmented message.
+    """
+
+    def __init__(self, address, message_id, data):
+        super(OutgoingMessage, self).__init__()
+        self.address = address
+        self.message_id = message_id
+        self.total_length = len(data)
+        self.fragments = [data[i:i + FRAGMENT_SIZE] for i in range(0, len(data), FRAGMENT_SIZE)] or [b""]
+        self.acked = bytearray(len(self.fragments))
+        # All fragments before this one are acknowledged
+        self.first_unacked = 0
+        # All fragments from this one onwards are not yet sent
+        self.next_index = 0
+        self.retransmissions = 0
+        self.deferred = Deferred()
+
+
+class IncomingMessage(object):
+    """
+    The receiving side of a fragmented message, which is reassembled into a preallocated buffer.
+    """
+
+    def __init__(self, count, fragment_size, total_length):
+        super(IncomingMessage, self).__init__()
+        self.count = count
+        self.fragment_size = fragment_size
+        self.buffer = bytearray(total_length)
+        self.received = bytearray(count)
+        self.num_received = 0
+        # All fragments before this one are received
+        self.first_missing = 0
+        self.unacked = 0
+
+    def add(self, index, data):
+        """
+        Store a fragment.
+
+        :return: False if the fragment is a duplicate or has the wrong size, True otherwise
+        """
+        if self.received[index]:
+            return False
+        offset = index * self.fragment_size
+        expected = min(self.fragment_size, len(self.buffer) - offset)
+        if len(data) != expected:
+            return False
+        self.buffer[offset:offset + expected] = data
+        self.received[index] = 1
+        self.num_received += 1
+        self.unacked += 1
+        while self.first_missing < self.count and self.received[self.first_missing]:
+            self.first_missing += 1
+        return True
+
+    def is_complete(self):
+        return self.num_received == self.count
+
+    def get_bitmap(self):
+        """
+        Get the bitmap of the received fragments after the first missing fragment.
+        """
+        bitmap = 0
+        for bit, index in enumerate(range(self.first_missing, min(self.first_missing + WINDOW_SIZE, self.count))):
+            if self.received[index]:
+                bitmap |= 1 << bit
+        return bitmap
+
+
+class Fragmenter(TaskManager):
+    """
+    Sends large messages in fragments and reassembles the fragmented messages sent to us.
+    """
+
+    def __init__(self, endpoint, header, deliver, budget=REASSEMBLY_BUDGET):
+        """
+        Create a new fragmenter.
+
+        :param endpoint: the endpoint to send the fragments and acknowledgements over
+        :param header: the bytes to start every fragment and acknowledgement with
+        :param deliver: the function to call with the source address and data of every reassembled message
+        :param budget: the ReassemblyBudget to reserve the memory for incomplete messages from
+        """
+        super(Fragmenter, self).__init__()
+        self.endpoint = endpoint
+        self.header = header
+        self.deliver = deliver
+        self.budget = budget
+        # The number of bytes this fragmenter reserved from the budget
+        self.reassembly_bytes = 0
+        self.next_message_id = random.randint(0, 2 ** 32 - 1)
+        self.outgoing = {}
+        self.incoming = {}
+        self.completed = set()
+        self.completed_order = deque()
+
+    def send(self, address, data):
+        """
+        Send a message of any size, up to MAX_MESSAGE_SIZE.
+
+        :param address: the address to send the message to
+        :param data: the message
+        :return: a Deferred that fires with True once all fragments are acknowledged, or False if the peer is not
+                 reachable
+        """
+        if len(data) > MAX_MESSAGE_SIZE:
+            raise ValueError("Message of %d bytes exceeds the maximum of %d bytes" % (len(data), MAX_MESSAGE_SIZE))
+        message_id = self.next_message_id
+        self.next_message_id = (self.next_message_id + 1) % 2 ** 32
+        message = OutgoingMessage(address, message_id, data)
+        self.outgoing[(address, message_id)] = message
+        self._send_window(message)
+        self._schedule_retransmit(message)
+        return message.deferred
+
+    def _send_fragment(self, message, index):
+        self.endpoint.send(message.address, self.header
+                           + DATA_HEADER.pack(FRAGMENT_DATA, message.message_id, index, len(message.fragments),
+                                              FRAGMENT_SIZE, message.total_length)
+                           + message.fragments[index])
+
+    def _send_window(self, message):
+        """
+        Send the fragments which fit in the window and were not sent yet.
+        """
+        while message.next_index < len(message.fragments) \
+                and message.next_index < message.first_unacked + WINDOW_SIZE:
+            self._send_fragment(message, message.next_index)
+            message.next_index += 1
+
+    def _schedule_retransmit(self, message):
+        self.replace_task(self._task_name("retransmit", message.address, message.message_id),
+                          self._reactor.callLater(RETRANSMIT_TIMEOUT, self._retransmit, message))
+
+    def _retransmit(self, message):
+        """
+        Send the fragments in flight which were not acknowledged again, or give up.
+        """
+        if message.retransmissions == MAX_RETRANSMISSIONS:
+            self._finish(message, False)
+            return
+        message.retransmissions += 1
+        for index in range(message.first_unacked, message.next_index):
+            if not message.acked[index]:
+                self._send_fragment(message, index)
+        self._schedule_retransmit(message)
+
+    def _finish(self, message, success):
+        self.outgoing.pop((message.address, message.message_id), None)
+        self.cancel_pending_task(self._task_name("retransmit", message.address, message.message_id))
+        message.deferred.callback(success)
+
+    def on_fragment(self, source_address, data):
+        """
+        Process a fragment or acknowledgement, starting with the header of this fragmenter.
+        """
+        offset = len(self.header)
+        if len(data) <= offset:
+            return
+        fragment_type = indexbytes(data, offset)
+        if fragment_type == FRAGMENT_DATA:
+            self.on_data(source_address, data, offset)
+        elif fragment_type == FRAGMENT_ACK:
+            self.on_ack(source_address, data, offset)
+
+    def on_ack(self, source_address, data, offset):
+        if len(data) < offset + ACK_HEADER.size:
+            return
+        _, message_id, first_missing, bitmap = ACK_HEADER.unpack_from(data, offset)
+        message = self.outgoing.get((source_address, message_id))
+        if not message:
+            return
+        first_missing = min(first_missing, message.next_index)
+        for index in range(message.first_unacked, first_missing):
+            message.acked[index] = 1
+        for bit in range(WINDOW_SIZE):
+            if bitmap & (1 << bit) and first_missing + bit < message.next_index:
+                message.acked[first_missing + bit] = 1
+        progress = False
+        while message.first_unacked < len(message.fragments) and message.acked[message.first_unacked]:
+            message.first_unacked += 1
+            progress = True
+
+        if message.first_unacked == len(message.fragments):
+            self._finish(message, True)
+        elif progress:
+            message.retransmissions = 0
+            self._send_window(message)
+            self._schedule_retransmit(message)
+
+    def on_data(self, source_address, data, offset):
+        if len(data) < offset + DATA_HEADER.size:
+            return
+        _, message_id, index, count, fragment_size, total_length = DATA_HEADER.unpack_from(data, offset)
+        key = (source_address, message_id)
+        if key in self.completed:
+            self._send_ack(source_address, message_id, count, 0)
+            return
+
+        fragment = data[offset + DATA_HEADER.size:]
+        message = self.incoming.get(key)
+        if message is None:
+            if index >= count or len(fragment) != min(fragment_size, total_length - index * fragment_size) \
+                    or not self._reserve(count, fragment_size, total_length):
+                return
+            message = IncomingMessage(count, fragment_size, total_length)
+            self.incoming[key] = message
+        if count != message.count or index >= count:
+            return
+        if not message.add(index, fragment):
+            # A retransmission means our acknowledgements were lost, without a new one the sender would give up
+            self._ack(key)
+            return
+
+        if message.is_complete():
+            self._complete(key, message)
+            self.deliver(source_address, bytes(message.buffer))
+            return
+        if message.unacked >= ACK_FREQUENCY:
+            self._ack(key)
+        else:
+            self._schedule_ack(key)
+        self.replace_task(self._task_name("expire", *key),
+                          self._reactor.callLater(REASSEMBLY_TIMEOUT, self._remove, key))
+
+    def _reserve(self, count, fragment_size, total_length):
+        """
+        Check if a new message is valid and fits in the reassembly budget.
+
+        Messages which do not fit are dropped, their sender will retransmit them once older messages (possibly of
+        other fragmenters sharing the budget) are complete or have timed out.
+        """
+        if total_length > MAX_MESSAGE_SIZE or count == 0 or fragment_size == 0:
+            return False
+        if not (count - 1) * fragment_size < total_length <= count * fragment_size \
+                and not (count == 1 and total_length == 0):
+            return False
+        if not self.budget.reserve(total_length):
+            return False
+        self.reassembly_bytes += total_length
+        return True
+
+    def _schedule_ack(self, key):
+        """
+        Acknowledge after ACK_DELAY seconds, unless an acknowledgement is already scheduled.
+        """
+        name = self._task_name("ack", *key)
+        # Fragments may be delivered on multiple threads, so the check and the registration must be atomic
+        with self._task_lock:
+            if not self.is_pending_task_active(name):
+                self.register_task(name, self._reactor.callLater(ACK_DELAY, self._ack, key))
+
+    def _ack(self, key):
+        message = self.incoming.get(key)
+        if message:
+            message.unacked = 0
+            self.cancel_pending_task(self._task_name("ack", *key))
+            self._send_ack(key[0], key[1], message.first_missing, message.get_bitmap())
+
+    def _send_ack(self, address, message_id, first_missing, bitmap):
+        self.endpoint.send(address, self.header + ACK_HEADER.pack(FRAGMENT_ACK, message_id, first_missing, bitmap))
+
+    def _complete(self, key, message):
+        self._remove(key)
+        self._send_ack(key[0], key[1], message.count, 0)
+        self.completed.add(key)
+        self.completed_order.append(key)
+        if len(self.completed_order) > COMPLETED_HISTORY:
+            self.completed.discard(self.completed_order.popleft())
+
+    def _remove(self, key):
+        message = self.incoming.pop(key, None)
+        if message:
+            self.reassembly_bytes -= len(message.buffer)
+            self.budget.release(len(message.buffer))
+            self.cancel_pending_task(self._task_name("ack", *key))
+            self.cancel_pending_task(self._task_name("expire", *key))
+
+    def shutdown_task_manager(self):
+        """
+        Stop all transfers and return the memory of the incomplete messages to the budget.
+        """
+        for key in list(self.incoming):
+            self._remove(key)
+        super(Fragmenter, self).shutdown_task_manager()
+
+    def _task_name(self, kind, address, message_id):
+        return "%s-%s:%d-%d" % (kind, address[0], address[1], message_id)
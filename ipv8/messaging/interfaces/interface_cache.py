@@ -0,0 +1,237 @@
+"""
+A process-wide cache of the network interfaces of this machine.
+
+Enumerating the interfaces is slow, while our LAN address is needed for every overlay and every introduction checks if
+an address is in our LAN. The interfaces are therefore read once and only read again after REFRESH_INTERVAL seconds.
+"""
+from __future__ import absolute_import
+
+import logging
+import socket
+import struct
+import time
+from threading import RLock
+
+try:
+    # Especially on Android netifaces may fail.
+    # Generally, we also allow users not to have netifaces installed.
+    import netifaces
+except ImportError:
+    netifaces = None
+
+# Read the interfaces again if they are older than this many seconds
+REFRESH_INTERVAL = 60.0
+# The subnets that are considered to be LAN subnets if we can not find our interfaces
+LAN_SUBNETS = (("192.168.0.0", 16),
+               ("172.16.0.0", 12),
+               ("10.0.0.0", 8))
+BLACKLIST = ("127.0.0.1", "0.0.0.0", "255.255.255.255")
+
+
+def address_to_int(address):
+    """
+    Convert an IPv4 address in dotted decimal format to an integer.
+    """
+    return struct.unpack_from(">L", socket.inet_aton(address))[0]
+
+
+def prefix_length_to_netmask(prefix_length):
+    """
+    Convert the number of significant bits of a subnet to an integer netmask.
+    """
+    return (0xFFFFFFFF << (32 - prefix_length)) & 0xFFFFFFFF
+
+
+class Interface(object):
+    """
+    An AF_INET interface of this machine.
+    """
+
+    def __init__(self, name, address, netmask, broadcast):
+        self.name = name
+        self.address = address
+        self.netmask = netmask
+        self.broadcast = broadcast
+        self._l_address = address_to_int(address)
+        self._l_netmask = address_to_int(netmask)
+
+    def __contains__(self, address):
+        assert isinstance(address, str), type(address)
+        return (address_to_int(address) & self._l_netmask) == (self._l_address & self._l_netmask)
+
+    def __str__(self):
+        return "<{self.__class__.__name__} \"{self.name}\" addr:{self.address} mask:{self.netmask}>".format(self=self)
+
+    def __repr__(self):
+        return "<{self.__class__.__name__} \"{self.name}\" addr:{self.address} mask:{self.netmask}>".format(self=self)
+
+
+class SubnetMatcher(object):
+    """
+    Checks if addresses are in any of a set of subnets.
+
+    The subnets are grouped by netmask, so an address is checked with one mask and one set lookup per distinct
+    netmask, instead of one comparison per subnet.
+    """
+
+    def __init__(self):
+        super(SubnetMatcher, self).__init__()
+        self.networks = {}
+
+    def add(self, address, netmask):
+        """
+        Add a subnet.
+
+        :param address: any address in the subnet, as an integer
+        :param netmask: the netmask of the subnet, as an integer
+        """
+        self.networks.setdefault(netmask, set()).add(address & netmask)
+
+    def __contains__(self, address):
+        l_address = address_to_int(address)
+        return any((l_address & netmask) in networks for netmask, networks in self.networks.items())
+
+
+def get_interface_addresses():
+    """
+    Yields Interface instances for each available AF_INET interface found.
+
+    An Interface instance has the following properties:
+    - name          (i.e. "eth0")
+    - address       (i.e. "10.148.3.254")
+    - netmask       (i.e. "255.255.255.0")
+    - broadcast     (i.e. "10.148.3.255")
+    """
+    try:
+        for interface in netifaces.interfaces():
+            try:
+                addresses = netifaces.ifaddresses(interface)
+
+            except ValueError:
+                # some interfaces are given that are invalid, we encountered one called ppp0
+                pass
+
+            else:
+                for option in addresses.get(netifaces.AF_INET, []):
+                    try:
+                        # On Windows netifaces currently returns IP addresses as unicode,
+                        # and on *nix it returns str. So, we convert any unicode objects to str.
+                        # Python 3 port update: In Python 3 everything is unicode and we should do nothing.
+                        # On Python 2 the above can happen: instead of checking for unicode, we check for `not str`.
+                        unicode_to_str = lambda s: s.encode('utf-8') if s and not isinstance(s, str) else s
+                        yield Interface(interface,
+                                        unicode_to_str(option.get("addr")),
+                                        unicode_to_str(option.get("netmask")),
+                                        unicode_to_str(option.get("broadcast")))
+
+                    except TypeError:
+                        # some interfaces have no netmask configured, causing a TypeError when
+                        # trying to unpack _l_netmask
+                        pass
+    except OSError as e:
+        logger = logging.getLogger("dispersy")
+        logger.warning("failed to check network interfaces, error was: %r", e)
+
+
+def get_lan_address_without_netifaces():
+    """
+    # Get the local ip address by creating a socket for a (random) internet ip
+    :return: the local ip address
+    """
+    try:
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        s.connect(("192.0.2.0", 80))  # TEST-NET-1, guaranteed to not be connected => no callbacks
+        local_ip = s.getsockname()[0]
+        s.close()
+        return local_ip
+    except socket.error:
+        return "0.0.0.0"
+
+
+def guess_lan_interface(interfaces):
+    """
+    Chooses the most likely Interface instance out of INTERFACES to use as our LAN address.
+
+    :return: the Interface, or None if no appropriate Interface can be found
+    """
+    # prefer interfaces where we have a broadcast address
+    for interface in interfaces:
+        if interface.broadcast and interface.address and interface.address not in BLACKLIST:
+            return interface
+
+    # Exception for virtual machines/containers
+    for interface in interfaces:
+        if interface.address and interface.address not in BLACKLIST:
+            return interface
+
+    return None
+
+
+class InterfaceCache(object):
+    """
+    Our LAN address and the subnets of our interfaces, read at most once every refresh interval.
+    """
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL):
+        super(InterfaceCache, self).__init__()
+        self.refresh_interval = refresh_interval
+        self.lock = RLock()
+        self.interfaces = []
+        self.netifaces_failed = netifaces is None
+        self.lan_address = "0.0.0.0"
+        self.lan_subnets = SubnetMatcher()
+        self.last_refresh = None
+
+    def refresh(self):
+        """
+        Read the interfaces of this machine and determine our LAN address and LAN subnets.
+
+        If netifaces is not available, or none of the interfaces is usable, our LAN address is determined by opening
+        a socket and the private IPv4 subnets are considered to be our LAN.
+        """
+        with self.lock:
+            interfaces = [] if netifaces is None else list(get_interface_addresses())
+            interface = guess_lan_interface(interfaces)
+            lan_subnets = SubnetMatcher()
+            self.netifaces_failed = interface is None
+            if interface:
+                lan_address = interface.address
+                for other in interfaces:
+                    lan_subnets.add(other._l_address, other._l_netmask)
+            else:
+                lan_address = get_lan_address_without_netifaces()
+                lan_subnets.add(address_to_int(lan_address), prefix_length_to_netmask(32))
+                for address, prefix_length in LAN_SUBNETS:
+                    lan_subnets.add(address_to_int(address), prefix_length_to_netmask(prefix_length))
+            self.interfaces = interfaces
+            self.lan_address = lan_address
+            self.lan_subnets = lan_subnets
+            self.last_refresh = time.time()
+
+    def _refresh_if_expired(self):
+        if self.last_refresh is None or time.time() - self.last_refresh >= self.refresh_interval:
+            self.refresh()
+
+    def get_lan_address(self):
+        """
+        Get the most likely LAN address of this machine.
+        """
+        self._refresh_if_expired()
+        return self.lan_address
+
+    def address_is_lan(self, address):
+        """
+        Check if an IPv4 address is in one of our LAN subnets.
+        """
+        self._refresh_if_expired()
+        return address in self.lan_subnets
+
+
+_interface_cache = InterfaceCache()
+
+
+def get_interface_cache():
+    """
+    Get the interface cache that is shared by all endpoint listeners of this process.
+    """
+    return _interface_cache
@@ -1,3 +1,116 @@
+from __future__ import absolute_import
+
+from bisect import bisect_left
+import time
+
+# The upper bounds (in seconds) of the latency histogram buckets: four buckets per power of two, from 1 microsecond
+# up to about 30 seconds, so every measurement is stored with a relative error of at most 25%.
+LATENCY_BUCKETS = [(4 + sub_bucket) * 2 ** exponent / 4.0 / 1000000
+                   for exponent in range(25) for sub_bucket in range(4)]
+
+# The windows (in seconds) over which message rates are reported
+RATE_WINDOWS = (1, 10, 60)
+
+
+class LatencyHistogram(object):
+    """
+    Counts latency measurements in fixed buckets, which take constant memory regardless of the number of measurements.
+    """
+
+    def __init__(self):
+        super(LatencyHistogram, self).__init__()
+        # The last bucket holds the measurements which exceed the largest bucket
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, latency, count=1):
+        """
+        Add a measurement.
+
+        :param latency: the measured latency, in seconds
+        :param count: the number of times to add the measurement
+        """
+        self.counts[bisect_left(LATENCY_BUCKETS, latency)] += count
+        self.count += count
+        self.total += latency * count
+        self.max = max(self.max, latency)
+
+    def get_percentile(self, percentile):
+        """
+        Get the latency below which the given percentage of the measurements fall.
+
+        :param percentile: the percentage, between 0 and 100
+        :return: the upper bound of the bucket of the percentile, in seconds
+        """
+        threshold = self.count * percentile / 100.0
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if bucket_count and seen >= threshold:
+                return min(LATENCY_BUCKETS[index], self.max) if index < len(LATENCY_BUCKETS) else self.max
+        return 0.0
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.get_percentile(50),
+            "p90": self.get_percentile(90),
+            "p99": self.get_percentile(99),
+            "buckets": [[LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else None, bucket_count]
+                        for index, bucket_count in enumerate(self.counts) if bucket_count]
+        }
+
+
+class RateWindow(object):
+    """
+    Counts messages and bytes per second, for the last minute.
+    """
+
+    def __init__(self):
+        super(RateWindow, self).__init__()
+        size = max(RATE_WINDOWS)
+        self.seconds = [-1] * size
+        self.messages = [0] * size
+        self.bytes = [0] * size
+
+    def add(self, timestamp, num_bytes):
+        second = int(timestamp)
+        slot = second % len(self.seconds)
+        if self.seconds[slot] != second:
+            self.seconds[slot] = second
+            self.messages[slot] = 0
+            self.bytes[slot] = 0
+        self.messages[slot] += 1
+        self.bytes[slot] += num_bytes
+
+    def get_rates(self, window, now):
+        """
+        Get the average rates over the last completed seconds.
+
+        :param window: the number of seconds to average over
+        :param now: the current time
+        :return: the tuple of messages per second and bytes per second
+        """
+        current = int(now)
+        messages = num_bytes = 0
+        for slot, second in enumerate(self.seconds):
+            if current - window <= second < current:
+                messages += self.messages[slot]
+                num_bytes += self.bytes[slot]
+        return float(messages) / window, float(num_bytes) / window
+
+    def to_dict(self, now):
+        rates = {}
+        for window in RATE_WINDOWS:
+            messages, num_bytes = self.get_rates(window, now)
+            rates["%ds" % window] = {"messages": messages, "bytes": num_bytes}
+        return rates
+
+
 class NetworkStat(object):
     """
     Represents an individual network statistic. This is used to compose the overall community statistics.
@@ -11,6 +124,9 @@ class NetworkStat(object):
         - first_measured_down: float
         - last_measured_up: float
         - last_measured_down: float
+        - handler_latency: LatencyHistogram
+        - rate_up: RateWindow
+        - rate_down: RateWindow
     """
     def __init__(self, identifier):
         self.identifier = identifier
@@ -22,11 +138,15 @@ class NetworkStat(object):
         self.first_measured_down = 0
         self.last_measured_up = 0
         self.last_measured_down = 0
+        self.handler_latency = LatencyHistogram()
+        self.rate_up = RateWindow()
+        self.rate_down = RateWindow()
 
     def add_sent_stat(self, timestamp, num_bytes):
         self.num_up += 1
         self.bytes_up += num_bytes
         self.last_measured_up = timestamp
+        self.rate_up.add(timestamp, num_bytes)
 
         if not self.first_measured_up:
             self.first_measured_up = timestamp
@@ -35,11 +155,16 @@ class NetworkStat(object):
         self.num_down += 1
         self.bytes_down += num_bytes
         self.last_measured_down = timestamp
+        self.rate_down.add(timestamp, num_bytes)
 
         if not self.first_measured_down:
             self.first_measured_down = timestamp
 
-    def to_dict(self):
+    def add_handler_latency(self, latency, count=1):
+        self.handler_latency.add(latency, count)
+
+    def to_dict(self, now=None):
+        now = now if now else time.time()
         return {
             "identifier": self.identifier,
             "num_up": self.num_up,
@@ -49,7 +174,10 @@ class NetworkStat(object):
             "first_measured_up": self.first_measured_up,
             "first_measured_down": self.first_measured_down,
             "last_measured_up": self.last_measured_up,
-            "last_measured_down": self.last_measured_down
+            "last_measured_down": self.last_measured_down,
+            "handler_latency": self.handler_latency.to_dict(),
+            "rate_up": self.rate_up.to_dict(now),
+            "rate_down": self.rate_down.to_dict(now)
         }
 
     def __str__(self):
@@ -0,0 +1,167 @@
+"""
+Replay the incoming datagrams of a capture file (see capture_endpoint.py) to the listeners of an endpoint.
+"""
+from __future__ import absolute_import
+
+from timeit import default_timer
+
+try:
+    from time import process_time
+except ImportError:
+    # Python 2
+    from time import clock as process_time
+
+from twisted.internet.defer import Deferred
+
+from .capture_endpoint import DIRECTION_IN, read_capture
+from .endpoint import Endpoint
+from .network_stats import LatencyHistogram
+
+
+def _deliver_packet(listener, packet):
+    listener.on_packet(packet)
+
+
+class ListenerReport(object):
+    """
+    The time the listeners of one class spent on the replayed packets.
+    """
+
+    def __init__(self):
+        super(ListenerReport, self).__init__()
+        self.packets = 0
+        self.cpu_time = 0.0
+        self.wall_time = 0.0
+        self.handler_latency = LatencyHistogram()
+
+    def add(self, cpu_time, wall_time):
+        self.packets += 1
+        self.cpu_time += cpu_time
+        self.wall_time += wall_time
+        self.handler_latency.add(wall_time)
+
+    def to_dict(self):
+        return {
+            "packets": self.packets,
+            "cpu_time": self.cpu_time,
+            "wall_time": self.wall_time,
+            "handler_latency": self.handler_latency.to_dict()
+        }
+
+
+class ReplayEndpoint(Endpoint):
+    """
+    Feeds the incoming datagrams of a capture file to the listeners of this endpoint.
+
+    The packets are delivered on the calling thread, in the order of the capture, and the time every listener spends
+    on them is measured. Sent packets are counted and then dropped.
+    """
+
+    def __init__(self, file_path, address=("127.0.0.1", 0)):
+        """
+        Create a new replay endpoint.
+
+        :param file_path: the path of the capture file
+        :param address: the address this endpoint claims to be bound to
+        """
+        super(ReplayEndpoint, self).__init__()
+        self.file_path = file_path
+        self._address = address
+        self._port = address[1]
+        self._open = False
+        self.reports = {}
+        self.replayed_packets = 0
+        self.sent_packets = 0
+        self.sent_bytes = 0
+        self.start_time = 0.0
+        self.end_time = 0.0
+
+    def assert_open(self):
+        assert self._open
+
+    def is_open(self):
+        return self._open
+
+    def get_address(self):
+        return self._address
+
+    def open(self):
+        self._open = True
+
+    def close(self):
+        self._open = False
+
+    def send(self, socket_address, packet):
+        if not self.is_open():
+            return
+        self.sent_packets += 1
+        self.sent_bytes += len(packet)
+
+    def deliver(self, packet):
+        """
+        Deliver a packet to its listeners, measuring their CPU time and latency.
+        """
+        self.replayed_packets += 1
+        for listener in self._get_listeners(packet[1]):
+            cpu_start = process_time()
+            start = default_timer()
+            self._deliver_now(_deliver_packet, listener, packet)
+            wall_time = default_timer() - start
+            cpu_time = process_time() - cpu_start
+            name = listener.__class__.__name__
+            if name not in self.reports:
+                self.reports[name] = ListenerReport()
+            self.reports[name].add(cpu_time, wall_time)
+
+    def replay(self, speed=1.0, chunk_size=100):
+        """
+        Replay the incoming datagrams of the capture.
+
+        :param speed: the factor to speed up the original timing with, or None to replay as fast as possible
+        :param chunk_size: the number of packets to deliver per scheduler iteration, when replaying as fast as possible
+        :return: a Deferred that fires with the report (see get_report) once all packets are delivered
+        """
+        records = [(timestamp, (address, data)) for timestamp, direction, address, data in read_capture(self.file_path)
+                   if direction == DIRECTION_IN]
+        deferred = Deferred()
+        self.start_time = default_timer()
+        first_timestamp = records[0][0] if records else 0.0
+        self._replay(records, 0, first_timestamp, speed, chunk_size, deferred)
+        return deferred
+
+    def _replay(self, records, index, first_timestamp, speed, chunk_size, deferred):
+        if not self.is_open():
+            index = len(records)
+        elapsed = default_timer() - self.start_time
+        delivered = 0
+        while index < len(records):
+            if speed is None:
+                if delivered == chunk_size:
+                    break
+            elif (records[index][0] - first_timestamp) / speed > elapsed:
+                break
+            self.deliver(records[index][1])
+            index += 1
+            delivered += 1
+
+        if index == len(records):
+            self.end_time = default_timer()
+            deferred.callback(self.get_report())
+            return
+        delay = 0 if speed is None else (records[index][0] - first_timestamp) / speed - elapsed
+        self._scheduler.callLater(max(0, delay), self._replay, records, index, first_timestamp, speed, chunk_size,
+                                  deferred)
+
+    def get_report(self):
+        """
+        Get the measurements of the replay.
+
+        :return: a dictionary with the totals and, per listener class, the time spent on the packets
+        """
+        return {
+            "packets": self.replayed_packets,
+            "duration": (self.end_time or default_timer()) - self.start_time,
+            "sent_packets": self.sent_packets,
+            "sent_bytes": self.sent_bytes,
+            "overlays": {name: report.to_dict() for name, report in self.reports.items()}
+        }
@@ -39,7 +39,7 @@ class StatisticsEndpoint(EndpointListener):
         self.endpoint.send(socket_address, packet)
 
         prefix = packet[:22]
-        if prefix not in list(self.statistics.keys()) or len(packet) < 22:
+        if len(packet) < 23 or prefix not in self.statistics:
             return
 
         self.add_sent_stat(prefix, ord(packet[22:23]), len(packet))
@@ -50,12 +50,15 @@ class StatisticsEndpoint(EndpointListener):
         elif community_prefix in self.statistics and not enabled:
             self.statistics.pop(community_prefix)
 
+    def is_enabled(self, community_prefix):
+        return community_prefix in self.statistics
+
     # EndpointListener methods
     def on_packet(self, packet):
         _, data = packet
 
         prefix = data[:22]
-        if prefix not in list(self.statistics.keys()) or len(data) < 22:
+        if len(data) < 23 or prefix not in self.statistics:
             return
 
         message_id = ord(data[22:23])
@@ -76,6 +79,19 @@ class StatisticsEndpoint(EndpointListener):
             self.statistics[prefix][identifier] = NetworkStat(identifier)
         self.statistics[prefix][identifier].add_received_stat(timestamp if timestamp else time.time(), num_bytes)
 
+    def add_handler_latency(self, prefix, identifier, latency, count=1):
+        """
+        Add the time spent in the handler of a message.
+
+        :param latency: the time spent in the handler, in seconds
+        :param count: the number of messages the handler processed in this time
+        """
+        if prefix not in self.statistics:
+            return
+        if identifier not in self.statistics[prefix]:
+            self.statistics[prefix][identifier] = NetworkStat(identifier)
+        self.statistics[prefix][identifier].add_handler_latency(latency / count, count)
+
     def get_statistics(self, prefix):
         if prefix in self.statistics:
             return self.statistics[prefix]
@@ -138,7 +154,7 @@ class StatisticsEndpoint(EndpointListener):
         if prefix in self.statistics:
             for identifier in self.statistics[prefix]:
                 if not self.is_excluded(identifier, include_introduction, include_puncture, include_deprecated):
-                    bytes_received += self.statistics[identifier].bytes_down
+                    bytes_received += self.statistics[prefix][identifier].bytes_down
         return bytes_received
 
     def is_excluded(self, identifier, include_introduction, include_puncture, include_deprecated):
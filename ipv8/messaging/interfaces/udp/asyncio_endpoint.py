@@ -0,0 +1,153 @@
+"""
+A UDP endpoint which runs on an asyncio event loop, instead of the Twisted reactor.
+"""
+from __future__ import absolute_import
+
+import asyncio
+import socket
+import sys
+from collections import deque
+
+from .endpoint import UDP_MAX_SIZE
+from ..endpoint import Endpoint, EndpointClosedException
+from ....scheduler import AsyncioScheduler, get_scheduler
+
+
+class AsyncioUDPEndpoint(Endpoint, asyncio.DatagramProtocol):
+    """
+    A UDP endpoint implemented as an asyncio DatagramProtocol.
+
+    The endpoint runs on the loop of the installed AsyncioScheduler (see ipv8.scheduler.set_scheduler).
+    """
+
+    def __init__(self, port, ip="0.0.0.0"):
+        """
+        Create a new endpoint.
+
+        :param port: the port to listen on (or the first port to try)
+        :param ip: the interface to listen on
+        :raises RuntimeError: if IPv8 is not running on an AsyncioScheduler
+        """
+        Endpoint.__init__(self)
+        if not isinstance(get_scheduler(), AsyncioScheduler):
+            raise RuntimeError("The asyncio endpoint requires an AsyncioScheduler, see ipv8.scheduler.set_scheduler")
+        self._loop = self._scheduler.loop
+        self._port = port
+        self._ip = ip
+        self._running = False
+        self._socket = None
+        self._transport = None
+        # Packets sent before the transport is available, or while the outbound network buffer is blocked
+        self._delayed_packets = deque(maxlen=min(100, max(0, sys.getrecursionlimit() - 2)))
+        self._writing_paused = False
+
+        self.bytes_up = 0
+        self.bytes_down = 0
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._flush_delayed_packets()
+
+    def connection_lost(self, exc):
+        self._transport = None
+
+    def pause_writing(self):
+        self._writing_paused = True
+
+    def resume_writing(self):
+        self._writing_paused = False
+        self._flush_delayed_packets()
+
+    def datagram_received(self, data, addr):
+        self.bytes_down += len(data)
+        self.notify_listeners((addr, data))
+
+    def error_received(self, exc):
+        self._logger.warning("Dropping packet due to socket error: %s", exc)
+
+    def _flush_delayed_packets(self):
+        while self._delayed_packets and self._transport and not self._writing_paused:
+            self._write(*self._delayed_packets.popleft())
+
+    def _write(self, socket_address, packet):
+        if len(packet) > UDP_MAX_SIZE:
+            self._logger.error("Sending a packet that is too big (length: %d)", len(packet))
+            return
+        if packet:
+            self._transport.sendto(packet, socket_address)
+        else:
+            # Asyncio transports silently drop empty datagrams, so these are written to the socket directly.
+            try:
+                self._socket.sendto(packet, socket_address)
+            except socket.error as e:
+                self._logger.warning("Dropping packet due to socket error: %s", e)
+                return
+        self.bytes_up += len(packet)
+
+    def send(self, socket_address, packet):
+        """
+        Send a packet to a given address.
+        :param socket_address: Tuple of (IP, port) which indicates the destination of the packet.
+        :param packet: The packet to send.
+        """
+        self.assert_open()
+        if self._transport is None or self._writing_paused:
+            self._logger.info("Rescheduling packet (due to blocked socket) outbound to %s", str(socket_address))
+            self._delayed_packets.append((socket_address, packet))
+            return
+        self._write(socket_address, packet)
+
+    def _bind(self):
+        """
+        Bind a socket to the first free port, starting at our port.
+
+        :return: the bound socket
+        :raises socket.error: if no port could be bound
+        """
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for _ in range(10000):
+            try:
+                sock.bind((self._ip, self._port))
+                self._logger.debug("Listening at %d", self._port)
+                return sock
+            except socket.error:
+                self._logger.debug("Listening failed at %d", self._port)
+                self._port += 1
+        sock.close()
+        raise socket.error("No free port to listen on")
+
+    def open(self):
+        self._socket = self._bind()
+        self._socket.setblocking(False)
+        # The socket is bound right away, but the transport only becomes available once the loop has set it up.
+        coroutine = self._loop.create_datagram_endpoint(lambda: self, sock=self._socket)
+        if self._loop.is_running():
+            asyncio.ensure_future(coroutine, loop=self._loop)
+        else:
+            self._loop.run_until_complete(coroutine)
+        self._running = True
+        return True
+
+    def assert_open(self):
+        if not self._running:
+            raise EndpointClosedException(self)
+
+    def close(self):
+        self._running = False
+        if self._transport is not None:
+            self._transport.close()
+        elif self._socket is not None:
+            self._socket.close()
+
+    def get_address(self):
+        """
+        Get the address for this Endpoint.
+        """
+        self.assert_open()
+        return self._socket.getsockname()
+
+    def is_open(self):
+        """
+        Check if the underlying socket is open.
+        """
+        return self._socket is not None and self._running
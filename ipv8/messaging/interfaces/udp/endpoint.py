@@ -1,30 +1,44 @@
 from __future__ import absolute_import
 
 import errno
-from collections import deque
 import socket
-import sys
 
 from six.moves import xrange
 from twisted.internet import protocol, reactor, error
 from twisted.internet.error import MessageLengthError
 
+from .send_queue import DEFAULT_MAX_QUEUED_BYTES, SendQueue, get_priority
 from ..endpoint import Endpoint, EndpointClosedException
 
 UDP_MAX_SIZE = 2 ** 16 - 60
+# The delay (in seconds) before retrying to send, when the outbound network buffer is full
+SEND_RETRY_DELAY = 0.01
+# Not all OSes have WSAEWOULDBLOCK: Windows may have a blocked output buffer
+BLOCKED_ERRORS = (errno.EAGAIN, errno.EWOULDBLOCK, errno.ENOBUFS, getattr(errno, 'WSAEWOULDBLOCK', 10035))
 
 
 class UDPEndpoint(Endpoint, protocol.DatagramProtocol):
 
-    def __init__(self, port, ip="0.0.0.0"):
+    def __init__(self, port, ip="0.0.0.0", max_queued_bytes=DEFAULT_MAX_QUEUED_BYTES, rate=None,
+                 destination_rate=None):
+        """
+        Create a new UDP endpoint.
+
+        :param port: the port to listen on (or the first port to try)
+        :param ip: the interface to listen on
+        :param max_queued_bytes: the maximum number of bytes to queue while the socket is blocked or paced
+        :param rate: the maximum sending rate in bytes per second, or None to send as fast as possible
+        :param destination_rate: the maximum sending rate per destination in bytes per second, or None
+        """
         Endpoint.__init__(self)
         self._port = port
         self._ip = ip
         self._running = False
         self._listening_port = False
-        # If the outbound network buffer is blocked, buffer up to 100 packets
-        # Pop from the left and append to the right side of the double-ended queue
-        self._delayed_packets = deque(maxlen=min(100, max(0, sys.getrecursionlimit() - 2)))
+        # Packets that wait for the outbound network buffer or for pacing
+        self.send_queue = SendQueue(max_queued_bytes, rate=rate, destination_rate=destination_rate)
+        self._drain_call = None
+        self._socket_blocked = False
 
         self.bytes_up = 0
         self.bytes_down = 0
@@ -33,37 +47,112 @@ class UDPEndpoint(Endpoint, protocol.DatagramProtocol):
         self.bytes_down += len(datagram)
         self.notify_listeners((addr, datagram))
 
-    def send(self, socket_address, packet):
+    def send(self, socket_address, packet, priority=None):
         """
         Send a packet to a given address.
+
+        If the socket is blocked or the packet is paced, the packet is queued. Introductions and punctures are
+        sent before other queued packets.
+
         :param socket_address: Tuple of (IP, port) which indicates the destination of the packet.
         :param packet: The packet to send.
+        :param priority: The priority class of the packet (see send_queue), by default derived from the packet.
         """
         self.assert_open()
+        if priority is None:
+            priority = get_priority(packet)
+        now = self._scheduler.seconds()
+        if self.send_queue or not self.send_queue.consume(socket_address, len(packet), now):
+            if not self.send_queue.push(socket_address, packet, priority, now):
+                self._logger.debug("Dropping packet outbound to %s (send queue is full)", str(socket_address))
+            self._schedule_drain(self.send_queue.next_delay(now))
+        elif not self._write(socket_address, packet):
+            self._logger.info("Rescheduling packet (due to blocked socket) outbound to %s", str(socket_address))
+            if not self.send_queue.push_front((socket_address, packet, now), priority):
+                self._logger.debug("Dropping packet outbound to %s (send queue is full)", str(socket_address))
+            self._schedule_drain(SEND_RETRY_DELAY, blocked=True)
+
+    def _write(self, socket_address, packet):
+        """
+        Write a packet to the socket.
+
+        :return: False if the socket is blocked and the packet should be sent later, True otherwise
+        """
         try:
             self.transport.write(packet, socket_address)
             self.bytes_up += len(packet)
-            # If the write succeeded, try sending one of our previously blocked packets
-            try:
-                self.send(*self._delayed_packets.popleft())
-            except IndexError:
-                # This can happen if the queue is empty, in which case we don't care
-                pass
         except socket.error as exc:
-            # Not all OSes have WSAEWOULDBLOCK: Windows may have a blocked output buffer
             errnum = exc[0] if hasattr(exc, "__getitem__") else exc.errno
-            if errnum == getattr(errno, 'WSAEWOULDBLOCK', 10035):
-                self._logger.info("Rescheduling packet (due to blocked socket) outbound to %s", str(socket_address))
-                self._delayed_packets.append((socket_address, packet))
-            else:
-                self._logger.warning("Dropping packet due to socket error: %s", exc)
+            if errnum in BLOCKED_ERRORS:
+                return False
+            self._logger.warning("Dropping packet due to socket error: %s", exc)
         except MessageLengthError:
             self._logger.error("Sending a packet that is too big (length: %d)", len(packet))
+        return True
+
+    def _schedule_drain(self, delay, blocked=False):
+        """
+        Make sure the send queue is drained after the given delay (or earlier).
+
+        :param blocked: whether the socket is blocked, in which case the queue should not be drained any earlier
+        """
+        if self._drain_call is not None and self._drain_call.active():
+            if self._socket_blocked and not blocked:
+                # Draining earlier is pointless while the socket is blocked.
+                return
+            if not blocked and self._drain_call.getTime() <= self._scheduler.seconds() + delay:
+                return
+            self._drain_call.cancel()
+        self._socket_blocked = blocked
+        self._drain_call = self._scheduler.callLater(delay, self._drain)
+
+    def _drain(self):
+        """
+        Send the queued packets that may be sent now and schedule sending the rest.
+        """
+        self._drain_call = None
+        self._socket_blocked = False
+        if not self.is_open():
+            return
+        now = self._scheduler.seconds()
+        popped = self.send_queue.pop(now)
+        while popped is not None:
+            entry, priority = popped
+            if not self._write(entry[0], entry[1]):
+                self.send_queue.push_front(entry, priority)
+                self._schedule_drain(SEND_RETRY_DELAY, blocked=True)
+                return
+            self.send_queue.record_sent(entry, now)
+            popped = self.send_queue.pop(now)
+        delay = self.send_queue.next_delay(now)
+        if delay is not None:
+            self._schedule_drain(delay)
+
+    def is_congested(self):
+        """
+        Check if so much data is queued for sending, that bursts of traffic should be postponed.
+        """
+        return self.send_queue.is_congested()
+
+    def get_send_queue_statistics(self):
+        """
+        Get the queue depth, drops and pacing delay of the send queue.
+        """
+        return self.send_queue.get_statistics()
+
+    def _listen_udp(self, port):
+        """
+        Start listening on a port.
+
+        :return: the listening port
+        :raises CannotListenError: if the port is not available
+        """
+        return reactor.listenUDP(port, self, self._ip, UDP_MAX_SIZE)
 
     def open(self):
         for _ in xrange(10000):
             try:
-                self._listening_port = reactor.listenUDP(self._port, self, self._ip, UDP_MAX_SIZE)
+                self._listening_port = self._listen_udp(self._port)
                 self._logger.debug("Listening at %d", self._port)
                 break
             except error.CannotListenError:
@@ -79,6 +168,8 @@ class UDPEndpoint(Endpoint, protocol.DatagramProtocol):
 
     def close(self):
         self._running = False
+        if self._drain_call is not None and self._drain_call.active():
+            self._drain_call.cancel()
         return self._listening_port.stopListening()
 
     def get_address(self):
@@ -0,0 +1,348 @@
+"""
+A Linux UDP endpoint which receives and sends packets in batches, using the recvmmsg and sendmmsg system calls.
+"""
+from __future__ import absolute_import
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import socket
+import struct
+import sys
+
+from twisted.internet import udp
+from twisted.python import log
+
+from .endpoint import SEND_RETRY_DELAY, UDPEndpoint, UDP_MAX_SIZE
+from .send_queue import DEFAULT_MAX_QUEUED_BYTES, get_priority
+from ....scheduler import is_in_io_thread
+
+DEFAULT_BATCH_SIZE = 32
+
+_MSG_DONTWAIT = getattr(socket, 'MSG_DONTWAIT', 0x40)
+_RETRY_ERRORS = (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR, errno.ENOBUFS)
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p),
+                ("iov_len", ctypes.c_size_t)]
+
+
+class _SockAddrIn(ctypes.Structure):
+    # The port and address are stored in network byte order.
+    _fields_ = [("sin_family", ctypes.c_ushort),
+                ("sin_port", ctypes.c_uint16),
+                ("sin_addr", ctypes.c_uint32),
+                ("sin_zero", ctypes.c_char * 8)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p),
+                ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(_IOVec)),
+                ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p),
+                ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr),
+                ("msg_len", ctypes.c_uint)]
+
+
+def _load_libc():
+    """
+    Get the libc functions for recvmmsg and sendmmsg.
+
+    :return: the (recvmmsg, sendmmsg) tuple or (None, None) if they are not available
+    """
+    if not sys.platform.startswith('linux'):
+        return None, None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        recvmmsg = libc.recvmmsg
+        sendmmsg = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None, None
+    recvmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    recvmmsg.restype = ctypes.c_int
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int]
+    sendmmsg.restype = ctypes.c_int
+    return recvmmsg, sendmmsg
+
+
+_recvmmsg, _sendmmsg = _load_libc()
+
+
+def mmsg_available():
+    """
+    Check if the recvmmsg and sendmmsg system calls can be used on this platform.
+    """
+    return _recvmmsg is not None and _sendmmsg is not None
+
+
+def encode_address(socket_address):
+    """
+    Convert an (IP, port) address to the port and address fields of a sockaddr_in, in network byte order.
+
+    :raises ValueError: if the address is not a valid IPv4 address
+    """
+    host, port = socket_address
+    try:
+        return socket.htons(port), struct.unpack('=I', socket.inet_aton(host))[0]
+    except (socket.error, OverflowError, TypeError) as e:
+        raise ValueError("Invalid address %s: %s" % (str(socket_address), e))
+
+
+def _raise_errno():
+    code = ctypes.get_errno()
+    raise OSError(code, os.strerror(code))
+
+
+class MessageVector(object):
+    """
+    A preallocated vector of message headers, to receive or send a batch of IPv4 UDP packets with one system call.
+    """
+
+    def __init__(self, size, buffer_size=0):
+        """
+        Allocate a new message vector.
+
+        :param size: the maximum number of packets in a batch
+        :param buffer_size: the size of the receive buffer per packet, 0 if this vector is only used for sending
+        """
+        super(MessageVector, self).__init__()
+        self.size = size
+        self.buffer_size = buffer_size
+        self.headers = (_MMsgHdr * size)()
+        self.iovecs = (_IOVec * size)()
+        self.addresses = (_SockAddrIn * size)()
+        self.buffer = ctypes.create_string_buffer(size * buffer_size) if buffer_size else None
+        self._buffer_address = ctypes.addressof(self.buffer) if buffer_size else 0
+        self._address_size = ctypes.sizeof(_SockAddrIn)
+
+        for index in range(size):
+            header = self.headers[index].msg_hdr
+            header.msg_name = ctypes.addressof(self.addresses[index])
+            header.msg_namelen = self._address_size
+            header.msg_iov = ctypes.pointer(self.iovecs[index])
+            header.msg_iovlen = 1
+            if buffer_size:
+                self.iovecs[index].iov_base = self._buffer_address + index * buffer_size
+                self.iovecs[index].iov_len = buffer_size
+
+    def receive(self, fd):
+        """
+        Receive up to size packets from a non-blocking socket.
+
+        :param fd: the file descriptor of the socket
+        :return: the list of received (address, data) packets, empty if no packets are available
+        :raises OSError: if receiving failed
+        """
+        count = _recvmmsg(fd, self.headers, self.size, _MSG_DONTWAIT, None)
+        if count < 0:
+            if ctypes.get_errno() in _RETRY_ERRORS:
+                return []
+            _raise_errno()
+        packets = []
+        for index in range(count):
+            address = self.addresses[index]
+            packets.append(((socket.inet_ntoa(struct.pack('=I', address.sin_addr)), socket.ntohs(address.sin_port)),
+                            ctypes.string_at(self._buffer_address + index * self.buffer_size,
+                                             self.headers[index].msg_len)))
+            # The kernel overwrote the address length with the length of the address it received.
+            self.headers[index].msg_hdr.msg_namelen = self._address_size
+        return packets
+
+    def send(self, fd, packets):
+        """
+        Send up to size packets over a non-blocking socket.
+
+        :param fd: the file descriptor of the socket
+        :param packets: the list of packets to send, in (encoded address, data) format (see encode_address())
+        :return: the number of packets that were sent, these are the first packets of the list
+        :raises OSError: if the first packet could not be sent
+        """
+        for index, ((port, host), data) in enumerate(packets):
+            address = self.addresses[index]
+            address.sin_family = socket.AF_INET
+            address.sin_port = port
+            address.sin_addr = host
+            self.iovecs[index].iov_base = ctypes.cast(ctypes.c_char_p(data), ctypes.c_void_p)
+            self.iovecs[index].iov_len = len(data)
+        count = _sendmmsg(fd, self.headers, len(packets), 0)
+        if count < 0:
+            _raise_errno()
+        return count
+
+
+class MMsgPort(udp.Port):
+    """
+    A Twisted UDP port which drains its socket with recvmmsg and hands the received batches to its protocol.
+
+    The protocol should implement ``datagramsReceived(packets)``, with packets in (address, data) format.
+    """
+
+    def __init__(self, port, proto, interface='', maxPacketSize=UDP_MAX_SIZE, reactor=None,
+                 batch_size=DEFAULT_BATCH_SIZE):
+        udp.Port.__init__(self, port, proto, interface, maxPacketSize, reactor)
+        self.receive_vector = MessageVector(batch_size, maxPacketSize)
+
+    def doRead(self):
+        """
+        Called when my socket is ready for reading.
+        """
+        read = 0
+        fd = self.socket.fileno()
+        while read < self.maxThroughput:
+            try:
+                packets = self.receive_vector.receive(fd)
+            except OSError as e:
+                if e.errno != errno.ECONNREFUSED:
+                    log.err(e, "Failed to receive packets")
+                return
+            if not packets:
+                return
+            read += sum(len(data) for _, data in packets)
+            try:
+                self.protocol.datagramsReceived(packets)
+            except:
+                log.err()
+
+
+class MMsgUDPEndpoint(UDPEndpoint):
+    """
+    A UDPEndpoint for Linux, which receives and sends packets in batches.
+
+    Received packets are handed to the listeners per batch (see EndpointListener.on_packets).
+    Sent packets go through the send queue of the UDPEndpoint, which is drained with a single sendmmsg call per batch,
+    once per scheduler iteration.
+    """
+
+    def __init__(self, port, ip="0.0.0.0", batch_size=DEFAULT_BATCH_SIZE, max_queued_bytes=DEFAULT_MAX_QUEUED_BYTES,
+                 rate=None, destination_rate=None):
+        """
+        Create a new endpoint.
+
+        :param port: the port to listen on (or the first port to try)
+        :param ip: the interface to listen on
+        :param batch_size: the maximum number of packets to receive or send in a single system call
+        :param max_queued_bytes: the maximum number of bytes to queue while the socket is blocked or paced
+        :param rate: the maximum sending rate in bytes per second, or None to send as fast as possible
+        :param destination_rate: the maximum sending rate per destination in bytes per second, or None
+        :raises RuntimeError: if recvmmsg and sendmmsg are not available on this platform
+        """
+        if not mmsg_available():
+            raise RuntimeError("recvmmsg and sendmmsg are not available on this platform")
+        UDPEndpoint.__init__(self, port, ip, max_queued_bytes, rate, destination_rate)
+        self.batch_size = batch_size
+        self._send_vector = MessageVector(batch_size)
+        self._flush_scheduled = False
+
+    def _listen_udp(self, port):
+        listening_port = MMsgPort(port, self, self._ip, UDP_MAX_SIZE, batch_size=self.batch_size)
+        listening_port.startListening()
+        return listening_port
+
+    def datagramsReceived(self, packets):
+        """
+        Called by the MMsgPort with a batch of received packets.
+
+        :param packets: the received packets, in (address, data) format
+        """
+        self.bytes_down += sum(len(data) for _, data in packets)
+        self.notify_listeners_batch(packets)
+
+    def send(self, socket_address, packet, priority=None):
+        """
+        Queue a packet to send to a given address.
+
+        :param socket_address: Tuple of (IP, port) which indicates the destination of the packet.
+        :param packet: The packet to send.
+        :param priority: The priority class of the packet (see send_queue), by default derived from the packet.
+        """
+        self.assert_open()
+        if priority is None:
+            priority = get_priority(packet)
+        if not self.send_queue.push(socket_address, packet if isinstance(packet, bytes) else bytes(packet), priority,
+                                    self._scheduler.seconds()):
+            self._logger.debug("Dropping packet outbound to %s (send queue is full)", str(socket_address))
+            return
+        if not self._flush_scheduled and not self._socket_blocked:
+            self._flush_scheduled = True
+            if is_in_io_thread(self._scheduler):
+                self._scheduler.callLater(0, self.flush)
+            else:
+                self._scheduler.callFromThread(self.flush)
+
+    def flush(self):
+        """
+        Send all queued packets that may be sent now.
+
+        If the outbound network buffer is full or packets are paced, the remaining packets are sent later.
+        """
+        self._flush_scheduled = False
+        if self._drain_call is not None and self._drain_call.active():
+            if self._socket_blocked:
+                return
+            self._drain_call.cancel()
+        self._drain()
+
+    def _drain(self):
+        """
+        Send the queued packets that may be sent now, in batches, and schedule sending the rest.
+        """
+        self._drain_call = None
+        self._socket_blocked = False
+        if not self.is_open():
+            return
+        fd = self._listening_port.socket.fileno()
+        now = self._scheduler.seconds()
+        while True:
+            batch = []
+            packets = []
+            while len(batch) < self.batch_size:
+                popped = self.send_queue.pop(now)
+                if popped is None:
+                    break
+                try:
+                    packets.append((encode_address(popped[0][0]), popped[0][1]))
+                except ValueError as e:
+                    self._logger.warning("Dropping packet due to socket error: %s", e)
+                    continue
+                batch.append(popped)
+            if not batch:
+                break
+            try:
+                sent = self._send_vector.send(fd, packets)
+            except OSError as e:
+                if e.errno in _RETRY_ERRORS:
+                    self._logger.info("Rescheduling %d packets (due to blocked socket)", len(batch))
+                    self._push_front(batch)
+                    self._schedule_drain(SEND_RETRY_DELAY, blocked=True)
+                    return
+                if e.errno == errno.EMSGSIZE:
+                    self._logger.error("Sending a packet that is too big (length: %d)", len(batch[0][0][1]))
+                else:
+                    self._logger.warning("Dropping packet due to socket error: %s", e)
+                sent = 1
+            else:
+                for entry, _ in batch[:sent]:
+                    self.bytes_up += len(entry[1])
+                    self.send_queue.record_sent(entry, now)
+            # Requeue the packets after the one which failed, or which did not fit in the outbound network buffer.
+            self._push_front(batch[sent:])
+        delay = self.send_queue.next_delay(now)
+        if delay is not None:
+            self._schedule_drain(delay)
+
+    def _push_front(self, batch):
+        for entry, priority in reversed(batch):
+            self.send_queue.push_front(entry, priority)
+
+    def close(self):
+        if self.is_open():
+            self.flush()
+        return UDPEndpoint.close(self)
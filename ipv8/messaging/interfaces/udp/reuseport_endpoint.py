@@ -0,0 +1,55 @@
+"""
+A UDP endpoint whose port can be shared by multiple processes, using SO_REUSEPORT.
+"""
+from __future__ import absolute_import
+
+import socket
+
+from twisted.internet import error, reactor
+
+from .endpoint import UDPEndpoint, UDP_MAX_SIZE
+
+
+def reuseport_available():
+    """
+    Check if sockets can share a port on this platform.
+    """
+    return hasattr(socket, 'SO_REUSEPORT')
+
+
+class ReusePortUDPEndpoint(UDPEndpoint):
+    """
+    A UDPEndpoint which shares its port with the other ReusePortUDPEndpoints on the same port.
+
+    The kernel hashes the source address of each incoming packet to one of the sockets, so all packets from the same
+    remote address arrive at the same endpoint. This is not necessarily the endpoint which sent the request that a
+    packet replies to, see ipv8.sharding.
+    """
+
+    def _listen_udp(self, port):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            sock.setblocking(False)
+            sock.bind((self._ip, port))
+            # The reactor duplicates the file descriptor, so our socket can be closed afterwards.
+            return reactor.adoptDatagramPort(sock.fileno(), socket.AF_INET, self, UDP_MAX_SIZE)
+        except socket.error as e:
+            raise error.CannotListenError(self._ip, port, e)
+        finally:
+            sock.close()
+
+    def open(self):
+        """
+        Open the shared port.
+
+        Unlike the UDPEndpoint, this does not try other ports, as all processes have to use the same port.
+
+        :raises CannotListenError: if the port is in use by a socket which does not share its port
+        """
+        if not reuseport_available():
+            raise RuntimeError("SO_REUSEPORT is not available on this platform")
+        self._listening_port = self._listen_udp(self._port)
+        self._logger.debug("Listening at %d", self._port)
+        self._running = True
+        return True
@@ -0,0 +1,301 @@
+"""
+The outbound packet queue of the UDPEndpoint, with a byte budget, priority classes and token bucket pacing.
+"""
+from __future__ import absolute_import
+from __future__ import division
+
+from collections import OrderedDict, deque
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+PRIORITIES = (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_BULK)
+
+# The message identifiers of introduction requests and responses, punctures and puncture requests
+HIGH_PRIORITY_MESSAGES = frozenset([245, 246, 249, 250])
+
+DEFAULT_MAX_QUEUED_BYTES = 2 ** 20
+# The fraction of the byte budget which, when queued, signals that the endpoint is congested
+CONGESTION_THRESHOLD = 0.5
+# The maximum number of per destination token buckets to keep, before forgetting those that are full
+MAX_DESTINATION_BUCKETS = 1024
+
+
+def get_priority(packet):
+    """
+    Get the priority class of a packet: introductions and punctures go before other messages.
+    """
+    if len(packet) > 22 and packet[0:1] == b'\x00' and ord(packet[22:23]) in HIGH_PRIORITY_MESSAGES:
+        return PRIORITY_HIGH
+    return PRIORITY_NORMAL
+
+
+class TokenBucket(object):
+    """
+    Paces traffic to a rate (in bytes per second), while allowing bursts of up to a given number of bytes.
+    """
+
+    def __init__(self, rate, burst, now):
+        super(TokenBucket, self).__init__()
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last_update = now
+
+    def _refill(self, now):
+        if now > self.last_update:
+            self.tokens = min(self.burst, self.tokens + (now - self.last_update) * self.rate)
+            self.last_update = now
+
+    def is_full(self, now):
+        self._refill(now)
+        return self.tokens >= self.burst
+
+    def delay(self, size, now):
+        """
+        Get the time until a packet of the given size may be sent.
+
+        Packets larger than the burst size may be sent once the bucket is full.
+        """
+        self._refill(now)
+        needed = min(size, self.burst) - self.tokens
+        return needed / self.rate if needed > 0 else 0.0
+
+    def consume(self, size, now):
+        """
+        Take the tokens for a packet of the given size, if it may be sent now.
+
+        :return: whether the packet may be sent
+        """
+        if self.delay(size, now) > 0:
+            return False
+        self.tokens -= size
+        return True
+
+    def refund(self, size):
+        """
+        Give back the tokens of a packet that was not sent after all.
+        """
+        self.tokens = min(self.burst, self.tokens + size)
+
+
+class SendQueue(object):
+    """
+    Packets waiting to be sent, because the socket is blocked or because they are paced.
+
+    Higher priority classes are always sent first. Within a priority class, destinations take turns.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_QUEUED_BYTES, rate=None, burst=None, destination_rate=None,
+                 destination_burst=None):
+        """
+        Create a new send queue.
+
+        :param max_bytes: the maximum number of queued bytes, the oldest packets of the lowest priority are dropped
+        :param rate: the maximum global sending rate in bytes per second, or None for no global pacing
+        :param burst: the maximum global burst in bytes, by default one second worth of traffic
+        :param destination_rate: the maximum sending rate per destination in bytes per second, or None
+        :param destination_burst: the maximum burst per destination in bytes, by default one second worth of traffic
+        """
+        super(SendQueue, self).__init__()
+        self.max_bytes = max_bytes
+        self.rate = rate
+        self.burst = burst or rate
+        self.destination_rate = destination_rate
+        self.destination_burst = destination_burst or destination_rate
+
+        self._queues = [OrderedDict() for _ in PRIORITIES]
+        self._global_bucket = None
+        self._destination_buckets = {}
+
+        self.queued_bytes = 0
+        self.queued_packets = 0
+        # The number of packets that were sent after being queued, and the total time they spent in the queue
+        self.sent_packets = 0
+        self.pacing_delay = 0.0
+        self.dropped_packets = 0
+        self.dropped_bytes = 0
+
+    def __len__(self):
+        return self.queued_packets
+
+    def is_congested(self):
+        """
+        Check if so much data is queued, that bursts of traffic should be postponed.
+        """
+        return self.queued_bytes > self.max_bytes * CONGESTION_THRESHOLD
+
+    def get_statistics(self):
+        """
+        Get the metrics of this queue.
+        """
+        return {
+            "queued_packets": self.queued_packets,
+            "queued_bytes": self.queued_bytes,
+            "sent_packets": self.sent_packets,
+            "dropped_packets": self.dropped_packets,
+            "dropped_bytes": self.dropped_bytes,
+            "pacing_delay": self.pacing_delay
+        }
+
+    def _get_global_bucket(self, now):
+        if self._global_bucket is None:
+            self._global_bucket = TokenBucket(self.rate, self.burst, now)
+        return self._global_bucket
+
+    def _get_destination_bucket(self, address, now):
+        bucket = self._destination_buckets.get(address)
+        if bucket is None:
+            if len(self._destination_buckets) >= MAX_DESTINATION_BUCKETS:
+                self._destination_buckets = {a: b for a, b in self._destination_buckets.items() if not b.is_full(now)}
+            bucket = self._destination_buckets[address] = TokenBucket(self.destination_rate, self.destination_burst,
+                                                                       now)
+        return bucket
+
+    def _delay(self, address, size, now):
+        """
+        Get the time until a packet of the given size may be sent to the given address.
+        """
+        delay = 0.0
+        if self.rate:
+            delay = self._get_global_bucket(now).delay(size, now)
+        if self.destination_rate:
+            delay = max(delay, self._get_destination_bucket(address, now).delay(size, now))
+        return delay
+
+    def consume(self, address, size, now):
+        """
+        Take the tokens to send a packet of the given size to the given address, if it may be sent now.
+
+        :return: whether the packet may be sent
+        """
+        if self._delay(address, size, now) > 0:
+            return False
+        if self.rate:
+            self._global_bucket.consume(size, now)
+        if self.destination_rate:
+            self._destination_buckets[address].consume(size, now)
+        return True
+
+    def refund(self, address, size):
+        """
+        Give back the tokens taken by consume(), for a packet that could not be sent after all.
+        """
+        if self.rate and self._global_bucket is not None:
+            self._global_bucket.refund(size)
+        if self.destination_rate and address in self._destination_buckets:
+            self._destination_buckets[address].refund(size)
+
+    def _make_room(self, size, priority):
+        """
+        Drop the oldest packets of the lowest priority classes (up to the given priority), to fit a new packet.
+
+        :return: whether there is room for the new packet
+        """
+        if self.queued_bytes + size <= self.max_bytes:
+            return True
+        if size > self.max_bytes:
+            return False
+        for drop_priority in reversed(PRIORITIES[priority:]):
+            queue = self._queues[drop_priority]
+            while queue and self.queued_bytes + size > self.max_bytes:
+                entry = self._remove(queue, min(queue, key=lambda a: queue[a][0][2]))
+                self.dropped_packets += 1
+                self.dropped_bytes += len(entry[1])
+        return self.queued_bytes + size <= self.max_bytes
+
+    def push(self, address, packet, priority, now):
+        """
+        Queue a packet, dropping older packets of the same or lower priority if the byte budget is exceeded.
+
+        :return: whether the packet was queued
+        """
+        if not self._make_room(len(packet), priority):
+            self.dropped_packets += 1
+            self.dropped_bytes += len(packet)
+            return False
+        queue = self._queues[priority]
+        if address not in queue:
+            queue[address] = deque()
+        queue[address].append((address, packet, now))
+        self.queued_bytes += len(packet)
+        self.queued_packets += 1
+        return True
+
+    def push_front(self, entry, priority):
+        """
+        Put a packet that may be sent back at the head of the queue, for instance because the socket was blocked.
+
+        The tokens taken to send the packet (by pop() or consume()) are given back, as the packet takes them again
+        when it is popped. Older packets of the same or lower priority are dropped if the byte budget is exceeded.
+
+        :return: whether the packet was queued
+        """
+        address, packet, _ = entry
+        self.refund(address, len(packet))
+        if not self._make_room(len(packet), priority):
+            self.dropped_packets += 1
+            self.dropped_bytes += len(packet)
+            return False
+        queue = self._queues[priority]
+        if address in queue:
+            queue[address].appendleft(entry)
+        else:
+            queue[address] = deque([entry])
+            # Put the destination first, so it is tried first.
+            for other in [a for a in queue if a != address]:
+                queue[other] = queue.pop(other)
+        self.queued_bytes += len(packet)
+        self.queued_packets += 1
+        return True
+
+    def _remove(self, queue, address):
+        entry = queue[address].popleft()
+        if not queue[address]:
+            del queue[address]
+        self.queued_bytes -= len(entry[1])
+        self.queued_packets -= 1
+        return entry
+
+    def pop(self, now):
+        """
+        Take the next packet that may be sent now.
+
+        :return: the (address, packet, queued_at) entry and its priority, or None if no packet may be sent now
+        """
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            # The queue is only modified right before returning, so it can be iterated without copying it.
+            for address in queue:
+                packet = queue[address][0][1]
+                if self.rate and self._get_global_bucket(now).delay(len(packet), now) > 0:
+                    # Keep the priority order: nothing may be sent until the global bucket refills.
+                    return None
+                if self.consume(address, len(packet), now):
+                    entry = self._remove(queue, address)
+                    if address in queue:
+                        # Let the other destinations take their turn.
+                        queue[address] = queue.pop(address)
+                    return entry, priority
+        return None
+
+    def record_sent(self, entry, now):
+        """
+        Record that a popped packet was sent.
+        """
+        self.sent_packets += 1
+        self.pacing_delay += now - entry[2]
+
+    def next_delay(self, now):
+        """
+        Get the time until the next queued packet may be sent, or None if the queue is empty.
+        """
+        delays = []
+        for queue in self._queues:
+            for address in queue:
+                size = len(queue[address][0][1])
+                delays.append(self._delay(address, size, now))
+                if self.rate and self._get_global_bucket(now).delay(size, now) > 0:
+                    # Nothing else will be sent before this packet, see pop().
+                    return min(delays)
+        return min(delays) if delays else None
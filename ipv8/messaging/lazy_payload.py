@@ -2,13 +2,141 @@ from __future__ import absolute_import
 
 import inspect
 
-from six import string_types
+from six import string_types, with_metaclass
 from six.moves import xrange
 
 from .payload import Payload
 
 
-class VariablePayload(Payload):
+def _is_generic(cls, name):
+    """
+    Check if the implementation of a method of a class is generic, i.e. not defined by the user.
+
+    :param cls: the VariablePayload subclass to check
+    :param name: the name of the method
+    :return: True if the method is the VariablePayload implementation or was generated for a superclass
+    """
+    for klass in cls.__mro__[1:]:
+        if name in vars(klass):
+            method = vars(klass)[name]
+            method = getattr(method, '__func__', method)
+            return klass is VariablePayload or getattr(method, 'generated', False)
+    return False
+
+
+def _has_old_style_init(cls):
+    """
+    Check if a class inherits from an old-style Payload with an ``__init__``, to which arguments need to be forwarded.
+    """
+    mro = cls.__mro__
+    return any('__init__' in vars(klass) for klass in mro[mro.index(VariablePayload) + 1:-1])
+
+
+def _compile(source, name, namespace):
+    """
+    Compile a generated method.
+
+    :param source: the source code of the method
+    :param name: the name of the method
+    :param namespace: the globals of the method
+    :return: the compiled function
+    """
+    exec(source, namespace)  # pylint: disable=W0122
+    function = namespace[name]
+    function.generated = True
+    return function
+
+
+class VariablePayloadMeta(type(Payload)):
+    """
+    Metaclass for VariablePayload.
+
+    When a VariablePayload subclass is defined, this metaclass adds its field names to the ``__slots__`` and
+    generates an ``__init__``, ``to_pack_list`` and ``from_unpack_list`` specialized for its fields.
+    Methods which are defined by the user are never replaced.
+    """
+
+    def __new__(mcs, name, bases, namespace):
+        if '__slots__' not in namespace:
+            namespace['__slots__'] = tuple(field for field in namespace.get('names', [])
+                                           if field not in namespace
+                                           and not any(hasattr(base, field) for base in bases))
+        cls = super(VariablePayloadMeta, mcs).__new__(mcs, name, bases, namespace)
+        if len(cls.names) < len(cls.format_list):
+            # The fields of this class are incomplete (e.g. a base class): keep the generic implementation.
+            return cls
+        if '__init__' not in namespace and _is_generic(cls, '__init__') and not _has_old_style_init(cls):
+            cls.__init__ = mcs.generate_init(cls)
+        if 'to_pack_list' not in namespace and _is_generic(cls, 'to_pack_list'):
+            cls.to_pack_list = mcs.generate_to_pack_list(cls)
+        if 'from_unpack_list' not in namespace and _is_generic(cls, 'from_unpack_list'):
+            cls.from_unpack_list = classmethod(mcs.generate_from_unpack_list(cls))
+        return cls
+
+    @staticmethod
+    def generate_init(cls):
+        """
+        Generate an ``__init__`` which directly assigns anonymous arguments to the fields of cls.
+
+        Named arguments, or an unexpected number of arguments, are left to ``VariablePayload.__init__``.
+        """
+        required = len(cls.format_list)
+        total = min(len(cls.names), required + len(cls.optional_format_list))
+        lines = ["def __init__(self, *args, **kwargs):",
+                 "    count = len(args)",
+                 "    if kwargs or count < %d or count > %d:" % (required, total),
+                 "        return generic_init(self, *args, **kwargs)"]
+        lines += ["    self.%s = args[%d]" % (cls.names[index], index) for index in xrange(required)]
+        for index in xrange(required, total):
+            lines += ["    if count == %d:" % index,
+                      "        return",
+                      "    self.%s = args[%d]" % (cls.names[index], index)]
+        return _compile('\n'.join(lines), '__init__', {'generic_init': VariablePayload.__dict__['__init__']})
+
+    @staticmethod
+    def generate_to_pack_list(cls):
+        """
+        Generate a ``to_pack_list`` with the formats and the custom pack rules of cls resolved in advance.
+        """
+        def field(index):
+            fmt = (cls.format_list + cls.optional_format_list)[index]
+            name = cls.names[index]
+            value = "self." + name
+            if hasattr(cls, "fix_pack_" + name):
+                value = "self.fix_pack_%s(%s)" % (name, value)
+            return "(%r, %s)" % (str(VariablePayload._to_packlist_fmt(fmt)), value)
+
+        required = len(cls.format_list)
+        lines = ["def to_pack_list(self):",
+                 "    out = [%s]" % ', '.join(field(index) for index in xrange(required))]
+        for index in xrange(required, min(len(cls.names), required + len(cls.optional_format_list))):
+            lines += ["    if not hasattr(self, %r):" % str(cls.names[index]),
+                      "        return out",
+                      "    out.append(%s)" % field(index)]
+        lines.append("    return out")
+        return _compile('\n'.join(lines), 'to_pack_list', {})
+
+    @staticmethod
+    def generate_from_unpack_list(cls):
+        """
+        Generate a ``from_unpack_list`` with the custom unpack rules of cls resolved in advance.
+        """
+        required = len(cls.format_list)
+        rules = [index for index, name in enumerate(cls.names) if hasattr(cls, "fix_unpack_" + name)]
+        lines = ["def from_unpack_list(cls, *args):"]
+        if rules:
+            lines.append("    args = list(args)")
+        for index in rules:
+            indent = "    "
+            if index >= required:
+                lines.append("    if len(args) > %d:" % index)
+                indent += "    "
+            lines.append(indent + "args[%d] = cls.fix_unpack_%s(args[%d])" % (index, cls.names[index], index))
+        lines.append("    return cls(*args)")
+        return _compile('\n'.join(lines), 'from_unpack_list', {})
+
+
+class VariablePayload(with_metaclass(VariablePayloadMeta, Payload)):
     """
     A Payload instance which mimics a struct. Useful for when you want a less verbose way to specify Payloads.
 
@@ -27,8 +155,15 @@ class VariablePayload(Payload):
     `fix_unpack_*` methods.
     Custom packing and unpacking rules can be useful for compression methods like socket.inet_aton, which you only
     want to apply when actually sending over the wire.
+
+    The fields of a VariablePayload are stored in ``__slots__``, and its ``__init__``, ``to_pack_list`` and
+    ``from_unpack_list`` are generated for its format when the class is defined (see VariablePayloadMeta).
+    The implementations below are used when the arguments cannot be handled by the generated methods.
     """
 
+    # Keep a (lazily allocated) __dict__, so subclasses can still set attributes which are not fields.
+    __slots__ = ('__dict__',)
+
     names = []
 
     def __init__(self, *args, **kwargs):
@@ -113,8 +248,9 @@ class VariablePayload(Payload):
         for _ in range(len(self.format_list)):
             out.append((self._to_packlist_fmt(self.format_list[index]), self._fix_pack(self.names[index])))
             index += 1
-        while index < len(self.names) and hasattr(self, self.names[index]):
+        while index < min(len(self.names), len(self.format_list) + len(self.optional_format_list)) \
+                and hasattr(self, self.names[index]):
             out.append((self._to_packlist_fmt(self.optional_format_list[index - len(self.format_list)]),
                         self._fix_pack(self.names[index])))
-        index += 1
+            index += 1
         return out
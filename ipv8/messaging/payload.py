@@ -25,10 +25,12 @@ def decode_connection_type(bit_0, bit_1):
 
 class Payload(Serializable):
 
+    __slots__ = ()
+
     def __str__(self):
         out = self.__class__.__name__
         for attribute in dir(self):
-            if not (attribute.startswith('_') or callable(getattr(self, attribute))) \
+            if not (attribute.startswith('_') or not hasattr(self, attribute) or callable(getattr(self, attribute))) \
                     and attribute not in ['format_list', 'names', 'optional_format_list']:
                 out += '\n| %s: %s' % (attribute, repr(getattr(self, attribute)))
         return out
@@ -3,8 +3,9 @@ from __future__ import division
 
 import abc
 from binascii import hexlify
+from functools import partial
 import itertools
-from struct import pack, unpack, unpack_from, Struct
+from struct import error, pack, pack_into, unpack_from, Struct
 import six
 import sys
 
@@ -13,6 +14,18 @@ class PackError(RuntimeError):
     pass
 
 
+def materialize(buffer):
+    """
+    Convert a (memoryview) buffer to the bytes it refers to.
+
+    :param buffer: the buffer to convert
+    :type buffer: bytes or memoryview
+    :return: the buffer contents
+    :rtype: bytes
+    """
+    return buffer.tobytes() if isinstance(buffer, memoryview) else buffer
+
+
 class NestedPayload(object):
     """
     This is a special type of format. Allowing for nested packing.
@@ -61,6 +74,23 @@ class NestedPayload(object):
         data, size = self.serializer.pack('varlenH', data)[0], size + 2
         return data, size
 
+    def get_size(self, serializable):
+        """
+        Get the size of a packed serializable.
+        """
+        return self.serializer.get_packed_size(serializable.to_pack_list()) + 2
+
+    def pack_into(self, buffer, offset, serializable):
+        """
+        Pack some serializable into a buffer, at a given offset.
+
+        :return: the size of the packed data
+        :rtype: int
+        """
+        end = self.serializer.pack_multiple_into(buffer, offset + 2, serializable.to_pack_list())
+        pack_into('>H', buffer, offset, end - offset - 2)
+        return end - offset
+
     def unpack_from(self, serializable_class, data, offset):
         """
         Unpack a Serializable using a class definition for some given data and offset.
@@ -75,48 +105,121 @@ class NestedPayload(object):
         :return: the output Serializable instance and the new offset delta
         :rtype: (Serializable, int)
         """
-        raw, size = self.serializer.unpack('varlenH', data, offset)
+        raw, size = self.serializer.get_packer_for('varlenH').unpack_buffer_from(data, offset)
         unpacked = self.serializer.ez_unpack_serializables([serializable_class], raw)
         # We only ever have 1 serializable, only return item 0.
         return unpacked[0], size
 
 
+# The bits of every byte value, MSB first (see Bits.decompose()).
+_BITS_TABLE = tuple(tuple((byte >> shift) & 1 for shift in range(7, -1, -1)) for byte in range(256))
+# The packed form of every byte value.
+_BYTES_TABLE = tuple(pack('>B', byte) for byte in range(256))
+
+
 class Bits(object):
 
-    def pack(self, bit_7=0, bit_6=0, bit_5=0, bit_4=0, bit_3=0, bit_2=0, bit_1=0, bit_0=0):
+    def compose(self, bit_7=0, bit_6=0, bit_5=0, bit_4=0, bit_3=0, bit_2=0, bit_1=0, bit_0=0):
         """
-        Pack multiple bits into a single byte.
+        Compose multiple bits into the integer value of a single byte.
 
         :param bit_*: bit at position *
         :type bit_*: True or False (or anything that maps to it in an if-statement)
         """
-        byte = 0
-        byte |= 0x80 if bit_7 else 0x00
-        byte |= 0x40 if bit_6 else 0x00
-        byte |= 0x20 if bit_5 else 0x00
-        byte |= 0x10 if bit_4 else 0x00
-        byte |= 0x08 if bit_3 else 0x00
-        byte |= 0x04 if bit_2 else 0x00
-        byte |= 0x02 if bit_1 else 0x00
-        byte |= 0x01 if bit_0 else 0x00
-        return pack('>B', byte), 1
+        return ((0x80 if bit_7 else 0x00) | (0x40 if bit_6 else 0x00) | (0x20 if bit_5 else 0x00)
+                | (0x10 if bit_4 else 0x00) | (0x08 if bit_3 else 0x00) | (0x04 if bit_2 else 0x00)
+                | (0x02 if bit_1 else 0x00) | (0x01 if bit_0 else 0x00))
+
+    def decompose(self, byte):
+        """
+        Decompose the integer value of a single byte into multiple bits.
+
+        :returns: tuple of 8 values in [0, 1] MSB first
+        """
+        return _BITS_TABLE[byte]
+
+    def pack(self, *bits):
+        """
+        Pack multiple bits into a single byte.
+
+        :param bits: the bits to pack, MSB first (see compose())
+        """
+        return _BYTES_TABLE[self.compose(*bits)], 1
 
     def unpack_from(self, data, offset):
         """
         Unpack multiple bits from a single byte.
 
-        :returns: list of 8 values in [0, 1] MSB first
+        :returns: tuple of 8 values in [0, 1] MSB first
         """
-        byte, = unpack('>B', data[offset:offset + 1])
-        bit_7 = 1 if 0x80 & byte else 0
-        bit_6 = 1 if 0x40 & byte else 0
-        bit_5 = 1 if 0x20 & byte else 0
-        bit_4 = 1 if 0x10 & byte else 0
-        bit_3 = 1 if 0x08 & byte else 0
-        bit_2 = 1 if 0x04 & byte else 0
-        bit_1 = 1 if 0x02 & byte else 0
-        bit_0 = 1 if 0x01 & byte else 0
-        return [bit_7, bit_6, bit_5, bit_4, bit_3, bit_2, bit_1, bit_0], 1
+        try:
+            byte = data[offset]
+        except IndexError:
+            raise error("unpack requires a buffer of 1 bytes")
+        return _BITS_TABLE[byte if isinstance(byte, int) else ord(byte)], 1
+
+
+class Flags(object):
+    """
+    Pack/unpack up to 64 named boolean fields as a single bitmask.
+
+    The first name maps to the least significant bit. The bitmask is stored in the smallest unsigned big-endian
+    integer that fits all of the names. Bits which do not map to a name are ignored when unpacking, so flags can be
+    appended to a format without breaking older peers.
+    """
+
+    def __init__(self, names):
+        """
+        Create a new flags format.
+
+        :param names: the names of the flags, least significant bit first
+        :raises ValueError: if no names or more than 64 names are given
+        """
+        super(Flags, self).__init__()
+        if not 0 < len(names) <= 64:
+            raise ValueError("Flags require 1 to 64 names, got %d" % len(names))
+        self.names = tuple(names)
+        self.masks = tuple((name, 1 << index) for index, name in enumerate(self.names))
+        self._mask_for = dict(self.masks)
+        self.format = 'B' if len(names) <= 8 else 'H' if len(names) <= 16 else 'I' if len(names) <= 32 else 'Q'
+        self.struct = Struct('>' + self.format)
+        self.size = self.struct.size
+
+    def compose(self, flags):
+        """
+        Compose named booleans into a bitmask.
+
+        :param flags: the mapping of flag names to booleans, missing names are False
+        :type flags: dict
+        :raises KeyError: if a name is not known to this format
+        """
+        mask_for = self._mask_for
+        value = 0
+        for name, enabled in flags.items():
+            if enabled:
+                value |= mask_for[name]
+        return value
+
+    def decompose(self, value):
+        """
+        Decompose a bitmask into named booleans.
+
+        :returns: the dict of all flag names to booleans
+        """
+        return {name: (value & mask) != 0 for name, mask in self.masks}
+
+    def pack(self, flags):
+        return self.struct.pack(self.compose(flags)), self.size
+
+    def get_size(self, flags):
+        return self.size
+
+    def pack_into(self, buffer, offset, flags):
+        self.struct.pack_into(buffer, offset, self.compose(flags))
+        return self.size
+
+    def unpack_from(self, data, offset=0):
+        return self.decompose(self.struct.unpack_from(data, offset)[0]), self.size
 
 
 class Raw(object):
@@ -132,8 +235,19 @@ class Raw(object):
             size += len(piece)
         return out, size
 
+    def get_size(self, *data):
+        return sum(map(len, data))
+
+    def pack_into(self, buffer, offset, *data):
+        start = offset
+        for piece in data:
+            end = offset + len(piece)
+            buffer[offset:end] = piece
+            offset = end
+        return offset - start
+
     def unpack_from(self, data, offset=0):
-        out = data[offset:]
+        out = materialize(data[offset:])
         return out, len(out)
 
 
@@ -146,20 +260,45 @@ class VarLen(object):
         super(VarLen, self).__init__()
         self.format = format
         self.format_size = Struct(self.format).size
+        self.length_format = '>%s' % self.format
+        self.length_struct = Struct(self.length_format)
         self.base = base
 
     def pack(self, *data):
-        raw = b''.join(data)
-        length = len(raw) // self.base
-        size = self.format_size + len(raw)
-        return pack('>%s%ds' % (self.format, len(raw)), length, raw), size
+        raw = data[0] if len(data) == 1 else b''.join(data)
+        return self.length_struct.pack(len(raw) // self.base) + raw, self.format_size + len(raw)
 
-    def unpack_from(self, data, offset=0):
-        length, = unpack_from('>%s' % self.format, data, offset)
+    def get_size(self, *data):
+        return self.format_size + sum(map(len, data))
+
+    def pack_into(self, buffer, offset, *data):
+        start = offset + self.format_size
+        end = start
+        for piece in data:
+            offset_piece = end
+            end += len(piece)
+            buffer[offset_piece:end] = piece
+        pack_into(self.length_format, buffer, offset, (end - start) // self.base)
+        return end - offset
+
+    def unpack_buffer_from(self, data, offset=0):
+        """
+        Unpack the encoded data as a slice of the given buffer.
+
+        For memoryview buffers this does not copy the data.
+        """
+        length, = unpack_from(self.length_format, data, offset)
         length *= self.base
-        out, = unpack_from('>%ds' % length, data, offset + self.format_size)
+        start = offset + self.format_size
+        out = data[start:start + length]
+        if len(out) != length:
+            raise error("unpack requires a buffer of %d bytes" % (self.format_size + length))
         return out, self.format_size + length
 
+    def unpack_from(self, data, offset=0):
+        out, size = self.unpack_buffer_from(data, offset)
+        return materialize(out), size
+
 
 class DefaultStruct(Struct):
 
@@ -170,6 +309,13 @@ class DefaultStruct(Struct):
     def pack(self, *data):
         return super(DefaultStruct, self).pack(*data), self.size
 
+    def get_size(self, *data):
+        return self.size
+
+    def pack_into(self, buffer, offset, *data):
+        super(DefaultStruct, self).pack_into(buffer, offset, *data)
+        return self.size
+
     def unpack_from(self, buffer, offset=0):
         out = super(DefaultStruct, self).unpack_from(buffer, offset)
         if self.single_value:
@@ -178,10 +324,217 @@ class DefaultStruct(Struct):
             return list(out), self.size
 
 
+# The kinds of values a fixed-size field contributes to an unpack list.
+_SINGLE_VALUE = 0
+_MULTI_VALUE = 1
+_BITS_VALUE = 2
+_FLAGS_VALUE = 3
+
+
+class SerializationPlan(object):
+    """
+    A compiled (un)packing plan for a fixed list of formats.
+
+    Adjacent fixed-size big-endian formats are merged into a single Struct, which is (un)packed in one call.
+    All other formats (variable length data, nested payloads, custom byte orders) fall back to their own packer.
+    The produced data is byte-identical to (un)packing each of the formats separately.
+    """
+
+    def __init__(self, serializer, formats, optional_formats=()):
+        """
+        Compile a plan for a list of formats.
+
+        :param serializer: the Serializer to get the packers from
+        :type serializer: Serializer
+        :param formats: the required formats
+        :param optional_formats: the formats which may be omitted at the end of the data
+        :raises KeyError: if one of the formats is not known to the serializer
+        """
+        super(SerializationPlan, self).__init__()
+        self.steps = []
+        self.pack_steps = []
+        self.variable_steps = []
+        self.fixed_size = 0
+        formats = list(formats) + list(optional_formats)
+        required_length = len(formats) - len(optional_formats)
+
+        group_start = 0
+        group = []
+        for index, format in enumerate(formats):
+            optional = index >= required_length
+            packer = serializer.get_packer_for(format) if format in serializer.get_available_formats() else None
+            field = self._get_fixed_field(packer) if packer else None
+            if field is None or optional:
+                self._add_group(group_start, group)
+                group = []
+            if field is None:
+                if packer:
+                    unpack_fn = packer.unpack_from
+                elif isinstance(format, type) and issubclass(format, Serializable):
+                    unpack_fn = partial(serializer.get_packer_for('payload').unpack_from, format)
+                else:
+                    raise KeyError(format)
+                self.steps.append((index, index + 1, optional, None, None, False, packer, unpack_fn))
+                self.pack_steps.append((index, index + 1, None, None, packer))
+                self.variable_steps.append((index, packer))
+                group_start = index + 1
+            elif optional:
+                self._add_group(index, [field], optional=True)
+                group_start = index + 1
+            else:
+                group.append(field)
+        self._add_group(group_start, group)
+
+    @staticmethod
+    def _get_fixed_field(packer):
+        """
+        Get the mergeable struct format, value kind and value count for a packer.
+
+        :return: the (format, kind, count, packer) tuple or None if the packer cannot be merged
+        """
+        if isinstance(packer, Bits):
+            return 'B', _BITS_VALUE, 1, packer
+        if isinstance(packer, Flags):
+            return packer.format, _FLAGS_VALUE, 1, packer
+        if isinstance(packer, DefaultStruct):
+            format = packer.format if isinstance(packer.format, str) else packer.format.decode('utf-8')
+            if format[:1] in ('>', '!'):
+                count = len(Struct.unpack(packer, b'\x00' * packer.size))
+                return format[1:], _SINGLE_VALUE if packer.single_value else _MULTI_VALUE, count, packer
+        return None
+
+    def _add_group(self, start, group, optional=False):
+        """
+        Merge a group of fixed-size fields into a single step.
+        """
+        if not group:
+            return
+        struct = Struct('>' + ''.join(field[0] for field in group))
+        fields = tuple((kind, count, packer) for _, kind, count, packer in group)
+        flat = all(kind == _SINGLE_VALUE for kind, _, _ in fields)
+        has_bits = any(kind in (_BITS_VALUE, _FLAGS_VALUE) for kind, _, _ in fields)
+        self.fixed_size += struct.size
+        self.steps.append((start, start + len(group), optional, struct, fields, flat, None, None))
+        self.pack_steps.append((start, start + len(group), struct, fields if has_bits else None, None))
+
+    def _get_struct_args(self, pack_list, start, end, bits_fields):
+        """
+        Get the arguments of a merged Struct from the packable tuples it covers.
+        """
+        args = []
+        if bits_fields is None:
+            for packable in pack_list[start:end]:
+                args.extend(packable[1:])
+        else:
+            for packable, (kind, _, packer) in zip(pack_list[start:end], bits_fields):
+                if kind in (_BITS_VALUE, _FLAGS_VALUE):
+                    args.append(packer.compose(*packable[1:]))
+                else:
+                    args.extend(packable[1:])
+        return args
+
+    def get_size(self, pack_list):
+        """
+        Get the size of a list of packable tuples, whose formats must match the formats of this plan.
+
+        :param pack_list: the list of packable tuples, (format, arg1, arg2, .., argn)
+        :return: the size of the packed data
+        :rtype: int
+        """
+        size = self.fixed_size
+        for index, packer in self.variable_steps:
+            size += packer.get_size(*pack_list[index][1:])
+        return size
+
+    def pack(self, pack_list):
+        """
+        Pack a list of packable tuples, whose formats must match the formats of this plan.
+
+        :param pack_list: the list of packable tuples, (format, arg1, arg2, .., argn)
+        :return: the packed data
+        :rtype: bytes
+        """
+        out = []
+        for start, end, struct, bits_fields, packer in self.pack_steps:
+            if struct is None:
+                out.append(packer.pack(*pack_list[start][1:])[0])
+            elif end - start == 1 and bits_fields is None:
+                out.append(struct.pack(*pack_list[start][1:]))
+            else:
+                out.append(struct.pack(*self._get_struct_args(pack_list, start, end, bits_fields)))
+        return b''.join(out)
+
+    def pack_into(self, buffer, offset, pack_list):
+        """
+        Pack a list of packable tuples into a buffer, which must be large enough to hold them (see get_size()).
+
+        :param buffer: the writable buffer to pack into
+        :type buffer: bytearray
+        :param offset: the offset in the buffer to start writing at
+        :param pack_list: the list of packable tuples, (format, arg1, arg2, .., argn)
+        :return: the offset after the packed data
+        :rtype: int
+        """
+        for start, end, struct, bits_fields, packer in self.pack_steps:
+            if struct is None:
+                offset += packer.pack_into(buffer, offset, *pack_list[start][1:])
+            else:
+                struct.pack_into(buffer, offset, *self._get_struct_args(pack_list, start, end, bits_fields))
+                offset += struct.size
+        return offset
+
+    def unpack(self, data, offset=0):
+        """
+        Unpack the formats of this plan from some data.
+
+        :param data: the data to unpack from
+        :param offset: the offset in the data to start unpacking from
+        :return: the list of unpacked values and the offset after the unpacked data
+        """
+        out = []
+        data_length = len(data)
+        for _, _, optional, struct, fields, flat, _, unpack_fn in self.steps:
+            if optional and offset >= data_length:
+                # We can perform a clean break if we are in the optional set
+                break
+            if struct is None:
+                unpacked, unpacked_size = unpack_fn(data, offset)
+                out.append(unpacked)
+                offset += unpacked_size
+                continue
+            values = struct.unpack_from(data, offset)
+            offset += struct.size
+            if flat:
+                out.extend(values)
+                continue
+            index = 0
+            for kind, count, packer in fields:
+                if kind == _SINGLE_VALUE:
+                    out.append(values[index])
+                elif kind == _MULTI_VALUE:
+                    out.append(list(values[index:index + count]))
+                elif kind == _FLAGS_VALUE:
+                    out.append(packer.decompose(values[index]))
+                else:
+                    out.extend(packer.decompose(values[index]))
+                index += count
+        return out, offset
+
+
 class Serializer(object):
 
-    def __init__(self):
+    def __init__(self, memoryview_mode=False):
+        """
+        Create a new Serializer.
+
+        In memoryview mode, unpacking does not copy the data it walks over. Only the fields handed to the
+        Serializables are materialized as bytes, all remainders are returned as memoryview slices of the input.
+
+        :param memoryview_mode: whether to unpack from memoryviews of the input data
+        :type memoryview_mode: bool
+        """
         super(Serializer, self).__init__()
+        self.memoryview_mode = memoryview_mode
         self._packers = {
             '?': DefaultStruct(">?", True),
             'B': DefaultStruct(">B", True),
@@ -215,6 +568,9 @@ class Serializer(object):
             'doublevarlenH': VarLen('H'),
             'payload': NestedPayload(self)
         }
+        # Compiled SerializationPlans per Serializable class (unpacking) and per tuple of formats (packing)
+        self._unpack_plans = {}
+        self._pack_plans = {}
 
     def get_available_formats(self):
         """
@@ -236,6 +592,50 @@ class Serializer(object):
         :param format: the format to use for it
         """
         self._packers.update({name: DefaultStruct(format)})
+        self._unpack_plans.clear()
+        self._pack_plans.clear()
+
+    def add_flags_format(self, name, flag_names):
+        """
+        Register a new named flags format (see Flags) with a certain name.
+
+        A flags field is packed from a dict of flag names to booleans and unpacks to such a dict.
+
+        :param name: the name to register
+        :param flag_names: the names of the flags, at most 64, least significant bit first
+        """
+        self._packers.update({name: Flags(flag_names)})
+        self._unpack_plans.clear()
+        self._pack_plans.clear()
+
+    def get_pack_plan(self, formats):
+        """
+        Get the compiled SerializationPlan for packing a tuple of formats.
+
+        :param formats: the formats to pack
+        :type formats: tuple
+        :return: the (cached) plan for these formats
+        :rtype: SerializationPlan
+        """
+        plan = self._pack_plans.get(formats)
+        if plan is None:
+            plan = SerializationPlan(self, formats)
+            self._pack_plans[formats] = plan
+        return plan
+
+    def get_unpack_plan(self, serializable):
+        """
+        Get the compiled SerializationPlan for unpacking a Serializable class.
+
+        :param serializable: the Serializable class to get the plan for
+        :return: the (cached) plan for this class
+        :rtype: SerializationPlan
+        """
+        plan = self._unpack_plans.get(serializable)
+        if plan is None:
+            plan = SerializationPlan(self, serializable.format_list, serializable.optional_format_list)
+            self._unpack_plans[serializable] = plan
+        return plan
 
     def pack(self, format, *data):
         """
@@ -253,6 +653,81 @@ class Serializer(object):
 
         Each of the tuples in the pack_list are built as (format, arg1, arg2, .., argn)
 
+        :param pack_list: the list of packable tuples
+        :returns: (packed, size)
+        """
+        try:
+            packed = self.get_pack_plan(tuple([packable[0] for packable in pack_list])).pack(pack_list)
+        except Exception:
+            # Let the field-by-field implementation report what went wrong.
+            return self._pack_multiple_fields(pack_list)
+        return packed, len(packed)
+
+    def get_packed_size(self, pack_list):
+        """
+        Get the size of multiple data tuples, once serialized.
+
+        :param pack_list: the list of packable tuples
+        :returns: the serialized size
+        :rtype: int
+        """
+        try:
+            return self.get_pack_plan(tuple([packable[0] for packable in pack_list])).get_size(pack_list)
+        except Exception:
+            return self._pack_multiple_fields(pack_list)[1]
+
+    def pack_multiple_into(self, buffer, offset, pack_list):
+        """
+        Serialize multiple data tuples into a preallocated buffer (see get_packed_size()).
+
+        :param buffer: the writable buffer to pack into
+        :type buffer: bytearray
+        :param offset: the offset in the buffer to start writing at
+        :param pack_list: the list of packable tuples
+        :returns: the offset after the serialized data
+        :rtype: int
+        """
+        try:
+            return self.get_pack_plan(tuple([packable[0] for packable in pack_list])).pack_into(buffer, offset,
+                                                                                                pack_list)
+        except Exception:
+            # Let the field-by-field implementation report what went wrong.
+            packed, size = self._pack_multiple_fields(pack_list)
+            buffer[offset:offset + size] = packed
+            return offset + size
+
+    def pack_multiple_lists(self, pack_lists, prefix=b'', reserve=0):
+        """
+        Serialize multiple lists of data tuples into a single preallocated buffer.
+
+        :param pack_lists: the lists of packable tuples
+        :param prefix: the data to start the buffer with
+        :param reserve: the number of bytes to reserve at the end of the buffer
+        :returns: the buffer and the offset of its reserved bytes
+        :rtype: (bytearray, int)
+        """
+        try:
+            plans = [self.get_pack_plan(tuple([packable[0] for packable in pack_list])) for pack_list in pack_lists]
+            size = len(prefix) + reserve
+            for plan, pack_list in zip(plans, pack_lists):
+                size += plan.get_size(pack_list)
+            buffer = bytearray(size)
+            offset = len(prefix)
+            buffer[:offset] = prefix
+            for plan, pack_list in zip(plans, pack_lists):
+                offset = plan.pack_into(buffer, offset, pack_list)
+        except Exception:
+            # Let the field-by-field implementation report what went wrong.
+            packed = prefix + b''.join([self._pack_multiple_fields(pack_list)[0] for pack_list in pack_lists])
+            buffer = bytearray(len(packed) + reserve)
+            offset = len(packed)
+            buffer[:offset] = packed
+        return buffer, offset
+
+    def _pack_multiple_fields(self, pack_list):
+        """
+        Serialize multiple data tuples, one field at a time.
+
         :param pack_list: the list of packable tuples
         :returns: (packed, size)
         """
@@ -330,48 +805,55 @@ class Serializer(object):
             index += 1
         return out, current_offset
 
-    def unpack_to_serializables(self, serializables, data):
+    def unpack_to_serializables(self, serializables, data, offset=0):
         """
         Use the formats specified in a serializable object and unpack to it.
 
         :param serializables: the serializable classes to get the format from and unpack to
         :param data: the data to unpack from
+        :param offset: the offset in the data to start unpacking from
         :except PackError: if the data could not be fit into the specified serializables
         :return: the list of Serializable instances, with the list of remaining data as the last element
-        :rtype: [Serializable] + [bytes or str]
+        :rtype: [Serializable] + [bytes or str or memoryview]
         """
-        offset = 0
+        if self.memoryview_mode and not isinstance(data, memoryview):
+            data = memoryview(data)
         out = []
         for serializable in serializables:
             try:
-                unpack_list, offset = self.unpack_multiple(serializable.format_list, data,
-                                                           serializable.optional_format_list, offset)
-            except Exception as e:
-                six.reraise(PackError, PackError("Failed to unserialize %s\n%s: %s" % (serializable.__name__,
-                                                                                       type(e).__name__, str(e))),
-                            sys.exc_info()[2])
+                unpack_list, offset = self.get_unpack_plan(serializable).unpack(data, offset)
+            except Exception:
+                # Let the field-by-field implementation report what went wrong.
+                try:
+                    unpack_list, offset = self.unpack_multiple(serializable.format_list, data,
+                                                               serializable.optional_format_list, offset)
+                except Exception as e:
+                    six.reraise(PackError, PackError("Failed to unserialize %s\n%s: %s" % (serializable.__name__,
+                                                                                           type(e).__name__, str(e))),
+                                sys.exc_info()[2])
             out.append(serializable.from_unpack_list(*unpack_list))
         out.append(data[offset:])
         return out
 
-    def ez_unpack_serializables(self, serializables, data):
+    def ez_unpack_serializables(self, serializables, data, offset=0):
         """
         Use the formats specified in a serializable object and unpack to it.
 
         :param serializables: the serializable classes to get the format from and unpack to
         :param data: the data to unpack from
+        :param offset: the offset in the data to start unpacking from
         :except PackError: if the data could not be fit into the specified serializables
         :except PackError: if not all of the data was consumed when parsing the serializables
         :return: the list of Serializable instances
         :rtype: [Serializable]
         """
-        unpacked = self.unpack_to_serializables(serializables, data)
+        unpacked = self.unpack_to_serializables(serializables, data, offset)
         unknown_data = unpacked.pop()
         if unknown_data:
             raise PackError("Incoming packet %s (%s) has extra data: (%s)" %
                             (str([serializable_class.__name__ for serializable_class in serializables]),
-                             hexlify(data),
-                             hexlify(unknown_data)))
+                             hexlify(materialize(data[offset:])),
+                             hexlify(materialize(unknown_data))))
         return unpacked
 
 
@@ -380,6 +862,8 @@ class Serializable(six.with_metaclass(abc.ABCMeta, object)):
     Interface for serializable objects.
     """
 
+    __slots__ = ()
+
     format_list = []
     optional_format_list = []
 
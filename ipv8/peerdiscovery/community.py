@@ -8,13 +8,11 @@ from .churn import DiscoveryStrategy, RandomChurn
 from .payload import DiscoveryIntroductionRequestPayload, PingPayload, PongPayload, SimilarityRequestPayload, \
     SimilarityResponsePayload
 from ..community import Community, DEFAULT_MAX_PEERS
-from ..keyvault.crypto import default_eccrypto
 from ..lazy_community import PacketDecodingError, lazy_wrapper, lazy_wrapper_unsigned
 from ..messaging.payload import IntroductionRequestPayload
 from ..messaging.payload_headers import BinMemberAuthenticationPayload, GlobalTimeDistributionPayload
 from ..messaging.serialization import PackError
 from ..peer import Peer
-from ..util import cast_to_bin
 
 
 class PeriodicSimilarity(DiscoveryStrategy):
@@ -122,11 +120,7 @@ class DiscoveryCommunity(Community):
                 if overlay.my_peer == peer]
 
     def custom_pack(self, peer, msg_num, format_list_list):
-        packet = self._prefix + cast_to_bin(chr(msg_num))
-        for format_list in format_list_list:
-            packet += self.serializer.pack_multiple(format_list)[0]
-        packet += default_eccrypto.create_signature(peer.key, packet)
-        return packet
+        return self._ez_pack(self._prefix, msg_num, format_list_list, key=peer.key)
 
     def create_similarity_request(self, peer):
         global_time = self.claim_global_time()
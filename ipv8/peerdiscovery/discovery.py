@@ -62,6 +62,7 @@ class RandomWalk(DiscoveryStrategy):
                     to_remove.append(node)
             for node in to_remove:
                 del self.intro_timeouts[node]
+                self.overlay.network.register_walk_failure(node)
                 if not self.overlay.network.get_verified_by_address(node):
                     self.overlay.network.remove_by_address(node)
             # Slow down the walk if a target_interval has been specified
@@ -71,12 +72,10 @@ class RandomWalk(DiscoveryStrategy):
             if self.window_size and self.window_size > 0 and len(self.intro_timeouts) >= self.window_size:
                 return
             # Take step
-            known = self.overlay.network.get_walkable_addresses()
-            available = list(set(known) - set(self.intro_timeouts.keys()))
+            peer = self.overlay.network.get_random_walkable_address(exclude=self.intro_timeouts)
 
             # We can get stuck in an infinite loop of unreachable peers if we never contact the tracker again
-            if available and randint(0, 255) >= self.reset_chance:
-                peer = choice(available)
+            if peer and randint(0, 255) >= self.reset_chance:
                 self.overlay.walk_to(peer)
                 self.intro_timeouts[peer] = time()
             else:
@@ -0,0 +1,359 @@
+"""
+A binary, versioned snapshot of the whole Network graph.
+
+A snapshot stores all known addresses with their introducer, service and time of discovery, and all verified peers
+with their public key, address, last response time and services. All values are big-endian:
+
+- the header: magic, version, creation time and the number of services, addresses and peers
+- the service table: every distinct service, prefixed with its length
+- the address records: fixed size, so any address can be read directly from a memory mapped file
+- the peer records: the fixed size part, followed by the public key and the indices of the services in the table
+
+Introducers are stored as 20 zero bytes and services as index 0xFFFF if they are unknown.
+"""
+from __future__ import absolute_import
+
+import mmap
+from itertools import chain, islice
+from os.path import getsize, isfile
+from socket import error as socket_error
+from socket import inet_aton, inet_ntoa
+from struct import Struct
+from struct import error as struct_error
+from threading import Lock
+from time import time
+
+from six.moves import xrange
+from twisted.internet.defer import Deferred, succeed
+from twisted.internet.task import LoopingCall
+
+from ..taskmanager import TaskManager
+from ..util import cast_to_chr
+
+try:
+    from os import replace
+except ImportError:
+    # Python 2 can not atomically replace an existing file on Windows
+    from os import rename as replace
+
+SNAPSHOT_MAGIC = b"IPv8"
+SNAPSHOT_VERSION = 1
+# The default number of seconds between writing two snapshots
+SNAPSHOT_INTERVAL = 60.0
+# The number of records to load into the network per reactor iteration
+LOAD_CHUNK_SIZE = 1000
+
+HEADER = Struct(">4sBdIII")
+SERVICE_LENGTH = Struct(">B")
+ADDRESS_RECORD = Struct(">6s20sHd")
+PEER_RECORD = Struct(">6sdHH")
+SERVICE_INDEX = Struct(">H")
+ADDRESS = Struct(">4sH")
+
+NO_INTRODUCER = b"\x00" * 20
+NO_SERVICE = 0xFFFF
+
+
+def pack_address(address):
+    """
+    Pack an (IPv4, port) address into 6 bytes.
+
+    :return: the packed address or None if it is not a valid address
+    """
+    ip, port = address
+    try:
+        return ADDRESS.pack(inet_aton(cast_to_chr(ip) if isinstance(ip, bytes) else ip), port)
+    except (socket_error, struct_error):
+        return None
+
+
+def unpack_address(packed):
+    ip, port = ADDRESS.unpack(packed)
+    return inet_ntoa(ip), port
+
+
+def serialize_graph(addresses, peers, created=None):
+    """
+    Serialize a Network graph to a snapshot.
+
+    Addresses and peers which are not valid IPv4 addresses are skipped.
+
+    :param addresses: the (address, (introducer_mid, service, discovered)) pairs of all known addresses
+    :param peers: the (public_key_bin, address, last_response, services) tuples of all verified peers
+    :param created: the creation time of the snapshot, by default the current time
+    :return: the snapshot (bytes)
+    """
+    service_indices = {}
+
+    def get_service_index(service):
+        if not service or len(service) > 0xFF:
+            return NO_SERVICE
+        if service not in service_indices and len(service_indices) < NO_SERVICE:
+            service_indices[service] = len(service_indices)
+        return service_indices.get(service, NO_SERVICE)
+
+    address_records = []
+    for address, (introducer_mid, service, discovered) in addresses:
+        packed = pack_address(address)
+        if packed:
+            address_records.append(ADDRESS_RECORD.pack(packed, introducer_mid or NO_INTRODUCER,
+                                                       get_service_index(service), discovered))
+    peer_records = []
+    for public_key_bin, address, last_response, services in peers:
+        packed = pack_address(address)
+        if not packed or address == ("0.0.0.0", 0):
+            continue
+        indices = [index for index in (get_service_index(service) for service in services) if index != NO_SERVICE]
+        peer_records.append(PEER_RECORD.pack(packed, last_response, len(public_key_bin), len(indices))
+                            + public_key_bin + b"".join(SERVICE_INDEX.pack(index) for index in indices))
+
+    services = sorted(service_indices, key=service_indices.get)
+    return b"".join([HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, time() if created is None else created,
+                                 len(services), len(address_records), len(peer_records))]
+                    + [SERVICE_LENGTH.pack(len(service)) + service for service in services]
+                    + address_records + peer_records)
+
+
+class GraphSnapshot(object):
+    """
+    A snapshot of a Network graph, of which the records are only read when they are requested.
+
+    The snapshot data can be bytes or a memory mapped file, see open_graph_snapshot().
+    """
+
+    def __init__(self, data):
+        """
+        Read the header and service table of a snapshot.
+
+        :param data: the snapshot (bytes or mmap)
+        :raises ValueError: if the data is not a snapshot of a supported version
+        """
+        super(GraphSnapshot, self).__init__()
+        self.data = data
+        magic, version, self.created, service_count, self.address_count, self.peer_count = self._unpack(HEADER, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Data is not a network snapshot")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError("Unsupported network snapshot version %d" % version)
+        self.services = []
+        offset = HEADER.size
+        for _ in xrange(service_count):
+            length, = self._unpack(SERVICE_LENGTH, offset)
+            offset += SERVICE_LENGTH.size
+            self.services.append(self._read(offset, length))
+            offset += length
+        self.addresses_offset = offset
+        self.peers_offset = offset + self.address_count * ADDRESS_RECORD.size
+        if self.peers_offset > len(data):
+            raise ValueError("Network snapshot is truncated")
+
+    def _unpack(self, structure, offset):
+        if offset + structure.size > len(self.data):
+            raise ValueError("Network snapshot is truncated")
+        return structure.unpack_from(self.data, offset)
+
+    def _read(self, offset, length):
+        if offset + length > len(self.data):
+            raise ValueError("Network snapshot is truncated")
+        return self.data[offset:offset + length]
+
+    def _get_service(self, index):
+        if index >= len(self.services):
+            raise ValueError("Network snapshot refers to unknown service %d" % index)
+        return self.services[index]
+
+    def get_address(self, index):
+        """
+        Read a single address record.
+
+        :param index: the index of the address record
+        :return: the (address, introducer_mid, service, discovered) of the address record
+        """
+        packed, introducer_mid, service_index, discovered = self._unpack(
+            ADDRESS_RECORD, self.addresses_offset + index * ADDRESS_RECORD.size)
+        return (unpack_address(packed),
+                '' if introducer_mid == NO_INTRODUCER else introducer_mid,
+                None if service_index == NO_SERVICE else self._get_service(service_index),
+                discovered)
+
+    def get_addresses(self):
+        """
+        Iterate over all address records.
+
+        :return: a generator of (address, introducer_mid, service, discovered) tuples
+        """
+        for index in xrange(self.address_count):
+            yield self.get_address(index)
+
+    def get_peers(self):
+        """
+        Iterate over all peer records.
+
+        :return: a generator of (public_key_bin, address, last_response, services) tuples
+        """
+        offset = self.peers_offset
+        for _ in xrange(self.peer_count):
+            packed, last_response, key_length, service_count = self._unpack(PEER_RECORD, offset)
+            offset += PEER_RECORD.size
+            public_key_bin = self._read(offset, key_length)
+            offset += key_length
+            services = []
+            for _ in xrange(service_count):
+                services.append(self._get_service(self._unpack(SERVICE_INDEX, offset)[0]))
+                offset += SERVICE_INDEX.size
+            yield public_key_bin, unpack_address(packed), last_response, services
+
+    def close(self):
+        """
+        Close the memory mapped file of this snapshot, if any.
+        """
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_chunks(records, size=LOAD_CHUNK_SIZE):
+    """
+    Group records into lists of at most size records, reading the next records only when the next list is requested.
+    """
+    records = iter(records)
+    chunk = list(islice(records, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(records, size))
+
+
+def open_graph_snapshot(file_path):
+    """
+    Open a snapshot file, without reading its records into memory.
+
+    :param file_path: the path of the snapshot file
+    :return: the GraphSnapshot, which should be closed after use
+    :raises ValueError: if the file is not a snapshot of a supported version
+    """
+    if not getsize(file_path):
+        raise ValueError("Network snapshot is empty")
+    with open(file_path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return GraphSnapshot(data)
+    except ValueError:
+        data.close()
+        raise
+
+
+class NetworkSnapshotter(TaskManager):
+    """
+    Loads the Network graph from a snapshot file and periodically writes it back, on a thread of the scheduler.
+
+    The snapshot is loaded in chunks of chunk_size records, one chunk per reactor iteration, so loading a large
+    snapshot does not block the reactor. The addresses are loaded first, so the walk can start from them while the
+    services of the peers are still being loaded.
+    """
+
+    def __init__(self, network, file_path, interval=SNAPSHOT_INTERVAL):
+        """
+        Create a new snapshotter.
+
+        :param network: the Network to snapshot
+        :param file_path: the path of the snapshot file
+        :param interval: the number of seconds between writing two snapshots
+        """
+        super(NetworkSnapshotter, self).__init__()
+        self.network = network
+        self.file_path = file_path
+        self.interval = interval
+        self.write_lock = Lock()
+        self.chunk_size = LOAD_CHUNK_SIZE
+        # Whether the network holds only part of the snapshot file, which should then not be overwritten
+        self.partial = False
+        # The open snapshot and the Deferred of the load in progress
+        self._loading = None
+
+    def start(self):
+        """
+        Start writing snapshots every interval.
+        """
+        self.register_task("write_snapshot", LoopingCall(self.write_in_thread)).start(self.interval, False)
+
+    def load(self):
+        """
+        Load the snapshot file into the network, if it exists.
+
+        :return: a Deferred that fires with whether the snapshot was loaded
+        """
+        if not isfile(self.file_path):
+            return succeed(False)
+        try:
+            snapshot = open_graph_snapshot(self.file_path)
+        except (IOError, OSError, ValueError) as e:
+            self._logger.warning("Failed to load network snapshot %s: %s", self.file_path, e)
+            return succeed(False)
+        self.partial = True
+        self._loading = (snapshot, Deferred())
+        chunks = chain(((self.network.load_graph_addresses, chunk)
+                        for chunk in read_chunks(snapshot.get_addresses(), self.chunk_size)),
+                       ((self.network.load_graph_peers, chunk)
+                        for chunk in read_chunks(snapshot.get_peers(), self.chunk_size)))
+        self._load_chunk(chunks)
+        return self._loading[1]
+
+    def _load_chunk(self, chunks):
+        try:
+            load, chunk = next(chunks)
+            load(chunk)
+        except StopIteration:
+            self._finish_load(True)
+        except ValueError as e:
+            self._logger.warning("Failed to load network snapshot %s: %s", self.file_path, e)
+            self._finish_load(False)
+        else:
+            self.register_task("load_snapshot", self._reactor.callLater(0, self._load_chunk, chunks))
+
+    def _finish_load(self, loaded, interrupted=False):
+        snapshot, deferred = self._loading
+        self._loading = None
+        # An invalid snapshot file may be overwritten, but the snapshot file of an interrupted load is kept
+        self.partial = interrupted
+        snapshot.close()
+        deferred.callback(loaded)
+
+    def shutdown_task_manager(self):
+        """
+        Stop writing snapshots and stop loading the snapshot file, if it is still being loaded.
+        """
+        super(NetworkSnapshotter, self).shutdown_task_manager()
+        if self._loading:
+            self._finish_load(False, True)
+
+    def write_in_thread(self):
+        self._reactor.callInThread(self.write)
+
+    def write(self, blocking=False):
+        """
+        Write a snapshot of the network to the snapshot file, unless a snapshot is already being written.
+
+        The snapshot is written to a temporary file first, so the snapshot file is never partially written. Nothing
+        is written while the network holds only part of the snapshot file.
+
+        :param blocking: wait for the snapshot which is being written, instead of skipping this snapshot
+        """
+        if self.partial:
+            self._logger.debug("Not writing network snapshot %s, it was only partially loaded", self.file_path)
+            return
+        if not self.write_lock.acquire(blocking):
+            return
+        try:
+            temporary = self.file_path + ".tmp"
+            with open(temporary, 'wb') as f:
+                f.write(self.network.graph_snapshot())
+            replace(temporary, self.file_path)
+        except (IOError, OSError) as e:
+            self._logger.error("Failed to write network snapshot %s: %s", self.file_path, e)
+        finally:
+            self.write_lock.release()
@@ -1,21 +1,110 @@
 from __future__ import absolute_import
 
+from hashlib import sha1
+from random import choice, sample
+from sys import getsizeof
 from threading import RLock
 from socket import inet_aton, inet_ntoa
 from struct import pack, unpack
+from time import time
 
 from six.moves import xrange
 
+from .graph_snapshot import serialize_graph
 from ..util import cast_to_chr
 
+# The number of random walkable addresses to try, before filtering out all excluded addresses
+RANDOM_WALKABLE_ATTEMPTS = 8
+# The default maximum number of known addresses
+DEFAULT_MAX_ADDRESSES = 100000
+# The number of random walkable addresses to compare, when an address has to be evicted
+EVICTION_SAMPLE_SIZE = 16
+# The age (in seconds) at which the retention of an address has halved
+ADDRESS_HALF_LIFE = 60.0
 
-class Network(object):
+
+class IndexedSet(object):
+    """
+    A set which can return a random element in constant time.
+    """
 
     def __init__(self):
-        # All known IP:port addresses, mapped to (introduction peer, services)
+        super(IndexedSet, self).__init__()
+        self.items = []
+        self.positions = {}
+
+    def add(self, item):
+        if item not in self.positions:
+            self.positions[item] = len(self.items)
+            self.items.append(item)
+
+    def discard(self, item):
+        """
+        Remove an item, if it is in the set. The last item takes the place of the removed item.
+        """
+        position = self.positions.pop(item, None)
+        if position is None:
+            return
+        last = self.items.pop()
+        if position < len(self.items):
+            self.items[position] = last
+            self.positions[last] = position
+
+    def random_item(self, exclude=()):
+        """
+        Get a random item which is not excluded, or None if all items are excluded.
+        """
+        if not self.items:
+            return None
+        for _ in xrange(RANDOM_WALKABLE_ATTEMPTS):
+            item = choice(self.items)
+            if item not in exclude:
+                return item
+        available = [item for item in self.items if item not in exclude]
+        return choice(available) if available else None
+
+    def __contains__(self, item):
+        return item in self.positions
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class Network(object):
+
+    def __init__(self, max_addresses=DEFAULT_MAX_ADDRESSES):
+        """
+        Create a new network.
+
+        :param max_addresses: the maximum number of known addresses, before walkable addresses are evicted
+        """
+        # All known IP:port addresses, mapped to (introduction peer, service, time of discovery)
         self._all_addresses = {}
+        self.max_addresses = max_addresses
+        self.evicted_addresses = 0
+        # The [successful, failed] walks to the addresses introduced by every verified peer mid
+        self._introducer_reputation = {}
         # All verified Peer objects (Peer.address must be in _all_addresses)
         self.verified_peers = []
+        # Indexes of the verified peers by mid, by public key bin and by address (peers may share an address)
+        # The address of a verified peer should only be changed through add_verified_peer, to keep these consistent
+        self._verified_by_mid = {}
+        self._verified_position = {}
+        self._verified_by_public_key_bin = {}
+        self._verified_by_address = {}
+        # The verified peers per service
+        self._verified_by_service = {}
+        # The known addresses introduced by every peer mid
+        self._introduced_by = {}
+        # The addresses which are not used by a verified peer, in general and per service
+        # The services of an address are the services of its introducer and the service it was discovered through,
+        # except for the services of the verified peers using the address
+        self._walkable = IndexedSet()
+        self._walkable_by_service = {}
+        self._walkable_services = {}
         self.graph_lock = RLock()
         # Peers we should not add to the network
         # For example, bootstrap peers
@@ -42,11 +131,12 @@ class Network(object):
 
         with self.graph_lock:
             if ((address not in self._all_addresses)
-                    or (self._all_addresses[address][0] not in [p.mid for p in self.verified_peers])):
+                    or (self._all_addresses[address][0] not in self._verified_by_mid)):
                 # This is a new address, or our previous parent has been removed
-                self._all_addresses[address] = (peer.mid, service)
+                self._set_address(address, peer.mid, service)
 
             self.add_verified_peer(peer)
+            self._evict_addresses()
 
     def discover_services(self, peer, services):
         """
@@ -60,6 +150,10 @@ class Network(object):
                 self.services_per_peer[peer.mid] = set(services)
             else:
                 self.services_per_peer[peer.mid] |= set(services)
+            known = self._verified_by_mid.get(peer.mid)
+            if known:
+                self._add_service_index(known, services)
+            self._update_walkable_services_of(peer.mid)
 
     def add_verified_peer(self, peer):
         """
@@ -71,20 +165,168 @@ class Network(object):
             return
         with self.graph_lock:
             # This may just be an address update
-            for known in self.verified_peers:
-                if known.mid == peer.mid:
+            known = self._verified_by_mid.get(peer.mid)
+            if known:
+                if known.address != peer.address:
+                    self._remove_address_index(known)
+                    old_address = known.address
                     known.address = peer.address
-                    return
+                    self._verified_by_address.setdefault(known.address, []).append(known)
+                    self._update_walkable(old_address)
+                    self._update_walkable(known.address)
+                return
             if peer.address in self._all_addresses:
-                if peer not in self.verified_peers:
-                    # This should always happen, unless someone edits the verified_peers dict directly.
-                    # This would be a programmer 'error', but we will allow it.
-                    self.verified_peers.append(peer)
+                self._add_verified(peer)
             elif peer.address not in self.blacklist:
-                if peer.address not in self._all_addresses:
-                    self._all_addresses[peer.address] = ('', None)
-                if peer not in self.verified_peers:
-                    self.verified_peers.append(peer)
+                self._set_address(peer.address, '', None)
+                self._add_verified(peer)
+                self._evict_addresses()
+
+    def _add_verified(self, peer):
+        introducer_mid = self._all_addresses[peer.address][0]
+        if introducer_mid in self._introducer_reputation:
+            self._introducer_reputation[introducer_mid][0] += 1
+        self._introducer_reputation[peer.mid] = [0, 0]
+        self._verified_position[peer.mid] = len(self.verified_peers)
+        self.verified_peers.append(peer)
+        self._verified_by_mid[peer.mid] = peer
+        self._verified_by_public_key_bin[peer.public_key.key_to_bin()] = peer
+        self._verified_by_address.setdefault(peer.address, []).append(peer)
+        self._add_service_index(peer, self.services_per_peer.get(peer.mid, ()))
+        self._update_walkable(peer.address)
+
+    def _add_service_index(self, peer, services):
+        for service in services:
+            if service not in self._verified_by_service:
+                self._verified_by_service[service] = IndexedSet()
+            self._verified_by_service[service].add(peer)
+
+    def _remove_address_index(self, peer):
+        peers = self._verified_by_address[peer.address]
+        peers.remove(peer)
+        if not peers:
+            del self._verified_by_address[peer.address]
+
+    def _remove_verified(self, peer):
+        """
+        Remove a verified peer and its services.
+
+        The last verified peer takes the place of the removed peer, so the order of the verified peers changes.
+
+        :param peer: the Peer object stored in the network
+        """
+        position = self._verified_position.pop(peer.mid)
+        last = self.verified_peers.pop()
+        if last is not peer:
+            self.verified_peers[position] = last
+            self._verified_position[last.mid] = position
+        del self._verified_by_mid[peer.mid]
+        del self._verified_by_public_key_bin[peer.public_key.key_to_bin()]
+        self._introducer_reputation.pop(peer.mid, None)
+        self._remove_address_index(peer)
+        for service in self.services_per_peer.pop(peer.mid, ()):
+            peers = self._verified_by_service[service]
+            peers.discard(peer)
+            if not peers:
+                del self._verified_by_service[service]
+        self._update_walkable(peer.address)
+        self._update_walkable_services_of(peer.mid)
+
+    def _set_address(self, address, introducer_mid, service, discovered=None):
+        """
+        Store the introducer and the service through which we discovered an address, by default just now.
+        """
+        previous = self._all_addresses.get(address)
+        if previous and previous[0]:
+            self._remove_introduction(previous[0], address)
+        self._all_addresses[address] = (introducer_mid, service, time() if discovered is None else discovered)
+        if introducer_mid:
+            self._introduced_by.setdefault(introducer_mid, set()).add(address)
+        self._update_walkable(address)
+
+    def _pop_address(self, address):
+        previous = self._all_addresses.pop(address, None)
+        if previous and previous[0]:
+            self._remove_introduction(previous[0], address)
+        self._update_walkable(address)
+
+    def _get_retention(self, address, now):
+        """
+        Get the value of keeping a known address, relative to the other known addresses.
+
+        Addresses lose value with age. Addresses introduced by a verified peer gain value with every successful walk,
+        and lose value with every failed walk, to the addresses it introduced. Failed walks are not counted per
+        address, as the random walk removes an address which did not respond.
+        """
+        introducer_mid, _, discovered = self._all_addresses[address]
+        reputation = self._introducer_reputation.get(introducer_mid)
+        if reputation:
+            retention = (1.0 + reputation[0]) / (1.0 + reputation[1])
+        else:
+            retention = 0.5
+        age = max(0.0, now - discovered) / ADDRESS_HALF_LIFE
+        return retention / (1.0 + age)
+
+    def _evict_addresses(self):
+        """
+        Evict walkable addresses until we know at most max_addresses addresses.
+
+        Only a random sample of the walkable addresses is compared, the address with the lowest retention is evicted.
+        The addresses of verified peers are never evicted.
+        """
+        now = time()
+        while len(self._all_addresses) > self.max_addresses and self._walkable:
+            candidates = sample(self._walkable.items, min(EVICTION_SAMPLE_SIZE, len(self._walkable)))
+            self._pop_address(min(candidates, key=lambda address: self._get_retention(address, now)))
+            self.evicted_addresses += 1
+
+    def _remove_introduction(self, introducer_mid, address):
+        introduced = self._introduced_by[introducer_mid]
+        introduced.discard(address)
+        if not introduced:
+            del self._introduced_by[introducer_mid]
+
+    def _update_walkable(self, address):
+        """
+        Update whether an address is walkable, in general and for each service.
+        """
+        entry = self._all_addresses.get(address)
+        verified = self._verified_by_address.get(address, [])
+        services = set()
+        if entry is None or verified:
+            self._walkable.discard(address)
+        else:
+            self._walkable.add(address)
+        if entry is not None:
+            introducer_mid, service, _ = entry
+            services.update(self.services_per_peer.get(introducer_mid, ()))
+            if service:
+                services.add(service)
+            for peer in verified:
+                services.difference_update(self.services_per_peer.get(peer.mid, ()))
+
+        previous = self._walkable_services.pop(address, set())
+        if services:
+            self._walkable_services[address] = services
+        for service in previous - services:
+            walkable = self._walkable_by_service[service]
+            walkable.discard(address)
+            if not walkable:
+                del self._walkable_by_service[service]
+        for service in services - previous:
+            if service not in self._walkable_by_service:
+                self._walkable_by_service[service] = IndexedSet()
+            self._walkable_by_service[service].add(address)
+
+    def _update_walkable_services_of(self, mid):
+        """
+        Update the walkable addresses which depend on the services of a peer: its own and the ones it introduced.
+        """
+        known = self._verified_by_mid.get(mid)
+        if known:
+            self._update_walkable(known.address)
+        for address in list(self._introduced_by.get(mid, ())):
+            self._update_walkable(address)
 
     def register_service_provider(self, service_id, overlay):
         """
@@ -102,13 +344,8 @@ class Network(object):
 
         :param service_id: the service name/id to fetch peers for
         """
-        out = []
         with self.graph_lock:
-            for peer in self.verified_peers:
-                if peer.mid in self.services_per_peer:
-                    if service_id in self.services_per_peer[peer.mid]:
-                        out.append(peer)
-        return out
+            return list(self._verified_by_service.get(service_id, ()))
 
     def get_services_for_peer(self, peer):
         """
@@ -126,20 +363,19 @@ class Network(object):
         :param service_id: the service_id to filter on
         """
         with self.graph_lock:
-            known = self.get_peers_for_service(service_id) if service_id else self.verified_peers
-            verified = [peer.address for peer in known]
-            out = list(set(self._all_addresses.keys()) - set(verified))
-            if service_id:
-                new_out = []
-                for address in out:
-                    intro_peer, service = self._all_addresses[address]
-                    services = self.services_per_peer.get(intro_peer, set([]))
-                    if service:
-                        services.add(service)
-                    if service_id in services:
-                        new_out.append(address)
-                out = new_out
-            return out
+            return list(self._walkable_by_service.get(service_id, ()) if service_id else self._walkable)
+
+    def get_random_walkable_address(self, service_id=None, exclude=()):
+        """
+        Get a random address ready to be walked to.
+
+        :param service_id: the service_id to filter on
+        :param exclude: the addresses not to return, for instance because we are already walking to them
+        :return: the (IP, port) address or None if there are no walkable addresses
+        """
+        with self.graph_lock:
+            walkable = self._walkable_by_service.get(service_id) if service_id else self._walkable
+            return walkable.random_item(exclude) if walkable else None
 
     def get_verified_by_address(self, address):
         """
@@ -149,9 +385,8 @@ class Network(object):
         :return: the Peer object for this address or None
         """
         with self.graph_lock:
-            for i in range(len(self.verified_peers)):
-                if self.verified_peers[i].address == address:
-                    return self.verified_peers[i]
+            peers = self._verified_by_address.get(address)
+            return peers[0] if peers else None
 
     def get_verified_by_public_key_bin(self, public_key_bin):
         """
@@ -161,9 +396,57 @@ class Network(object):
         :return: the Peer object for this public_key_bin or None
         """
         with self.graph_lock:
-            for i in range(len(self.verified_peers)):
-                if self.verified_peers[i].public_key.key_to_bin() == public_key_bin:
-                    return self.verified_peers[i]
+            return self._verified_by_public_key_bin.get(public_key_bin)
+
+    def get_verified_peers_with_key_bin(self, exclude=()):
+        """
+        Get the verified peers with the string representation of their public key.
+
+        :param exclude: the public key bins of the peers to leave out
+        :return: a list of (public_key_bin, Peer) tuples
+        """
+        with self.graph_lock:
+            return [(public_key_bin, peer) for public_key_bin, peer in self._verified_by_public_key_bin.items()
+                    if public_key_bin not in exclude]
+
+    def register_walk_failure(self, address):
+        """
+        Register that a walk to a known address did not lead to a response, against the peer which introduced it.
+
+        :param address: the (ip, port) address which did not respond
+        """
+        with self.graph_lock:
+            entry = self._all_addresses.get(address)
+            if entry is None:
+                return
+            if entry[0] in self._introducer_reputation:
+                self._introducer_reputation[entry[0]][1] += 1
+
+    def get_address_book_statistics(self):
+        """
+        Get the size of the address book and an estimate of its memory usage.
+
+        The memory usage is estimated from the size of the containers and the size of a single entry.
+
+        :return: a dict with the number of known, walkable and evicted addresses, the maximum number of addresses, the
+                 number of verified peers and the estimated memory usage in bytes
+        """
+        with self.graph_lock:
+            memory = sum(getsizeof(container) for container in (self._all_addresses, self._walkable.items,
+                                                                self._walkable.positions, self._walkable_services,
+                                                                self._introduced_by, self._introducer_reputation))
+            if self._all_addresses:
+                address, entry = next(iter(self._all_addresses.items()))
+                entry_size = getsizeof(address) + getsizeof(address[0]) + getsizeof(entry) + getsizeof(entry[2])
+                memory += entry_size * len(self._all_addresses)
+            return {
+                'addresses': len(self._all_addresses),
+                'walkable': len(self._walkable),
+                'verified': len(self.verified_peers),
+                'max_addresses': self.max_addresses,
+                'evicted': self.evicted_addresses,
+                'memory': memory
+            }
 
     def get_introductions_from(self, peer):
         """
@@ -173,7 +456,7 @@ class Network(object):
         :return: a list of the introduced addresses (ip, port)
         """
         with self.graph_lock:
-            return [k for k, v in self._all_addresses.items() if v[0] == peer.mid]
+            return list(self._introduced_by.get(peer.mid, ()))
 
     def remove_by_address(self, address):
         """
@@ -182,14 +465,9 @@ class Network(object):
         :param address: the (ip, port) address to remove
         """
         with self.graph_lock:
-            self._all_addresses.pop(address, None)
-            to_remove = []
-            for i in range(len(self.verified_peers)):
-                if self.verified_peers[i].address == address:
-                    to_remove.insert(0, i)
-                    self.services_per_peer.pop(self.verified_peers[i].mid, None)
-            for index in to_remove:
-                self.verified_peers.pop(index)
+            self._pop_address(address)
+            for peer in list(self._verified_by_address.get(address, [])):
+                self._remove_verified(peer)
 
     def remove_peer(self, peer):
         """
@@ -198,10 +476,12 @@ class Network(object):
         :param peer: the Peer to remove
         """
         with self.graph_lock:
-            self._all_addresses.pop(peer.address, None)
-            if peer in self.verified_peers:
-                self.verified_peers.remove(peer)
-            self.services_per_peer.pop(peer.mid, None)
+            self._pop_address(peer.address)
+            known = self._verified_by_mid.get(peer.mid)
+            if known:
+                self._remove_verified(known)
+            elif self.services_per_peer.pop(peer.mid, None) is not None:
+                self._update_walkable_services_of(peer.mid)
 
     def snapshot(self):
         """
@@ -233,4 +513,65 @@ class Network(object):
                 sub = snapshot[i:i + 6]
                 ip = inet_ntoa(sub[0:4])
                 port = unpack(">H", sub[4:])[0]
-                self._all_addresses[(ip, port)] = ('', None)
+                self._set_address((ip, port), '', None)
+            self._evict_addresses()
+
+    def graph_snapshot(self):
+        """
+        Get a snapshot of the whole graph: all known addresses and all verified peers, see graph_snapshot.py.
+
+        The graph is copied while holding the graph lock and serialized afterwards, so this can run on any thread.
+
+        :return: the serialization (bytes) of the graph
+        """
+        with self.graph_lock:
+            addresses = list(self._all_addresses.items())
+            peers = [(public_key_bin, peer.address, peer.last_response, list(self.services_per_peer.get(peer.mid, ())))
+                     for public_key_bin, peer in self._verified_by_public_key_bin.items()]
+        return serialize_graph(addresses, peers)
+
+    def load_graph_snapshot(self, snapshot):
+        """
+        Load a graph snapshot into the walkable addresses, keeping the addresses we already know.
+
+        The verified peers of the snapshot are not verified anymore, but their services are restored and their
+        addresses are considered to be discovered at the time of their last response.
+
+        :param snapshot: the GraphSnapshot (see graph_snapshot.py)
+        """
+        with self.graph_lock:
+            self.load_graph_addresses(snapshot.get_addresses())
+            self.load_graph_peers(snapshot.get_peers())
+
+    def load_graph_addresses(self, addresses):
+        """
+        Load address records of a graph snapshot into the walkable addresses, keeping the addresses we already know.
+
+        :param addresses: the (address, introducer_mid, service, discovered) records to load
+        """
+        with self.graph_lock:
+            for address, introducer_mid, service, discovered in addresses:
+                if address not in self._all_addresses and address not in self.blacklist:
+                    self._set_address(address, introducer_mid, service, discovered)
+            self._evict_addresses()
+
+    def load_graph_peers(self, peers):
+        """
+        Load peer records of a graph snapshot, after its address records.
+
+        :param peers: the (public_key_bin, address, last_response, services) records to load
+        """
+        with self.graph_lock:
+            for public_key_bin, address, last_response, services in peers:
+                mid = sha1(public_key_bin).digest()
+                if mid in self.blacklist_mids:
+                    continue
+                entry = self._all_addresses.get(address)
+                if entry and entry[2] < last_response and address not in self._verified_by_address:
+                    self._set_address(address, entry[0], entry[1], last_response)
+                if services:
+                    self.services_per_peer.setdefault(mid, set()).update(services)
+                    known = self._verified_by_mid.get(mid)
+                    if known:
+                        self._add_service_index(known, services)
+                    self._update_walkable_services_of(mid)
@@ -0,0 +1,164 @@
+"""
+The scheduler that runs IPv8's delayed calls and cross-thread callbacks.
+
+By default, this is the Twisted reactor. An AsyncioScheduler can be installed with set_scheduler() to run IPv8 on an
+asyncio event loop instead, for instance to embed IPv8 in an asyncio application.
+
+The communities, the request caches and the task managers run on the installed scheduler. Some parts of IPv8 are
+built on Twisted itself and only run on the Twisted reactor:
+
+- the UDPEndpoint (use the AsyncioEndpoint with an AsyncioScheduler)
+- the exit sockets of the TunnelCommunity, which are Twisted UDP ports and use the Twisted DNS resolver
+- the REST API, which is a twisted.web site
+- the sharded workers (see sharding.py) and the IPv8 service in ipv8_service.py
+"""
+from __future__ import absolute_import
+
+from functools import partial
+
+from twisted.internet import reactor
+from twisted.internet.error import AlreadyCalled, AlreadyCancelled
+from twisted.python.threadable import isInIOThread
+
+try:
+    import asyncio
+except ImportError:
+    # Python 2 does not ship with asyncio.
+    asyncio = None
+    get_running_loop = None
+else:
+    # Before Python 3.7, get_event_loop() is the only public way to get the running loop (and it may return another
+    # loop if none is running).
+    get_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+_scheduler = reactor
+
+
+def get_scheduler():
+    """
+    Get the scheduler IPv8 currently runs on.
+
+    A scheduler provides the subset of the Twisted reactor interface used by IPv8: callLater(), callFromThread(),
+    callInThread(), seconds() and the running attribute.
+    """
+    return _scheduler
+
+
+def set_scheduler(scheduler):
+    """
+    Set the scheduler IPv8 runs on.
+
+    This should be done before creating any IPv8 objects: existing objects keep using the old scheduler.
+
+    :param scheduler: the Twisted reactor or an AsyncioScheduler
+    """
+    global _scheduler
+    _scheduler = scheduler
+
+
+def is_in_io_thread(scheduler):
+    """
+    Check if we are running on the thread of the given scheduler.
+    """
+    if isinstance(scheduler, AsyncioScheduler):
+        return scheduler.isInIOThread()
+    return isInIOThread()
+
+
+def new_event_loop():
+    """
+    Create a new asyncio event loop, this is a uvloop event loop if uvloop is installed.
+    """
+    if asyncio is None:
+        raise RuntimeError("asyncio is not available on this platform")
+    if uvloop is not None:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+class AsyncioDelayedCall(object):
+    """
+    A call scheduled on an asyncio event loop, with the interface of a Twisted DelayedCall.
+    """
+
+    def __init__(self, loop, delay, callback, *args, **kwargs):
+        super(AsyncioDelayedCall, self).__init__()
+        self.time = loop.time() + delay
+        self.called = False
+        self.cancelled = False
+        self._callback = partial(callback, *args, **kwargs)
+        self._handle = loop.call_at(self.time, self._run)
+
+    def _run(self):
+        self.called = True
+        self._callback()
+
+    def getTime(self):
+        return self.time
+
+    def active(self):
+        return not (self.called or self.cancelled)
+
+    def cancel(self):
+        """
+        Cancel this call, if it has not been called yet.
+
+        :raises AlreadyCalled: if this call was already called
+        :raises AlreadyCancelled: if this call was already cancelled
+        """
+        if self.cancelled:
+            raise AlreadyCancelled
+        if self.called:
+            raise AlreadyCalled
+        self.cancelled = True
+        self._handle.cancel()
+
+
+class AsyncioScheduler(object):
+    """
+    Runs IPv8's delayed calls and cross-thread callbacks on an asyncio event loop.
+    """
+
+    def __init__(self, loop=None):
+        """
+        Create a new scheduler.
+
+        :param loop: the event loop to run on, by default the current event loop
+        """
+        super(AsyncioScheduler, self).__init__()
+        if asyncio is None:
+            raise RuntimeError("asyncio is not available on this platform")
+        self.loop = loop or asyncio.get_event_loop()
+
+    @property
+    def running(self):
+        return self.loop.is_running()
+
+    def isInIOThread(self):
+        try:
+            return self.loop.is_running() and get_running_loop() is self.loop
+        except RuntimeError:
+            # No loop is running on (or set for) this thread.
+            return False
+
+    def seconds(self):
+        return self.loop.time()
+
+    def callLater(self, delay, callback, *args, **kwargs):
+        return AsyncioDelayedCall(self.loop, delay, callback, *args, **kwargs)
+
+    def callFromThread(self, callback, *args, **kwargs):
+        self.loop.call_soon_threadsafe(partial(callback, *args, **kwargs))
+
+    def callInThread(self, callback, *args, **kwargs):
+        self.loop.run_in_executor(None, partial(callback, *args, **kwargs))
+
+
+__all__ = ["AsyncioDelayedCall", "AsyncioScheduler", "get_scheduler", "is_in_io_thread", "new_event_loop",
+           "set_scheduler"]
@@ -0,0 +1,396 @@
+"""
+Run IPv8 on multiple cores, with one worker process per core.
+
+All workers listen on the same UDP port, using SO_REUSEPORT. The kernel hashes the source address of each packet to
+one of the workers, so every remote peer (and every circuit it relays) is handled by a single worker. The workers
+share their verified peers and their new TrustChain blocks over an IPC channel to the supervisor process, which relays
+every message to all other workers.
+
+A reply arrives at the worker that handles the address of the peer which sends it. A request a worker sends because of
+a packet it received (like a TrustChain crawl after an introduction) is answered at that same worker, but the answers
+to requests that a worker starts on its own (like DHT lookups, circuits or TrustChain proposals) arrive at any worker,
+which has no RequestCache entry for them. Sharding is therefore limited to the overlays which only answer requests, see
+SHARDABLE_OVERLAYS. The introduction responses to the walks of a worker are handled by whichever worker receives them,
+which shares the peer it verified with the other workers.
+
+Start the workers with a ShardSupervisor, or run a single worker with ``python -m ipv8.sharding``. The supervisor and
+the workers always run on the Twisted reactor: they spawn processes and use its standard IO, so they do not support an
+AsyncioScheduler.
+"""
+from __future__ import absolute_import
+
+import json
+import logging
+import os
+import signal
+import struct
+import sys
+import tempfile
+import time
+
+from twisted.internet import protocol, reactor
+from twisted.internet.defer import Deferred, succeed
+from twisted.internet.task import LoopingCall
+
+from .attestation.trustchain.block import TrustChainBlock
+from .attestation.trustchain.community import TrustChainCommunity
+from .attestation.trustchain.listener import BlockListener
+from .keyvault.crypto import default_eccrypto
+from .messaging.anonymization.community import TunnelSettings
+from .messaging.deprecated.encoding import decode, encode
+from .peer import Peer
+from .taskmanager import TaskManager
+
+# The file descriptors of the IPC channel in the worker processes
+IPC_READ_FD = 3
+IPC_WRITE_FD = 4
+
+MSG_PEERS = b"peers"
+MSG_BLOCK = b"block"
+
+# The interval (in seconds) at which workers share their newly verified peers
+PEER_SYNC_INTERVAL = 5.0
+
+# The overlays which store TrustChain blocks, these get a database per worker
+TRUSTCHAIN_OVERLAYS = ('TrustChainCommunity', 'TrustChainTestnetCommunity')
+# The overlays which build circuits, these only answer requests if they are limited to 0 circuits
+TUNNEL_OVERLAYS = ('TunnelCommunity', 'HiddenTunnelCommunity')
+# The overlays which only answer requests, or handle the replies to their requests without the state of the request
+SHARDABLE_OVERLAYS = ('DiscoveryCommunity',) + TRUSTCHAIN_OVERLAYS + TUNNEL_OVERLAYS
+
+
+def frame(message_type, payload):
+    """
+    Create an IPC frame for a message.
+    """
+    data = encode((message_type, payload))
+    return struct.pack(">I", len(data)) + data
+
+
+def unframe(data):
+    """
+    Get the (message type, payload) of an IPC frame.
+    """
+    return decode(data, 4)[1]
+
+
+class FrameBuffer(object):
+    """
+    Cuts a stream of IPC data into frames.
+    """
+
+    def __init__(self):
+        super(FrameBuffer, self).__init__()
+        self.buffer = b""
+
+    def feed(self, data):
+        """
+        Add received data to the buffer.
+
+        :return: the list of frames which were completed by the data
+        """
+        self.buffer += data
+        frames = []
+        while len(self.buffer) >= 4:
+            length = struct.unpack_from(">I", self.buffer)[0] + 4
+            if len(self.buffer) < length:
+                break
+            frames.append(self.buffer[:length])
+            self.buffer = self.buffer[length:]
+        return frames
+
+
+def get_unshardable_overlays(configuration):
+    """
+    Get the overlays of an IPv8 configuration which can not run in multiple workers, as they start requests.
+
+    :param configuration: the IPv8 configuration
+    :return: the list of overlay configurations which are not shardable
+    """
+    unshardable = []
+    for overlay in configuration['overlays']:
+        if overlay['class'] in TUNNEL_OVERLAYS:
+            settings = overlay.get('initialize', {}).get('settings', {})
+            if settings.get('max_circuits', TunnelSettings().max_circuits) != 0:
+                unshardable.append(overlay)
+        elif overlay['class'] not in SHARDABLE_OVERLAYS:
+            unshardable.append(overlay)
+    return unshardable
+
+
+def prepare_configuration(configuration, working_directory):
+    """
+    Prepare an IPv8 configuration to be shared by all workers.
+
+    All workers have to use the same keys, so missing key files are generated beforehand.
+
+    :param configuration: the IPv8 configuration
+    :param working_directory: the directory to store the databases of the workers in
+    :raises ValueError: if a key is not stored in a file, or if an overlay is not shardable
+    """
+    unshardable = get_unshardable_overlays(configuration)
+    if unshardable:
+        raise ValueError("The overlays %s start requests, their replies would arrive at other workers"
+                         % ", ".join(overlay['class'] for overlay in unshardable))
+    configuration = json.loads(json.dumps(configuration))
+    for key_block in configuration['keys']:
+        if not key_block['file']:
+            raise ValueError("The key '%s' has no file, workers would not share their identity" % key_block['alias'])
+        if not os.path.isfile(key_block['file']):
+            with open(key_block['file'], 'wb') as f:
+                f.write(default_eccrypto.generate_key(key_block['generation']).key_to_bin())
+    configuration['working_directory'] = working_directory
+    return configuration
+
+
+def get_worker_configuration(configuration, index):
+    """
+    Get the configuration of a worker, which has its own TrustChain database.
+    """
+    for overlay in configuration['overlays']:
+        if overlay['class'] in TRUSTCHAIN_OVERLAYS:
+            working_directory = overlay['initialize'].get('working_directory', configuration['working_directory'])
+            if working_directory != u":memory:":
+                overlay['initialize']['working_directory'] = os.path.join(working_directory, "worker_%d" % index)
+    return configuration
+
+
+class ShardWorkerProcess(protocol.ProcessProtocol):
+    """
+    The supervisor side of a worker process.
+    """
+
+    def __init__(self, supervisor, index):
+        self.supervisor = supervisor
+        self.index = index
+        self.frame_buffer = FrameBuffer()
+
+    def childDataReceived(self, childFD, data):
+        if childFD == IPC_WRITE_FD:
+            for message in self.frame_buffer.feed(data):
+                self.supervisor.relay(self.index, message)
+
+    def send(self, message):
+        self.transport.writeToChild(IPC_READ_FD, message)
+
+    def processEnded(self, reason):
+        self.supervisor.on_worker_ended(self.index, reason)
+
+
+class ShardSupervisor(object):
+    """
+    Starts the worker processes and relays the IPC messages between them.
+    """
+
+    def __init__(self, configuration, worker_count, working_directory=u".", rest_api=False):
+        """
+        Create a new supervisor.
+
+        :param configuration: the IPv8 configuration of the workers
+        :param worker_count: the number of workers to start, usually the number of cores
+        :param working_directory: the directory to store the databases of the workers in
+        :param rest_api: whether the first worker should run the REST API
+        """
+        super(ShardSupervisor, self).__init__()
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.configuration = prepare_configuration(configuration, working_directory)
+        self.worker_count = worker_count
+        self.rest_api = rest_api
+        self.workers = {}
+        self.configuration_file = None
+        self._all_ended = Deferred()
+
+    def start(self):
+        """
+        Start the worker processes.
+        """
+        fd, self.configuration_file = tempfile.mkstemp(suffix=".json")
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.configuration, f)
+        # Make sure the workers can import IPv8 and the ipv8_service module, like this process.
+        env = dict(os.environ)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env['PYTHONPATH'] = os.pathsep.join([root] + [p for p in [env.get('PYTHONPATH')] if p])
+        for index in range(self.worker_count):
+            args = [sys.executable, "-m", "ipv8.sharding", self.configuration_file, str(index)]
+            if self.rest_api and index == 0:
+                args.append("--rest-api")
+            self.workers[index] = ShardWorkerProcess(self, index)
+            reactor.spawnProcess(self.workers[index], sys.executable, args, env=env,
+                                 childFDs={0: 'w', 1: 1, 2: 2, IPC_READ_FD: 'w', IPC_WRITE_FD: 'r'})
+        self._logger.info("Started %d workers", self.worker_count)
+
+    def relay(self, source, message):
+        """
+        Forward an IPC message of a worker to all other workers.
+        """
+        for index, worker in self.workers.items():
+            if index != source:
+                worker.send(message)
+
+    def on_worker_ended(self, index, reason):
+        self._logger.warning("Worker %d ended: %s", index, reason.getErrorMessage())
+        self.workers.pop(index, None)
+        if not self.workers:
+            os.remove(self.configuration_file)
+            self._all_ended.callback(None)
+
+    def stop(self):
+        """
+        Stop all worker processes.
+
+        :return: a Deferred that fires when all workers have ended
+        """
+        if not self.workers:
+            return succeed(None)
+        for worker in self.workers.values():
+            worker.transport.signalProcess('TERM')
+        return self._all_ended
+
+
+class ShardChannel(protocol.Protocol):
+    """
+    The worker side of the IPC channel.
+    """
+
+    def __init__(self):
+        self.frame_buffer = FrameBuffer()
+        self.coordinator = None
+
+    def dataReceived(self, data):
+        for message in self.frame_buffer.feed(data):
+            message_type, payload = unframe(message)
+            self.coordinator.on_message(message_type, payload)
+
+    def send(self, message_type, payload):
+        self.transport.write(frame(message_type, payload))
+
+    def connectionLost(self, reason=protocol.connectionDone):
+        if self.coordinator:
+            self.coordinator.on_channel_lost()
+
+
+class ShardBlockListener(BlockListener):
+    """
+    Shares the new blocks of a TrustChainCommunity with the other workers, and stores the blocks they share.
+    """
+
+    def __init__(self, trustchain, channel):
+        super(ShardBlockListener, self).__init__()
+        self.trustchain = trustchain
+        self.channel = channel
+        self._importing = False
+
+    def should_sign(self, block):
+        return False
+
+    def received_block(self, block):
+        if self._importing:
+            return
+        self.channel.send(MSG_BLOCK, [block.type, block._transaction, block.public_key, block.sequence_number,
+                                      block.link_public_key, block.link_sequence_number, block.previous_hash,
+                                      block.signature, block.timestamp])
+
+    def import_block(self, data):
+        """
+        Store a block shared by another worker.
+        """
+        block = TrustChainBlock(list(data) + [time.time()], self.trustchain.serializer)
+        self._importing = True
+        try:
+            self.trustchain.validate_persist_block(block)
+        finally:
+            self._importing = False
+
+
+class ShardCoordinator(TaskManager):
+    """
+    Shares the state of a worker with the other workers.
+    """
+
+    def __init__(self, network, channel, trustchain=None):
+        """
+        Start sharing state.
+
+        :param network: the Network of this worker
+        :param channel: the IPC channel to the supervisor
+        :param trustchain: the TrustChainCommunity of this worker, if any
+        """
+        super(ShardCoordinator, self).__init__()
+        self.network = network
+        self.channel = channel
+        self.channel.coordinator = self
+        # The public keys of the peers that are known to the other workers
+        self.shared_peers = set()
+
+        self.block_listener = None
+        if trustchain:
+            self.block_listener = ShardBlockListener(trustchain, channel)
+            trustchain.add_listener(self.block_listener, [TrustChainCommunity.UNIVERSAL_BLOCK_LISTENER])
+
+        self.register_task("sync_peers", LoopingCall(self.sync_peers)).start(PEER_SYNC_INTERVAL, False)
+
+    def sync_peers(self):
+        """
+        Share the peers that were verified since the last synchronization.
+        """
+        peers = []
+        for public_key_bin, peer in self.network.get_verified_peers_with_key_bin(self.shared_peers):
+            self.shared_peers.add(public_key_bin)
+            peers.append((public_key_bin, peer.address, list(self.network.get_services_for_peer(peer))))
+        if peers:
+            self.channel.send(MSG_PEERS, peers)
+
+    def on_message(self, message_type, payload):
+        if message_type == MSG_PEERS:
+            for public_key_bin, address, services in payload:
+                self.shared_peers.add(public_key_bin)
+                peer = Peer(public_key_bin, tuple(address))
+                self.network.add_verified_peer(peer)
+                self.network.discover_services(peer, services)
+        elif message_type == MSG_BLOCK and self.block_listener:
+            self.block_listener.import_block(payload)
+
+    def on_channel_lost(self):
+        self.shutdown_task_manager()
+
+
+def run_worker(configuration, index, rest_api=False):
+    """
+    Run a worker in this process, with the IPC channel on IPC_READ_FD and IPC_WRITE_FD.
+    """
+    from twisted.internet.stdio import StandardIO
+
+    from ipv8_service import IPv8
+    from .messaging.interfaces.udp.reuseport_endpoint import ReusePortUDPEndpoint
+
+    endpoint = ReusePortUDPEndpoint(configuration['port'], configuration['address'])
+    endpoint.open()
+    ipv8 = IPv8(get_worker_configuration(configuration, index), endpoint_override=endpoint)
+
+    channel = ShardChannel()
+    trustchain = ([overlay for overlay in ipv8.overlays if isinstance(overlay, TrustChainCommunity)] or [None])[0]
+    coordinator = ShardCoordinator(ipv8.network, channel, trustchain)
+    StandardIO(channel, stdin=IPC_READ_FD, stdout=IPC_WRITE_FD)
+
+    restapi = None
+    if rest_api:
+        from .REST.rest_manager import RESTManager
+        restapi = RESTManager(ipv8)
+        reactor.callLater(0.0, restapi.start)
+
+    def signal_handler(sig, _):
+        coordinator.shutdown_task_manager()
+        if restapi:
+            restapi.stop()
+        ipv8.stop()
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1]) as configuration_file:
+        worker_configuration = json.load(configuration_file)
+    reactor.callWhenRunning(run_worker, worker_configuration, int(sys.argv[2]), "--rest-api" in sys.argv[3:])
+    reactor.run()
@@ -8,6 +8,8 @@ from twisted.internet.base import DelayedCall
 from twisted.internet.defer import Deferred, DeferredList
 from twisted.internet.task import LoopingCall
 
+from .scheduler import AsyncioDelayedCall, get_scheduler
+
 CLEANUP_FREQUENCY = 100
 
 
@@ -20,6 +22,7 @@ class TaskManager(object):
     _reactor = reactor
 
     def __init__(self):
+        self._reactor = get_scheduler()
         self._pending_tasks = {}
         self._cleanup_counter = CLEANUP_FREQUENCY
         self._task_lock = RLock()
@@ -46,7 +49,12 @@ class TaskManager(object):
                     stopfn()
                 return task
 
-            assert isinstance(task, (Deferred, DelayedCall, LoopingCall)), (task, isinstance(task, Deferred))
+            assert isinstance(task, (Deferred, DelayedCall, AsyncioDelayedCall, LoopingCall)), \
+                (task, isinstance(task, Deferred))
+
+            if isinstance(task, LoopingCall) and task.clock is reactor:
+                # Run looping calls on our scheduler, which may not be the Twisted reactor.
+                task.clock = self._reactor
 
             if self.is_pending_task_active(name):
                 self.replace_task(name, task)
@@ -96,7 +104,7 @@ class TaskManager(object):
         This usually should be called when stopping or destroying the object so no tasks are left floating around.
         """
         with self._task_lock:
-            assert all([isinstance(task, (Deferred, DelayedCall, LoopingCall, tuple))
+            assert all([isinstance(task, (Deferred, DelayedCall, AsyncioDelayedCall, LoopingCall, tuple))
                         for task in self._pending_tasks.values()]), self._pending_tasks
 
             for name in list(self._pending_tasks.keys()):
@@ -133,7 +141,7 @@ class TaskManager(object):
                 # Have in mind that any deferred in the pending tasks list should have been constructed with a
                 # canceller function.
                 return not task.called, getattr(task, 'cancel', None)
-            elif isinstance(task, DelayedCall):
+            elif isinstance(task, (DelayedCall, AsyncioDelayedCall)):
                 return task.active(), task.cancel
             elif isinstance(task, LoopingCall):
                 return task.running, task.stop
@@ -1,15 +1,17 @@
 from __future__ import absolute_import
 
 from six.moves import xrange
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import Deferred, inlineCallbacks
 
 from ....attestation.trustchain.block import TrustChainBlock
 from ....attestation.trustchain.caches import CrawlRequestCache
 from ....attestation.trustchain.community import TrustChainCommunity, UNKNOWN_SEQ
 from ....attestation.trustchain.listener import BlockListener
+from ....attestation.trustchain.payload import CrawlResponsePayload
 from ...attestation.trustchain.test_block import TestBlock
 from ....database import database_blob
 from ....keyvault.crypto import default_eccrypto
+from ....messaging.payload_headers import GlobalTimeDistributionPayload
 from ...base import TestBase
 from ...mocking.ipv8 import MockIPv8
 
@@ -128,6 +130,80 @@ class TestTrustChainCommunity(TestBase):
         self.assertIsNotNone(self.nodes[1].overlay.persistence.get(my_pubkey, 1))
         self.assertEqual(self.nodes[1].overlay.persistence.get(my_pubkey, 1).link_sequence_number, UNKNOWN_SEQ)
 
+    @inlineCallbacks
+    def test_crawl_responses_batch(self):
+        """
+        Check if the block signatures of a batch of crawl responses are verified once, for all blocks at once.
+        """
+        self.nodes[1].overlay.should_sign = lambda x: False
+        self.nodes[0].endpoint.close()
+
+        my_pubkey = self.nodes[0].my_peer.public_key.key_to_bin()
+        his_pubkey = self.nodes[0].network.verified_peers[0].public_key.key_to_bin()
+        for _ in xrange(3):
+            self.nodes[0].overlay.sign_block(self.nodes[0].network.verified_peers[0], public_key=his_pubkey,
+                                             block_type=b'test', transaction={})
+        yield self.deliver_messages()
+
+        overlay = self.nodes[0].overlay
+        packets = []
+        for index in xrange(3):
+            block = overlay.persistence.get(my_pubkey, index + 1)
+            payload = CrawlResponsePayload.from_crawl(block, 42, index + 1, 3).to_pack_list()
+            dist = GlobalTimeDistributionPayload(overlay.claim_global_time()).to_pack_list()
+            packets.append((self.nodes[0].endpoint.wan_address,
+                            overlay._ez_pack(overlay._prefix, 3, [dist, payload], False)))
+        self.nodes[1].overlay.on_packets(packets)
+
+        signature_cache = self.nodes[1].overlay.signature_cache
+        self.assertEqual(3, signature_cache.signature_misses)
+        self.assertEqual(3, signature_cache.signature_hits)
+        for index in xrange(3):
+            self.assertIsNotNone(self.nodes[1].overlay.persistence.get(my_pubkey, index + 1))
+
+    @inlineCallbacks
+    def test_crawl_responses_batch_malformed(self):
+        """
+        Check if a malformed crawl response does not drop the other crawl responses of its batch.
+        """
+        self.nodes[1].overlay.should_sign = lambda x: False
+        self.nodes[0].endpoint.close()
+
+        my_pubkey = self.nodes[0].my_peer.public_key.key_to_bin()
+        his_pubkey = self.nodes[0].network.verified_peers[0].public_key.key_to_bin()
+        for _ in xrange(3):
+            self.nodes[0].overlay.sign_block(self.nodes[0].network.verified_peers[0], public_key=his_pubkey,
+                                             block_type=b'test', transaction={})
+        yield self.deliver_messages()
+
+        overlay = self.nodes[0].overlay
+        packets = []
+        for index in xrange(3):
+            block = overlay.persistence.get(my_pubkey, index + 1)
+            if index == 1:
+                # This transaction can not be decoded
+                block._transaction = b'garbage'
+            payload = CrawlResponsePayload.from_crawl(block, 42, index + 1, 3).to_pack_list()
+            dist = GlobalTimeDistributionPayload(overlay.claim_global_time()).to_pack_list()
+            packets.append((self.nodes[0].endpoint.wan_address,
+                            overlay._ez_pack(overlay._prefix, 3, [dist, payload], False)))
+        self.nodes[1].overlay.on_packets(packets)
+
+        self.assertIsNotNone(self.nodes[1].overlay.persistence.get(my_pubkey, 1))
+        self.assertIsNone(self.nodes[1].overlay.persistence.get(my_pubkey, 2))
+        self.assertIsNotNone(self.nodes[1].overlay.persistence.get(my_pubkey, 3))
+
+    def test_validate_persist_block_crypto(self):
+        """
+        Check if validating a block with the signature cache does not replace the crypto of the block.
+        """
+        block = TestBlock()
+        crypto = block.crypto
+
+        self.nodes[0].overlay.validate_persist_block(block)
+
+        self.assertIs(crypto, block.crypto)
+
     @inlineCallbacks
     def test_crawl_default(self):
         """
@@ -163,6 +239,28 @@ class TestTrustChainCommunity(TestBase):
         response = yield self.nodes[1].overlay.send_crawl_request(self.nodes[0].my_peer, my_pubkey, 1, 1)
         self.assertFalse(response)
 
+    def test_crawl_response_scheduler(self):
+        """
+        Check if the result of a crawl is delivered on the scheduler of the community.
+        """
+        overlay = self.nodes[1].overlay
+        scheduled = []
+
+        class RecordingScheduler(object):
+            def callFromThread(self, callback, *args):
+                scheduled.append(args)
+                callback(*args)
+
+        results = []
+        crawl_deferred = overlay.request_cache.add(CrawlRequestCache(overlay, 42, Deferred())).crawl_deferred
+        crawl_deferred.addCallback(results.append)
+        self.addCleanup(setattr, overlay, "_reactor", overlay._reactor)
+        overlay._reactor = RecordingScheduler()
+        overlay.request_cache.get(u"crawl", 42).received_empty_response()
+
+        self.assertListEqual([([],)], scheduled)
+        self.assertListEqual([[]], results)
+
     @inlineCallbacks
     def test_crawl_negative_index(self):
         """
@@ -134,3 +134,17 @@ class TestECCrypto(unittest.TestCase):
         Check if ECCrypto detects a valid public libnacl key as a public key.
         """
         self.assertTrue(self.ecc.is_valid_public_bin(TestECCrypto.libnacl_key.pub().key_to_bin()))
+
+    def test_verify_signatures(self):
+        """
+        Check if ECCrypto verifies a list of M2Crypto and libnacl signatures per item.
+        """
+        m2crypto_signature = self.ecc.create_signature(TestECCrypto.m2crypto_key, b"data")
+        libnacl_signature = self.ecc.create_signature(TestECCrypto.libnacl_key, b"data")
+
+        validity = self.ecc.verify_signatures([(TestECCrypto.m2crypto_key.pub(), b"data", m2crypto_signature),
+                                               (TestECCrypto.libnacl_key.pub(), b"data", libnacl_signature),
+                                               (TestECCrypto.libnacl_key.pub(), b"other data", libnacl_signature),
+                                               (TestECCrypto.m2crypto_key.pub(), b"data", libnacl_signature)])
+
+        self.assertEqual([True, True, False, False], validity)
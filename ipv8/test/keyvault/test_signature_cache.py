@@ -0,0 +1,146 @@
+from __future__ import absolute_import
+
+from threading import Thread
+
+from twisted.trial import unittest
+
+from ...keyvault.crypto import ECCrypto
+from ...keyvault.signature_cache import SignatureCache
+
+
+class TestSignatureCache(unittest.TestCase):
+
+    key = ECCrypto().generate_key(u"curve25519")
+
+    def setUp(self):
+        super(TestSignatureCache, self).setUp()
+        self.crypto = ECCrypto()
+        self.cache = SignatureCache(self.crypto, key_cache_size=2, signature_cache_size=2)
+        self.public_bin = self.key.pub().key_to_bin()
+
+    def test_key_cached(self):
+        """
+        Check if a public key is only parsed once.
+        """
+        key1 = self.cache.key_from_public_bin(self.public_bin)
+        key2 = self.cache.key_from_public_bin(self.public_bin)
+
+        self.assertIs(key1, key2)
+        self.assertEqual(self.public_bin, key1.key_to_bin())
+        self.assertEqual(1, self.cache.key_hits)
+        self.assertEqual(1, self.cache.key_misses)
+
+    def test_key_evicted(self):
+        """
+        Check if the least recently used public key is evicted from a full cache.
+        """
+        other_bins = [self.crypto.generate_key(u"curve25519").pub().key_to_bin() for _ in range(2)]
+        self.cache.key_from_public_bin(self.public_bin)
+        self.cache.key_from_public_bin(other_bins[0])
+        self.cache.key_from_public_bin(self.public_bin)
+        self.cache.key_from_public_bin(other_bins[1])
+
+        self.cache.key_from_public_bin(self.public_bin)
+        self.cache.key_from_public_bin(other_bins[0])
+
+        self.assertEqual(2, self.cache.get_statistics()["keys"])
+        self.assertEqual(2, self.cache.key_hits)
+        self.assertEqual(4, self.cache.key_misses)
+
+    def test_invalid_public_bin(self):
+        """
+        Check if an invalid public key is reported as such and not cached.
+        """
+        self.assertFalse(self.cache.is_valid_public_bin(b"LibNaCLPK:garbage"))
+        self.assertTrue(self.cache.is_valid_public_bin(self.public_bin))
+        self.assertEqual(1, self.cache.get_statistics()["keys"])
+
+    def test_signature_cached(self):
+        """
+        Check if a valid signature is only verified once.
+        """
+        key = self.cache.key_from_public_bin(self.public_bin)
+        signature = self.crypto.create_signature(self.key, b"data")
+
+        self.assertTrue(self.cache.is_valid_signature(key, b"data", signature))
+        self.assertTrue(self.cache.is_valid_signature(key, b"data", signature))
+        self.assertEqual(1, self.cache.signature_hits)
+        self.assertEqual(1, self.cache.signature_misses)
+
+    def test_signature_other_data(self):
+        """
+        Check if a cached signature is not valid for other data.
+        """
+        key = self.cache.key_from_public_bin(self.public_bin)
+        signature = self.crypto.create_signature(self.key, b"data")
+
+        self.assertTrue(self.cache.is_valid_signature(key, b"data", signature))
+        self.assertFalse(self.cache.is_valid_signature(key, b"other data", signature))
+
+    def test_signature_invalid_not_cached(self):
+        """
+        Check if an invalid signature is not cached.
+        """
+        key = self.cache.key_from_public_bin(self.public_bin)
+        signature = self.crypto.create_signature(self.key, b"data")
+        invalid = signature[:-1] + (b"\x00" if signature[-1:] != b"\x00" else b"\x01")
+
+        self.assertFalse(self.cache.is_valid_signature(key, b"data", invalid))
+        self.assertFalse(self.cache.is_valid_signature(key, b"data", invalid))
+        self.assertEqual(0, self.cache.signature_hits)
+        self.assertEqual(0, self.cache.get_statistics()["signatures"])
+
+    def test_disabled(self):
+        """
+        Check if nothing is cached with cache sizes of 0.
+        """
+        cache = SignatureCache(self.crypto, key_cache_size=0, signature_cache_size=0)
+        key = cache.key_from_public_bin(self.public_bin)
+        signature = self.crypto.create_signature(self.key, b"data")
+
+        self.assertTrue(cache.is_valid_signature(key, b"data", signature))
+        self.assertIsNot(key, cache.key_from_public_bin(self.public_bin))
+        self.assertTrue(cache.is_valid_signature(key, b"data", signature))
+        self.assertEqual(0, cache.key_hits)
+        self.assertEqual(0, cache.signature_hits)
+
+    def test_verify_signatures(self):
+        """
+        Check if a list of signatures is verified per item, verifying duplicates and cached signatures once.
+        """
+        key = self.cache.key_from_public_bin(self.public_bin)
+        signature = self.crypto.create_signature(self.key, b"data")
+        other_signature = self.crypto.create_signature(self.key, b"other data")
+        self.cache.is_valid_signature(key, b"data", signature)
+
+        validity = self.cache.verify_signatures([(key, b"data", signature),
+                                                 (key, b"other data", other_signature),
+                                                 (key, b"other data", other_signature),
+                                                 (key, b"other data", signature)])
+
+        self.assertEqual([True, True, True, False], validity)
+        self.assertEqual(2, self.cache.signature_hits)
+        self.assertEqual(3, self.cache.signature_misses)
+        self.assertTrue(self.cache.is_valid_signature(key, b"other data", other_signature))
+        self.assertEqual(3, self.cache.signature_hits)
+
+    def test_concurrent_statistics(self):
+        """
+        Check if every lookup from concurrent threads is counted as either a hit or a miss.
+        """
+        key = self.cache.key_from_public_bin(self.public_bin)
+        signature = self.crypto.create_signature(self.key, b"data")
+
+        def lookup():
+            for _ in range(200):
+                self.cache.key_from_public_bin(self.public_bin)
+                self.cache.is_valid_signature(key, b"data", signature)
+        threads = [Thread(target=lookup) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        statistics = self.cache.get_statistics()
+        self.assertEqual(801, statistics["key_hits"] + statistics["key_misses"])
+        self.assertEqual(800, statistics["signature_hits"] + statistics["signature_misses"])
@@ -0,0 +1,117 @@
+from __future__ import absolute_import
+
+import os
+
+from twisted.internet.defer import inlineCallbacks
+
+from ....messaging.interfaces.capture_endpoint import (CaptureEndpoint, CaptureWriter, DIRECTION_IN, DIRECTION_OUT,
+                                                       read_capture)
+from ....messaging.interfaces.replay_endpoint import ReplayEndpoint
+from ...base import TestBase
+from ...mocking.endpoint import AutoMockEndpoint, MockEndpointListener
+
+
+class TestCaptureEndpoint(TestBase):
+    """
+    This class contains various tests for capturing and replaying datagrams.
+    """
+
+    def setUp(self):
+        super(TestCaptureEndpoint, self).setUp()
+        self.file_path = os.path.join(self.temporary_directory(), u"capture")
+
+    def write_capture(self, records):
+        writer = CaptureWriter(self.file_path)
+        for record in records:
+            writer.write(*record)
+        writer.close()
+
+    def test_read_write(self):
+        """
+        Check if records are read back in the order they were written, also when appending to a capture.
+        """
+        records = [(1.5, DIRECTION_IN, ("1.2.3.4", 5), b"a"), (2.5, DIRECTION_OUT, ("2.3.4.5", 6), b"")]
+        self.write_capture(records[:1])
+        self.write_capture(records[1:])
+
+        self.assertEqual(records, list(read_capture(self.file_path)))
+
+    def test_read_truncated(self):
+        """
+        Check if a partially written record ends the capture.
+        """
+        self.write_capture([(1.5, DIRECTION_IN, ("1.2.3.4", 5), b"abc")])
+        with open(self.file_path, 'rb+') as f:
+            f.truncate(os.path.getsize(self.file_path) - 1)
+
+        self.assertEqual([], list(read_capture(self.file_path)))
+
+    def test_read_invalid(self):
+        """
+        Check if reading a file which is not a capture fails.
+        """
+        with open(self.file_path, 'wb') as f:
+            f.write(b"invalid")
+
+        self.assertRaises(ValueError, list, read_capture(self.file_path))
+
+    def test_write_invalid_address(self):
+        """
+        Check if datagrams of addresses which can not be stored are skipped.
+        """
+        writer = CaptureWriter(self.file_path)
+
+        self.assertFalse(writer.write(1.5, DIRECTION_IN, ("localhost", 5), b"a"))
+        writer.close()
+        self.assertEqual([], list(read_capture(self.file_path)))
+
+    @inlineCallbacks
+    def test_capture(self):
+        """
+        Check if sent and received datagrams are captured.
+        """
+        endpoint = AutoMockEndpoint()
+        endpoint.open()
+        capture_endpoint = CaptureEndpoint(endpoint, self.file_path)
+
+        capture_endpoint.send(endpoint.wan_address, b"a")
+        yield self.sleep(0.05)
+        capture_endpoint.close()
+
+        records = [record[1:] for record in read_capture(self.file_path)]
+        self.assertEqual([(DIRECTION_OUT, endpoint.wan_address, b"a"), (DIRECTION_IN, endpoint.wan_address, b"a")],
+                         records)
+
+    @inlineCallbacks
+    def test_replay(self):
+        """
+        Check if only the received datagrams are replayed, and the listeners are measured.
+        """
+        self.write_capture([(1.0, DIRECTION_IN, ("1.2.3.4", 5), b"a"), (1.0, DIRECTION_OUT, ("1.2.3.4", 5), b"b"),
+                            (1.1, DIRECTION_IN, ("1.2.3.4", 5), b"c")])
+        endpoint = ReplayEndpoint(self.file_path)
+        endpoint.open()
+        listener = MockEndpointListener(endpoint)
+
+        report = yield endpoint.replay(speed=2.0)
+
+        self.assertEqual([(("1.2.3.4", 5), b"a"), (("1.2.3.4", 5), b"c")], listener.received_packets)
+        self.assertEqual(2, report["packets"])
+        self.assertLessEqual(0.05, report["duration"])
+        self.assertEqual(2, report["overlays"]["MockEndpointListener"]["packets"])
+        self.assertEqual(2, report["overlays"]["MockEndpointListener"]["handler_latency"]["count"])
+
+    @inlineCallbacks
+    def test_replay_max_speed(self):
+        """
+        Check if all datagrams are replayed when replaying as fast as possible.
+        """
+        self.write_capture([(float(i), DIRECTION_IN, ("1.2.3.4", 5), b"a") for i in range(5)])
+        endpoint = ReplayEndpoint(self.file_path)
+        endpoint.open()
+        listener = MockEndpointListener(endpoint)
+
+        report = yield endpoint.replay(speed=None, chunk_size=2)
+
+        self.assertEqual(5, len(listener.received_packets))
+        self.assertEqual(5, report["packets"])
@@ -0,0 +1,237 @@
+from __future__ import absolute_import
+
+from twisted.internet.task import Clock
+
+from ....messaging.interfaces.fragmentation import (FRAGMENT_SIZE, Fragmenter, MAX_RETRANSMISSIONS,
+                                                    REASSEMBLY_BUDGET, RETRANSMIT_TIMEOUT, ReassemblyBudget,
+                                                    WINDOW_SIZE)
+from ...base import TestBase
+
+
+class LossyNetwork(object):
+    """
+    Queues the packets between fragmenters, until they are delivered or dropped by the test.
+    """
+
+    def __init__(self):
+        self.fragmenters = {}
+        self.budget = ReassemblyBudget()
+        self.queue = []
+        self.sent = []
+
+    def add(self, address, deliver):
+        endpoint = LossyEndpoint(self, address)
+        fragmenter = Fragmenter(endpoint, b"header", deliver, self.budget)
+        fragmenter._reactor = Clock()
+        self.fragmenters[address] = fragmenter
+        return fragmenter
+
+    def deliver_all(self, drop=lambda source, destination, data: False):
+        while self.queue:
+            source, destination, data = self.queue.pop(0)
+            if not drop(source, destination, data):
+                self.fragmenters[destination].on_fragment(source, data)
+
+
+class LossyEndpoint(object):
+
+    def __init__(self, network, address):
+        self.network = network
+        self.address = address
+
+    def send(self, address, data):
+        self.network.queue.append((self.address, address, data))
+        self.network.sent.append((self.address, address, data))
+
+
+class TestFragmentation(TestBase):
+    """
+    This class contains various tests for the fragmentation of large messages.
+    """
+
+    def setUp(self):
+        super(TestFragmentation, self).setUp()
+        self.received = []
+        self.network = LossyNetwork()
+        self.sender = self.network.add(("1.1.1.1", 1), lambda source, data: None)
+        self.receiver = self.network.add(("2.2.2.2", 2), lambda source, data: self.received.append((source, data)))
+        self.results = []
+
+    def tearDown(self):
+        self.sender.shutdown_task_manager()
+        self.receiver.shutdown_task_manager()
+        return super(TestFragmentation, self).tearDown()
+
+    def send(self, data):
+        self.sender.send(("2.2.2.2", 2), data).addCallback(self.results.append)
+
+    def advance(self, seconds):
+        self.sender._reactor.advance(seconds)
+        self.receiver._reactor.advance(seconds)
+
+    def test_send_large(self):
+        """
+        Check if a message larger than the window is delivered once and acknowledged.
+        """
+        data = bytes(bytearray(i % 256 for i in range(FRAGMENT_SIZE * WINDOW_SIZE * 2 + 10)))
+        self.send(data)
+        self.network.deliver_all()
+        self.advance(0.1)
+        self.network.deliver_all()
+
+        self.assertEqual([(("1.1.1.1", 1), data)], self.received)
+        self.assertEqual([True], self.results)
+        self.assertEqual(0, self.receiver.reassembly_bytes)
+
+    def test_send_empty(self):
+        """
+        Check if an empty message is delivered.
+        """
+        self.send(b"")
+        self.network.deliver_all()
+
+        self.assertEqual([(("1.1.1.1", 1), b"")], self.received)
+        self.assertEqual([True], self.results)
+
+    def test_selective_retransmit(self):
+        """
+        Check if only the lost fragments are retransmitted.
+        """
+        self.send(b"a" * FRAGMENT_SIZE * 4)
+        lost = []
+
+        def drop_second(source, destination, data):
+            if source == ("1.1.1.1", 1) and not lost and len(self.network.sent) > 1 and data == self.network.sent[1][2]:
+                lost.append(data)
+                return True
+            return False
+        self.network.deliver_all(drop_second)
+        self.advance(0.1)
+        self.network.deliver_all()
+        self.assertEqual([], self.received)
+
+        del self.network.sent[:]
+        self.advance(RETRANSMIT_TIMEOUT)
+        self.network.deliver_all()
+
+        self.assertEqual(lost, [data for source, _, data in self.network.sent if source == ("1.1.1.1", 1)])
+        self.assertEqual(1, len(self.received))
+        self.assertEqual([True], self.results)
+
+    def test_lost_ack(self):
+        """
+        Check if a retransmission of a delivered message is acknowledged again, but not delivered again.
+        """
+        self.send(b"a")
+        self.network.deliver_all(lambda source, destination, data: source == ("2.2.2.2", 2))
+        self.advance(RETRANSMIT_TIMEOUT)
+        self.network.deliver_all()
+
+        self.assertEqual(1, len(self.received))
+        self.assertEqual([True], self.results)
+
+    def test_lost_window_acks(self):
+        """
+        Check if retransmissions of an incomplete message are acknowledged again, after all acknowledgements were lost.
+        """
+        self.send(b"a" * FRAGMENT_SIZE * (WINDOW_SIZE + 1))
+        self.network.deliver_all(lambda source, destination, data: source == ("2.2.2.2", 2))
+        self.advance(RETRANSMIT_TIMEOUT)
+        self.network.deliver_all()
+        self.advance(0.1)
+        self.network.deliver_all()
+
+        self.assertEqual(1, len(self.received))
+        self.assertEqual([True], self.results)
+
+    def test_unreachable(self):
+        """
+        Check if sending fails after the maximum number of retransmissions.
+        """
+        self.send(b"a")
+        for _ in range(MAX_RETRANSMISSIONS + 1):
+            self.network.deliver_all(lambda source, destination, data: True)
+            self.advance(RETRANSMIT_TIMEOUT)
+
+        self.assertEqual([False], self.results)
+        self.assertEqual({}, self.sender.outgoing)
+
+    def test_reassembly_limit(self):
+        """
+        Check if messages which do not fit in the reassembly memory are dropped, until memory is available.
+        """
+        self.network.budget.max_bytes = FRAGMENT_SIZE * 3
+        self.send(b"a" * FRAGMENT_SIZE * 2)
+        self.send(b"b" * FRAGMENT_SIZE * 2)
+        first_fragments = [data for _, _, data in self.network.queue[::2]]
+        self.network.deliver_all(lambda source, destination, data: data not in first_fragments)
+
+        self.assertEqual(FRAGMENT_SIZE * 2, self.receiver.reassembly_bytes)
+
+        self.advance(RETRANSMIT_TIMEOUT)
+        self.network.deliver_all()
+        self.advance(RETRANSMIT_TIMEOUT)
+        self.network.deliver_all()
+
+        self.assertEqual([b"a" * FRAGMENT_SIZE * 2, b"b" * FRAGMENT_SIZE * 2], [data for _, data in self.received])
+        self.assertEqual(0, self.receiver.reassembly_bytes)
+
+    def test_shared_reassembly_limit(self):
+        """
+        Check if fragmenters which share a reassembly budget do not reserve more memory than the budget together.
+        """
+        other = []
+        other_receiver = self.network.add(("3.3.3.3", 3), lambda source, data: other.append(data))
+        self.addCleanup(other_receiver.shutdown_task_manager)
+        self.network.budget.max_bytes = FRAGMENT_SIZE * 3
+        self.send(b"a" * FRAGMENT_SIZE * 2)
+        self.network.queue.pop()
+        self.network.deliver_all()
+        self.sender.send(("3.3.3.3", 3), b"b" * FRAGMENT_SIZE * 2)
+        self.network.deliver_all()
+
+        self.assertEqual(FRAGMENT_SIZE * 2, self.receiver.reassembly_bytes)
+        self.assertEqual(0, other_receiver.reassembly_bytes)
+        self.assertEqual(FRAGMENT_SIZE * 2, self.network.budget.reserved)
+
+        self.advance(RETRANSMIT_TIMEOUT)
+        self.network.deliver_all()
+        self.advance(RETRANSMIT_TIMEOUT)
+        self.network.deliver_all()
+
+        self.assertEqual([b"a" * FRAGMENT_SIZE * 2], [data for _, data in self.received])
+        self.assertEqual([b"b" * FRAGMENT_SIZE * 2], other)
+        self.assertEqual(0, self.network.budget.reserved)
+
+    def test_shutdown_releases_budget(self):
+        """
+        Check if the memory of incomplete messages is returned to the reassembly budget on shutdown.
+        """
+        self.send(b"a" * FRAGMENT_SIZE * 2)
+        self.network.queue.pop()
+        self.network.deliver_all()
+
+        self.assertEqual(FRAGMENT_SIZE * 2, self.network.budget.reserved)
+        self.receiver.shutdown_task_manager()
+        self.assertEqual(0, self.network.budget.reserved)
+        self.assertEqual({}, self.receiver.incoming)
+        self.results.append(True)
+
+    def test_process_budget(self):
+        """
+        Check if fragmenters share the reassembly budget of the process by default.
+        """
+        fragmenter = Fragmenter(LossyEndpoint(self.network, ("4.4.4.4", 4)), b"header", lambda source, data: None)
+
+        self.assertIs(REASSEMBLY_BUDGET, fragmenter.budget)
+
+    def test_invalid_fragment(self):
+        """
+        Check if fragments with an inconsistent size are dropped.
+        """
+        self.send(b"a" * (FRAGMENT_SIZE + 1))
+        source, destination, data = self.network.queue.pop(0)
+        self.receiver.on_fragment(source, data[:-1])
+
+        self.assertEqual(0, self.receiver.reassembly_bytes)
+        self.assertEqual({}, self.receiver.incoming)
@@ -0,0 +1,80 @@
+from __future__ import absolute_import
+
+from ....messaging.interfaces import interface_cache
+from ....messaging.interfaces.interface_cache import (Interface, InterfaceCache, SubnetMatcher, address_to_int,
+                                                      prefix_length_to_netmask)
+from ...base import TestBase
+
+
+class TestInterfaceCache(TestBase):
+    """
+    This class contains various tests for the cached interfaces and LAN subnets.
+    """
+
+    def setUp(self):
+        super(TestInterfaceCache, self).setUp()
+        self.reads = 0
+        self.interfaces = [Interface("lo", "127.0.0.1", "255.0.0.0", None),
+                           Interface("eth0", "192.168.1.5", "255.255.255.0", "192.168.1.255")]
+        self.patch(interface_cache, "netifaces", object())
+        self.patch(interface_cache, "get_interface_addresses", self.get_interface_addresses)
+        self.patch(interface_cache, "get_lan_address_without_netifaces", lambda: "1.2.3.4")
+        self.cache = InterfaceCache()
+
+    def get_interface_addresses(self):
+        self.reads += 1
+        return iter(self.interfaces)
+
+    def test_subnet_matcher(self):
+        """
+        Check if addresses are matched against all subnets, with different netmasks.
+        """
+        matcher = SubnetMatcher()
+        matcher.add(address_to_int("10.0.0.0"), prefix_length_to_netmask(8))
+        matcher.add(address_to_int("192.168.1.1"), prefix_length_to_netmask(24))
+
+        self.assertIn("10.200.3.4", matcher)
+        self.assertIn("192.168.1.254", matcher)
+        self.assertNotIn("192.168.2.1", matcher)
+        self.assertNotIn("11.0.0.1", matcher)
+
+    def test_lan_from_interfaces(self):
+        """
+        Check if the LAN address and subnets are taken from the interfaces.
+        """
+        self.assertEqual("192.168.1.5", self.cache.get_lan_address())
+        self.assertFalse(self.cache.netifaces_failed)
+        self.assertTrue(self.cache.address_is_lan("192.168.1.77"))
+        self.assertTrue(self.cache.address_is_lan("127.0.0.5"))
+        self.assertFalse(self.cache.address_is_lan("192.168.2.1"))
+        self.assertFalse(self.cache.address_is_lan("10.0.0.1"))
+
+    def test_lan_without_interfaces(self):
+        """
+        Check if the private subnets are used when none of the interfaces is usable.
+        """
+        self.interfaces = [Interface("lo", "127.0.0.1", "255.0.0.0", None)]
+
+        self.assertEqual("1.2.3.4", self.cache.get_lan_address())
+        self.assertTrue(self.cache.netifaces_failed)
+        self.assertTrue(self.cache.address_is_lan("1.2.3.4"))
+        self.assertTrue(self.cache.address_is_lan("10.1.2.3"))
+        self.assertTrue(self.cache.address_is_lan("172.31.0.1"))
+        self.assertFalse(self.cache.address_is_lan("172.32.0.1"))
+        self.assertFalse(self.cache.address_is_lan("8.8.8.8"))
+
+    def test_cached(self):
+        """
+        Check if the interfaces are only read again after the refresh interval.
+        """
+        for _ in range(10):
+            self.cache.get_lan_address()
+            self.cache.address_is_lan("192.168.1.77")
+        self.assertEqual(1, self.reads)
+
+        self.interfaces = [Interface("eth1", "10.0.0.2", "255.0.0.0", "10.255.255.255")]
+        self.cache.last_refresh -= self.cache.refresh_interval
+
+        self.assertEqual("10.0.0.2", self.cache.get_lan_address())
+        self.assertFalse(self.cache.address_is_lan("192.168.1.77"))
+        self.assertEqual(2, self.reads)
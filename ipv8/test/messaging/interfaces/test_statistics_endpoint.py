@@ -0,0 +1,129 @@
+from __future__ import absolute_import
+
+from ....keyvault.crypto import default_eccrypto
+from ....messaging.anonymization.endpoint import TunnelEndpoint
+from ....messaging.interfaces.network_stats import LATENCY_BUCKETS, LatencyHistogram, NetworkStat, RateWindow
+from ....messaging.interfaces.statistics_endpoint import StatisticsEndpoint
+from ....peer import Peer
+from ....peerdiscovery.community import DiscoveryCommunity
+from ....peerdiscovery.network import Network
+from ...base import TestBase
+from ...mocking.endpoint import AutoMockEndpoint
+
+
+class TestStatisticsEndpoint(TestBase):
+    """
+    This class contains various tests for the statistics of the StatisticsEndpoint.
+    """
+
+    def setUp(self):
+        super(TestStatisticsEndpoint, self).setUp()
+        mock_endpoint = AutoMockEndpoint()
+        mock_endpoint.open()
+        self.endpoint = StatisticsEndpoint(None, mock_endpoint)
+        self.community = DiscoveryCommunity(Peer(default_eccrypto.generate_key(u"very-low"), mock_endpoint.wan_address),
+                                            self.endpoint, Network())
+        self.prefix = self.community.get_prefix()
+
+    def tearDown(self):
+        self.community.unload()
+        self.endpoint.close()
+        return super(TestStatisticsEndpoint, self).tearDown()
+
+    def test_latency_histogram(self):
+        """
+        Check if the latency percentiles are within the relative error of the buckets.
+        """
+        histogram = LatencyHistogram()
+        for latency in range(1, 101):
+            histogram.add(latency / 1000.0)
+
+        self.assertEqual(100, histogram.count)
+        self.assertAlmostEqual(0.0505, histogram.to_dict()["mean"])
+        self.assertLessEqual(0.05, histogram.get_percentile(50))
+        self.assertGreater(0.05 * 1.25, histogram.get_percentile(50))
+        self.assertEqual(0.1, histogram.get_percentile(100))
+
+    def test_latency_histogram_overflow(self):
+        """
+        Check if latencies beyond the largest bucket are counted.
+        """
+        histogram = LatencyHistogram()
+        histogram.add(LATENCY_BUCKETS[-1] * 2, 3)
+
+        self.assertEqual(LATENCY_BUCKETS[-1] * 2, histogram.get_percentile(50))
+        self.assertEqual([[None, 3]], histogram.to_dict()["buckets"])
+
+    def test_rate_window(self):
+        """
+        Check if rates are averaged over the last completed seconds.
+        """
+        window = RateWindow()
+        for timestamp in (100.1, 100.5, 109.2, 110.0):
+            window.add(timestamp, 10)
+
+        self.assertEqual((1.0, 10.0), window.get_rates(1, 110.5))
+        self.assertEqual((0.3, 3.0), window.get_rates(10, 110.5))
+        self.assertEqual((0.05, 0.5), window.get_rates(60, 110.5))
+        self.assertEqual((0.0, 0.0), window.get_rates(60, 300.0))
+
+    def test_network_stat_to_dict(self):
+        """
+        Check if the rates and latencies of a statistic are exported.
+        """
+        stat = NetworkStat(1)
+        stat.add_received_stat(100.0, 10)
+        stat.add_handler_latency(0.001)
+
+        exported = stat.to_dict(101.0)
+
+        self.assertEqual(1, exported["handler_latency"]["count"])
+        self.assertEqual({"messages": 1.0, "bytes": 10.0}, exported["rate_down"]["1s"])
+        self.assertEqual({"messages": 0.0, "bytes": 0.0}, exported["rate_up"]["1s"])
+
+    def test_handler_latency(self):
+        """
+        Check if the latency of message handlers is measured when statistics are enabled.
+        """
+        packet = self.community.create_puncture(("1.2.3.4", 5), ("2.3.4.5", 6), 1)
+        self.community.on_packet((("1.2.3.4", 5), packet))
+        self.assertEqual({}, self.endpoint.get_statistics(self.prefix))
+
+        self.endpoint.enable_community_statistics(self.prefix, True)
+        self.community.on_packet((("1.2.3.4", 5), packet))
+
+        self.assertEqual(1, self.endpoint.get_statistics(self.prefix)[249].handler_latency.count)
+
+    def test_handler_latency_wrapped(self):
+        """
+        Check if the latency of message handlers is measured when the endpoint is wrapped by a TunnelEndpoint.
+        """
+        community = DiscoveryCommunity(Peer(default_eccrypto.generate_key(u"very-low"), self.endpoint.wan_address),
+                                       TunnelEndpoint(self.endpoint), Network())
+        self.addCleanup(community.unload)
+        packet = community.create_puncture(("1.2.3.4", 5), ("2.3.4.5", 6), 1)
+        self.endpoint.enable_community_statistics(self.prefix, True)
+        community.on_packet((("1.2.3.4", 5), packet))
+
+        self.assertEqual(1, self.endpoint.get_statistics(self.prefix)[249].handler_latency.count)
+
+    def test_handler_latency_disabled(self):
+        """
+        Check if the latency of a message handler is not stored for a community without statistics.
+        """
+        self.endpoint.add_handler_latency(self.prefix, 249, 0.001)
+
+        self.assertFalse(self.endpoint.is_enabled(self.prefix))
+        self.assertEqual({}, self.endpoint.get_statistics(self.prefix))
+
+    def test_sent_statistics(self):
+        """
+        Check if only packets of enabled communities are counted.
+        """
+        packet = self.community.create_puncture(("1.2.3.4", 5), ("2.3.4.5", 6), 1)
+        self.endpoint.send(self.endpoint.wan_address, packet)
+        self.endpoint.enable_community_statistics(self.prefix, True)
+        self.endpoint.send(self.endpoint.wan_address, packet)
+
+        self.assertEqual(1, self.endpoint.get_message_sent(self.prefix, include_puncture=True))
+        self.assertEqual(len(packet), self.endpoint.get_bytes_sent(self.prefix, include_puncture=True))
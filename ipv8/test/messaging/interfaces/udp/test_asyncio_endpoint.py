@@ -0,0 +1,134 @@
+from __future__ import absolute_import
+
+from threading import Thread
+from unittest import skipIf
+
+from six.moves import xrange
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+
+from .test_endpoint import DummyEndpointListener
+from .....scheduler import AsyncioScheduler, asyncio, get_scheduler, is_in_io_thread, new_event_loop, set_scheduler
+from .....requestcache import NumberCache, RequestCache
+from .....taskmanager import TaskManager
+from ....base import TestBase
+
+
+class MockCache(NumberCache):
+
+    def __init__(self, request_cache):
+        super(MockCache, self).__init__(request_cache, u"mock", 0)
+        self.timed_out = False
+
+    @property
+    def timeout_delay(self):
+        return 0.01
+
+    def on_timeout(self):
+        self.timed_out = True
+
+
+@skipIf(asyncio is None, "asyncio is not available on this platform")
+class TestAsyncioUDPEndpoint(TestBase):
+    """
+    This class contains various tests for running IPv8 on an asyncio event loop.
+    """
+
+    def setUp(self):
+        super(TestAsyncioUDPEndpoint, self).setUp()
+        self.loop = new_event_loop()
+        set_scheduler(AsyncioScheduler(self.loop))
+
+        from .....messaging.interfaces.udp.asyncio_endpoint import AsyncioUDPEndpoint
+        self.endpoint1 = AsyncioUDPEndpoint(8080)
+        self.endpoint1.open()
+        self.endpoint2 = AsyncioUDPEndpoint(8081)
+        self.endpoint2.open()
+
+        self.ep1_address = ("127.0.0.1", self.endpoint1.get_address()[1])
+        self.ep2_address = ("127.0.0.1", self.endpoint2.get_address()[1])
+
+        self.endpoint2_listener = DummyEndpointListener(self.endpoint2)
+        self.endpoint2.add_listener(self.endpoint2_listener)
+
+    def tearDown(self):
+        self.endpoint1.close()
+        self.endpoint2.close()
+        self.run_loop(0)
+        self.loop.close()
+        set_scheduler(reactor)
+        return super(TestAsyncioUDPEndpoint, self).tearDown()
+
+    def run_loop(self, time):
+        self.loop.run_until_complete(asyncio.sleep(time))
+
+    def test_send_message(self):
+        """
+        Test sending a basic message through the asyncio endpoint.
+        """
+        self.endpoint1.send(self.ep2_address, b'a' * 10)
+        self.run_loop(0.05)
+
+        self.assertEqual([(self.ep1_address, b'a' * 10)], self.endpoint2_listener.incoming)
+        self.assertEqual(10, self.endpoint1.bytes_up)
+        self.assertEqual(10, self.endpoint2.bytes_down)
+
+    def test_send_many_messages(self):
+        """
+        Test sending multiple messages through the asyncio endpoint.
+        """
+        for ind in xrange(0, 50):
+            self.endpoint1.send(self.ep2_address, b'a' * ind)
+        self.run_loop(0.05)
+
+        self.assertEqual(50, len(self.endpoint2_listener.incoming))
+        self.assertEqual(sum(xrange(0, 50)), self.endpoint1.bytes_up)
+
+    def test_send_too_big_message(self):
+        """
+        Test sending a too big message through the asyncio endpoint.
+        """
+        self.endpoint1.send(self.ep2_address, b'a' * (70000))
+        self.run_loop(0.05)
+
+        self.assertEqual([], self.endpoint2_listener.incoming)
+
+    def test_task_manager(self):
+        """
+        Test if the delayed calls and looping calls of a TaskManager run on the asyncio loop.
+        """
+        calls = []
+        task_manager = TaskManager()
+        task_manager.register_task("delayed", task_manager._reactor.callLater(0.01, calls.append, "delayed"))
+        task_manager.register_task("looping", LoopingCall(calls.append, "looping")).start(0.1)
+        self.run_loop(0.05)
+        task_manager.shutdown_task_manager()
+
+        self.assertEqual(["looping", "delayed"], calls)
+        self.assertFalse(task_manager.is_pending_task_active("delayed"))
+
+    def test_request_cache_timeout(self):
+        """
+        Test if the caches of a RequestCache time out on the asyncio loop.
+        """
+        request_cache = RequestCache()
+        cache = request_cache.add(MockCache(request_cache))
+        self.run_loop(0.05)
+        request_cache.shutdown()
+
+        self.assertTrue(cache.timed_out)
+        self.assertFalse(request_cache.has(u"mock", 0))
+
+    def test_is_in_io_thread(self):
+        """
+        Test if only calls on the asyncio loop are recognized as running on the IO thread.
+        """
+        scheduler = get_scheduler()
+        results = []
+        thread = Thread(target=lambda: results.append(is_in_io_thread(scheduler)))
+        self.loop.call_soon(lambda: results.append(is_in_io_thread(scheduler)))
+        self.loop.call_soon(thread.start)
+        self.run_loop(0.05)
+        thread.join()
+
+        self.assertEqual([True, False], results)
@@ -1,11 +1,11 @@
 from __future__ import absolute_import
 
 import socket
-import sys
-from unittest import skipIf
 
 from six.moves import xrange
+from twisted.internet import reactor
 from twisted.internet.defer import inlineCallbacks
+from twisted.internet.task import deferLater
 
 from .....messaging.interfaces.endpoint import EndpointListener
 from .....messaging.interfaces.udp.endpoint import UDPEndpoint, UDP_MAX_SIZE
@@ -70,6 +70,98 @@ class TestUDPEndpoint(TestBase):
         yield self.sleep(0.05)
         self.assertEqual(len(self.endpoint2_listener.incoming), 50)
 
+    def on_reactor(self, f, *args):
+        """
+        Call a function from the running reactor, like the endpoint does when it receives packets.
+        """
+        return deferLater(reactor, 0, f, *args)
+
+    @inlineCallbacks
+    def test_notify_listeners_batch(self):
+        """
+        Test delivering a batch of packets to a listener that handles packets one by one.
+        """
+        packets = [(self.ep2_address, b'a' * ind) for ind in xrange(3)]
+        yield self.on_reactor(self.endpoint2.notify_listeners_batch, packets)
+        self.assertEqual(packets, self.endpoint2_listener.incoming)
+
+    @inlineCallbacks
+    def test_notify_listeners_in_thread(self):
+        """
+        Test if packets are delivered directly, when the endpoint is notified on the reactor thread.
+        """
+        def notify():
+            self.endpoint2.notify_listeners((self.ep2_address, b'a'))
+            return list(self.endpoint2_listener.incoming)
+        incoming = yield self.on_reactor(notify)
+        self.assertEqual([(self.ep2_address, b'a')], incoming)
+
+    @inlineCallbacks
+    def test_batch_delivery(self):
+        """
+        Test if the packets of one reactor iteration are delivered in one batch, when batch delivery is enabled.
+        """
+        batches = []
+        self.endpoint2_listener.on_packets = batches.append
+        self.endpoint2.set_batch_delivery(True)
+
+        packets = [(self.ep2_address, b'a' * ind) for ind in xrange(3)]
+        for packet in packets[:2]:
+            self.endpoint2.notify_listeners(packet)
+        self.endpoint2.notify_listeners_batch(packets[2:])
+        self.assertEqual([], batches)
+        yield self.sleep(0.05)
+
+        self.assertEqual([packets], batches)
+
+    @inlineCallbacks
+    def test_prefix_listener(self):
+        """
+        Test if prefix listeners only receive their own packets, while other listeners receive all packets.
+        """
+        prefix_listener = DummyEndpointListener(self.endpoint2)
+        self.endpoint2.add_listener(prefix_listener)
+        self.endpoint2.add_prefix_listener(prefix_listener, b'\x00\x02')
+
+        yield self.on_reactor(self.endpoint2.notify_listeners, (self.ep2_address, b'\x00\x02a'))
+        yield self.on_reactor(self.endpoint2.notify_listeners, (self.ep2_address, b'\x00\x01b'))
+
+        self.assertEqual([(self.ep2_address, b'\x00\x02a')], prefix_listener.incoming)
+        self.assertEqual(2, len(self.endpoint2_listener.incoming))
+
+    @inlineCallbacks
+    def test_prefix_listener_batch(self):
+        """
+        Test if prefix listeners only receive their own packets of a batch, in a single call.
+        """
+        batches = []
+        prefix_listener = DummyEndpointListener(self.endpoint2)
+        prefix_listener.on_packets = batches.append
+        self.endpoint2.add_prefix_listener(prefix_listener, b'\x00\x02')
+
+        packets = [(self.ep2_address, b'\x00\x02a'), (self.ep2_address, b'\x00\x01b'), (self.ep2_address, b'\x00\x02c')]
+        yield self.on_reactor(self.endpoint2.notify_listeners_batch, packets)
+
+        self.assertEqual([[packets[0], packets[2]]], batches)
+        self.assertEqual(packets, self.endpoint2_listener.incoming)
+
+    @inlineCallbacks
+    def test_remove_prefix_listener(self):
+        """
+        Test if removed prefix listeners no longer receive packets, while other listeners still do.
+        """
+        prefix_listener = DummyEndpointListener(self.endpoint2)
+        self.endpoint2.add_prefix_listener(prefix_listener, b'\x00\x02')
+        yield self.on_reactor(self.endpoint2.notify_listeners, (self.ep2_address, b'\x00\x02a'))
+        self.assertEqual([(self.ep2_address, b'\x00\x02a')], prefix_listener.incoming)
+
+        self.endpoint2.remove_listener(prefix_listener)
+        yield self.on_reactor(self.endpoint2.notify_listeners, (self.ep2_address, b'\x00\x02b'))
+
+        self.assertEqual([(self.ep2_address, b'\x00\x02a')], prefix_listener.incoming)
+        self.assertEqual([(self.ep2_address, b'\x00\x02a'), (self.ep2_address, b'\x00\x02b')],
+                         self.endpoint2_listener.incoming)
+
     def test_send_too_big_message(self):
         """
         Test sending a too big message through the UDP endpoint.
@@ -82,56 +174,102 @@ class TestUDPEndpoint(TestBase):
         """
         self.endpoint1.send(("0.0.0.0", 0), b'a' * 10)
 
-    @skipIf(sys.version_info.major > 2, "sendto is write-only in Python3")
+    def block_endpoint(self, endpoint):
+        """
+        Make the socket of an endpoint raise a Windows WSAEWOULDBLOCK on sending.
+
+        :return: the function to unblock the endpoint
+        """
+        def cb_err_write(data, sock_addr):
+            raise socket.error(10035, "Fake WSAEWOULDBLOCK")
+        real_write = endpoint.transport.write
+        endpoint.transport.write = cb_err_write
+
+        def unblock():
+            endpoint.transport.write = real_write
+        return unblock
+
     @inlineCallbacks
     def test_blocking_endpoint_resend(self):
         """
         Test rescheduling on blocking socket in Windows.
         """
-        # Raise an error on socket send()
-        def cb_err_sendto(data, sock_addr):
-            raise socket.error(10035, "Fake WSAEWOULDBLOCK")
-        real_sendto = self.endpoint1.transport.socket.sendto
-        self.endpoint1.transport.socket.sendto = cb_err_sendto
+        unblock = self.block_endpoint(self.endpoint1)
 
         # The following send raises a WSAEWOULDBLOCK and should queue the packet
-        self.endpoint1.send(self.ep2_address, 'a' * 20)
-        self.endpoint1.transport.socket.sendto = real_sendto
+        self.endpoint1.send(self.ep2_address, b'a' * 20)
+        self.endpoint1.send(self.ep2_address, b'b' * 20)
         yield self.sleep(0.05)
         # Nothing should have arrived
         self.assertEqual(len(self.endpoint2_listener.incoming), 0)
+        self.assertEqual(2, self.endpoint1.get_send_queue_statistics()["queued_packets"])
 
-        # Now that the socket no longer errors, both messages should be delivered
-        self.endpoint1.send(self.ep2_address, 'a' * 20)
+        # Now that the socket no longer errors, both messages should be delivered in order
+        unblock()
         yield self.sleep(0.05)
-        self.assertEqual(len(self.endpoint2_listener.incoming), 2)
+        self.assertEqual([b'a' * 20, b'b' * 20], [data for _, data in self.endpoint2_listener.incoming])
+        self.assertEqual(2, self.endpoint1.get_send_queue_statistics()["sent_packets"])
 
-    @skipIf(sys.version_info.major > 2, "sendto is write-only in Python3")
     @inlineCallbacks
     def test_blocking_endpoint_resend_limit(self):
         """
-        Test not rescheduling more than 100 packets.
+        Test dropping the oldest packets when the queued packets exceed the byte budget.
         """
+        self.endpoint1.send_queue.max_bytes = 100 * 10
+        unblock = self.block_endpoint(self.endpoint1)
 
-        # Raise an error on socket send()
-        def cb_err_sendto(data, sock_addr):
-            raise socket.error(10035, "Fake WSAEWOULDBLOCK")
-
-        real_sendto = self.endpoint1.transport.socket.sendto
-        self.endpoint1.transport.socket.sendto = cb_err_sendto
-
-        # The following send raises a WSAEWOULDBLOCK and should queue the packet
         for i in xrange(102):
-            self.endpoint1.send(self.ep2_address, str(i))
-        self.endpoint1.transport.socket.sendto = real_sendto
+            self.endpoint1.send(self.ep2_address, b'%010d' % i)
         yield self.sleep(0.05)
         # Nothing should have arrived
         self.assertEqual(len(self.endpoint2_listener.incoming), 0)
+        self.assertEqual(2, self.endpoint1.get_send_queue_statistics()["dropped_packets"])
 
         # Now that the socket no longer errors, messages should be delivered
         # The first two messages ('0' and '1') should have been bumped out of the queue
-        self.endpoint1.send(self.ep2_address, '102')
+        unblock()
         yield self.sleep(0.05)
-        self.assertEqual(len(self.endpoint2_listener.incoming), 101)
+        self.assertEqual(len(self.endpoint2_listener.incoming), 100)
         self.assertSetEqual({data for _, data in self.endpoint2_listener.incoming},
-                            {str(i) for i in xrange(2, 103)})
+                            {b'%010d' % i for i in xrange(2, 102)})
+
+    def test_priority(self):
+        """
+        Test if queued introductions are sent before other queued packets.
+        """
+        unblock = self.block_endpoint(self.endpoint1)
+        sent = []
+        self.endpoint1.send(self.ep2_address, b'\x00' * 22 + b'\x01')
+        self.endpoint1.send(self.ep2_address, b'\x00' * 22 + b'\xf6')
+        unblock()
+        self.endpoint1.transport.write = lambda data, _: sent.append(data)
+        self.endpoint1._drain()
+
+        self.assertEqual([b'\x00' * 22 + b'\xf6', b'\x00' * 22 + b'\x01'], sent)
+
+    @inlineCallbacks
+    def test_pacing(self):
+        """
+        Test if packets are paced to the configured rate.
+        """
+        self.endpoint1.send_queue.rate = self.endpoint1.send_queue.burst = 1000
+        for _ in xrange(3):
+            self.endpoint1.send(self.ep2_address, b'a' * 500)
+        yield self.sleep(0.05)
+        self.assertEqual(2, len(self.endpoint2_listener.incoming))
+
+        yield self.sleep(0.6)
+        self.assertEqual(3, len(self.endpoint2_listener.incoming))
+        self.assertLess(0.0, self.endpoint1.get_send_queue_statistics()["pacing_delay"])
+
+    def test_congestion(self):
+        """
+        Test if the endpoint signals congestion when half of its byte budget is queued.
+        """
+        self.endpoint1.send_queue.max_bytes = 100
+        self.block_endpoint(self.endpoint1)
+
+        self.endpoint1.send(self.ep2_address, b'a' * 50)
+        self.assertFalse(self.endpoint1.is_congested())
+        self.endpoint1.send(self.ep2_address, b'a')
+        self.assertTrue(self.endpoint1.is_congested())
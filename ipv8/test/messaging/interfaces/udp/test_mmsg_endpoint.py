@@ -0,0 +1,142 @@
+from __future__ import absolute_import
+
+from unittest import skipUnless
+
+from six.moves import xrange
+from twisted.internet.defer import inlineCallbacks
+
+from .test_endpoint import DummyEndpointListener
+from .....messaging.interfaces.udp.endpoint import UDPEndpoint, UDP_MAX_SIZE
+from .....messaging.interfaces.udp.mmsg_endpoint import MMsgUDPEndpoint, mmsg_available
+from ....base import TestBase
+
+
+class DummyBatchEndpointListener(DummyEndpointListener):
+    """
+    This class listens on an endpoint and stores incoming batches of packets in a list.
+    """
+    def __init__(self, endpoint):
+        super(DummyBatchEndpointListener, self).__init__(endpoint)
+        self.batches = []
+
+    def on_packets(self, packets):
+        self.batches.append(packets)
+        super(DummyBatchEndpointListener, self).on_packets(packets)
+
+
+@skipUnless(mmsg_available(), "recvmmsg and sendmmsg are not available on this platform")
+class TestMMsgUDPEndpoint(TestBase):
+    """
+    This class contains various tests for the recvmmsg/sendmmsg UDP endpoint.
+    """
+
+    @inlineCallbacks
+    def setUp(self):
+        yield super(TestMMsgUDPEndpoint, self).setUp()
+        self.endpoint1 = MMsgUDPEndpoint(8080, batch_size=8)
+        self.endpoint1.open()
+        self.endpoint2 = MMsgUDPEndpoint(8081, batch_size=8)
+        self.endpoint2.open()
+
+        self.ep1_address = ("127.0.0.1", self.endpoint1.get_address()[1])
+        self.ep2_address = ("127.0.0.1", self.endpoint2.get_address()[1])
+
+        self.endpoint2_listener = DummyBatchEndpointListener(self.endpoint2)
+        self.endpoint2.add_listener(self.endpoint2_listener)
+
+    @inlineCallbacks
+    def tearDown(self):
+        yield self.endpoint1.close()
+        yield self.endpoint2.close()
+        yield super(TestMMsgUDPEndpoint, self).tearDown()
+
+    @inlineCallbacks
+    def test_send_message(self):
+        """
+        Test sending a basic message through the endpoint.
+        """
+        self.endpoint1.send(self.ep2_address, b'a' * 10)
+        yield self.sleep(0.05)
+
+        self.assertEqual([(self.ep1_address, b'a' * 10)], self.endpoint2_listener.incoming)
+        self.assertEqual(10, self.endpoint1.bytes_up)
+        self.assertEqual(10, self.endpoint2.bytes_down)
+
+    @inlineCallbacks
+    def test_send_many_messages(self):
+        """
+        Test sending more messages than fit in a single batch, these should arrive in order and in batches.
+        """
+        for ind in xrange(0, 50):
+            self.endpoint1.send(self.ep2_address, b'a' * ind)
+        yield self.sleep(0.05)
+
+        self.assertEqual([b'a' * ind for ind in xrange(0, 50)], [data for _, data in self.endpoint2_listener.incoming])
+        self.assertLess(len(self.endpoint2_listener.batches), 50)
+        self.assertTrue(all(len(batch) <= 8 for batch in self.endpoint2_listener.batches))
+
+    @inlineCallbacks
+    def test_interoperability(self):
+        """
+        Test exchanging messages with a regular UDPEndpoint.
+        """
+        endpoint = UDPEndpoint(8082)
+        endpoint.open()
+        self.addCleanup(endpoint.close)
+        listener = DummyEndpointListener(endpoint)
+        endpoint.add_listener(listener)
+        address = ("127.0.0.1", endpoint.get_address()[1])
+
+        endpoint.send(self.ep2_address, b'a')
+        self.endpoint2.send(address, b'b')
+        yield self.sleep(0.05)
+
+        self.assertEqual([(address, b'a')], self.endpoint2_listener.incoming)
+        self.assertEqual([(self.ep2_address, b'b')], listener.incoming)
+
+    @inlineCallbacks
+    def test_send_too_big_message(self):
+        """
+        Test sending a too big message, which should not block the messages after it.
+        """
+        self.endpoint1.send(self.ep2_address, b'a')
+        self.endpoint1.send(self.ep2_address, b'a' * (UDP_MAX_SIZE + 1000))
+        self.endpoint1.send(self.ep2_address, b'b')
+        yield self.sleep(0.05)
+
+        self.assertEqual([b'a', b'b'], [data for _, data in self.endpoint2_listener.incoming])
+
+    def test_send_invalid_destination(self):
+        """
+        Test sending a message with an invalid destination.
+        """
+        self.endpoint1.send(("0.0.0.0", 0), b'a' * 10)
+        self.endpoint1.send(("not an address", 1), b'a' * 10)
+        self.endpoint1.flush()
+
+    @inlineCallbacks
+    def test_flush_on_close(self):
+        """
+        Test if queued messages are sent when the endpoint is closed.
+        """
+        self.endpoint1.send(self.ep2_address, b'a')
+        yield self.endpoint1.close()
+        yield self.sleep(0.05)
+
+        self.assertEqual([b'a'], [data for _, data in self.endpoint2_listener.incoming])
+
+    @inlineCallbacks
+    def test_send_queue(self):
+        """
+        Test if packets are paced and counted by the send queue of the UDPEndpoint.
+        """
+        self.endpoint1.send_queue.destination_rate = self.endpoint1.send_queue.destination_burst = 10
+        for _ in xrange(3):
+            self.endpoint1.send(self.ep2_address, b'a' * 10)
+        yield self.sleep(0.05)
+
+        statistics = self.endpoint1.get_send_queue_statistics()
+        self.assertEqual(UDPEndpoint(8082).get_send_queue_statistics().keys(), statistics.keys())
+        self.assertEqual(1, len(self.endpoint2_listener.incoming))
+        self.assertEqual(2, statistics["queued_packets"])
+        self.assertEqual(1, statistics["sent_packets"])
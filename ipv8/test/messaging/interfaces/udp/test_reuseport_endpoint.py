@@ -0,0 +1,51 @@
+from __future__ import absolute_import
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.trial.unittest import SkipTest
+
+from .....messaging.interfaces.udp.reuseport_endpoint import ReusePortUDPEndpoint, reuseport_available
+from ....base import TestBase
+from .test_endpoint import DummyEndpointListener
+
+
+class TestReusePortUDPEndpoint(TestBase):
+    """
+    This class contains various tests for the UDP endpoint which shares its port.
+    """
+
+    @inlineCallbacks
+    def setUp(self):
+        yield super(TestReusePortUDPEndpoint, self).setUp()
+        if not reuseport_available():
+            raise SkipTest("SO_REUSEPORT is not available on this platform")
+        self.endpoint1 = ReusePortUDPEndpoint(8090)
+        self.endpoint1.open()
+        self.endpoint2 = ReusePortUDPEndpoint(self.endpoint1.get_address()[1])
+        self.endpoint2.open()
+
+    @inlineCallbacks
+    def tearDown(self):
+        yield self.endpoint1.close()
+        yield self.endpoint2.close()
+        yield super(TestReusePortUDPEndpoint, self).tearDown()
+
+    def test_share_port(self):
+        """
+        Test if both endpoints listen on the same port.
+        """
+        self.assertEqual(self.endpoint1.get_address()[1], self.endpoint2.get_address()[1])
+
+    @inlineCallbacks
+    def test_send_message(self):
+        """
+        Test if a message sent to the shared port arrives at exactly one of the endpoints.
+        """
+        listener1 = DummyEndpointListener(self.endpoint1)
+        self.endpoint1.add_listener(listener1)
+        listener2 = DummyEndpointListener(self.endpoint2)
+        self.endpoint2.add_listener(listener2)
+
+        self.endpoint1.send(("127.0.0.1", self.endpoint1.get_address()[1]), b'a' * 10)
+        yield self.sleep(0.05)
+
+        self.assertEqual(1, len(listener1.incoming) + len(listener2.incoming))
@@ -0,0 +1,132 @@
+from __future__ import absolute_import
+
+from .....messaging.interfaces.udp.send_queue import (PRIORITY_BULK, PRIORITY_HIGH, PRIORITY_NORMAL, SendQueue,
+                                                      TokenBucket, get_priority)
+from ....base import TestBase
+
+
+class TestSendQueue(TestBase):
+    """
+    This class contains various tests for the send queue of the UDP endpoint.
+    """
+
+    def setUp(self):
+        super(TestSendQueue, self).setUp()
+        self.queue = SendQueue(max_bytes=100)
+
+    def pop_all(self, now=0.0):
+        packets = []
+        popped = self.queue.pop(now)
+        while popped is not None:
+            packets.append(popped[0][1])
+            popped = self.queue.pop(now)
+        return packets
+
+    def test_get_priority(self):
+        """
+        Test if introductions and punctures are classified as high priority.
+        """
+        self.assertEqual(PRIORITY_HIGH, get_priority(b'\x00' * 22 + b'\xf5'))
+        self.assertEqual(PRIORITY_HIGH, get_priority(b'\x00' * 22 + b'\xfa'))
+        self.assertEqual(PRIORITY_NORMAL, get_priority(b'\x00' * 22 + b'\x01'))
+        self.assertEqual(PRIORITY_NORMAL, get_priority(b'\xf5'))
+
+    def test_token_bucket(self):
+        """
+        Test if a token bucket allows a burst and then paces to its rate.
+        """
+        bucket = TokenBucket(100, 200, 0.0)
+
+        self.assertTrue(bucket.consume(200, 0.0))
+        self.assertFalse(bucket.consume(50, 0.0))
+        self.assertAlmostEqual(0.5, bucket.delay(50, 0.0))
+        self.assertTrue(bucket.consume(50, 0.5))
+
+    def test_priority_order(self):
+        """
+        Test if higher priority packets are popped first, and packets of the same priority in order.
+        """
+        self.queue.push(("1.2.3.4", 5), b'bulk', PRIORITY_BULK, 0.0)
+        self.queue.push(("1.2.3.4", 5), b'normal1', PRIORITY_NORMAL, 0.0)
+        self.queue.push(("1.2.3.4", 5), b'normal2', PRIORITY_NORMAL, 0.0)
+        self.queue.push(("1.2.3.4", 5), b'high', PRIORITY_HIGH, 0.0)
+
+        self.assertEqual([b'high', b'normal1', b'normal2', b'bulk'], self.pop_all())
+        self.assertEqual(0, len(self.queue))
+
+    def test_destinations_take_turns(self):
+        """
+        Test if the destinations of the same priority take turns.
+        """
+        self.queue.push(("1.2.3.4", 5), b'a1', PRIORITY_NORMAL, 0.0)
+        self.queue.push(("1.2.3.4", 5), b'a2', PRIORITY_NORMAL, 0.0)
+        self.queue.push(("1.2.3.4", 6), b'b1', PRIORITY_NORMAL, 0.0)
+
+        self.assertEqual([b'a1', b'b1', b'a2'], self.pop_all())
+
+    def test_byte_budget(self):
+        """
+        Test if the oldest packets of the lowest priority are dropped when the byte budget is exceeded.
+        """
+        self.queue.push(("1.2.3.4", 5), b'a' * 40, PRIORITY_NORMAL, 0.0)
+        self.queue.push(("1.2.3.4", 5), b'b' * 40, PRIORITY_BULK, 0.0)
+        self.queue.push(("1.2.3.4", 5), b'c' * 40, PRIORITY_HIGH, 0.0)
+
+        self.assertEqual(1, self.queue.dropped_packets)
+        self.assertEqual(40, self.queue.dropped_bytes)
+        self.assertEqual([b'c' * 40, b'a' * 40], self.pop_all())
+
+    def test_byte_budget_higher_priority(self):
+        """
+        Test if a packet is dropped when only higher priority packets could make room for it.
+        """
+        self.queue.push(("1.2.3.4", 5), b'a' * 80, PRIORITY_HIGH, 0.0)
+
+        self.assertFalse(self.queue.push(("1.2.3.4", 5), b'b' * 40, PRIORITY_BULK, 0.0))
+        self.assertEqual([b'a' * 80], self.pop_all())
+
+    def test_destination_pacing(self):
+        """
+        Test if a paced destination does not hold up other destinations.
+        """
+        self.queue.destination_rate = self.queue.destination_burst = 10
+        self.queue.push(("1.2.3.4", 5), b'a' * 10, PRIORITY_NORMAL, 0.0)
+        self.queue.push(("1.2.3.4", 5), b'a' * 10, PRIORITY_NORMAL, 0.0)
+        self.queue.push(("1.2.3.4", 6), b'b' * 10, PRIORITY_NORMAL, 0.0)
+
+        self.assertEqual([b'a' * 10, b'b' * 10], self.pop_all())
+        self.assertAlmostEqual(1.0, self.queue.next_delay(0.0))
+        self.assertEqual([b'a' * 10], self.pop_all(1.0))
+        self.assertIsNone(self.queue.next_delay(1.0))
+
+    def test_pacing_delay(self):
+        """
+        Test if the time that sent packets spent in the queue is recorded.
+        """
+        self.queue.push(("1.2.3.4", 5), b'a', PRIORITY_NORMAL, 0.0)
+        entry, _ = self.queue.pop(2.0)
+        self.queue.record_sent(entry, 2.0)
+
+        self.assertEqual(1, self.queue.sent_packets)
+        self.assertEqual(2.0, self.queue.pacing_delay)
+
+    def test_push_front_refund(self):
+        """
+        Test if a packet that is put back does not pay for its tokens twice.
+        """
+        self.queue.rate = self.queue.burst = 10
+        self.queue.push(("1.2.3.4", 5), b'a' * 10, PRIORITY_NORMAL, 0.0)
+        self.queue.push_front(*self.queue.pop(0.0))
+
+        self.assertEqual([b'a' * 10], self.pop_all())
+
+    def test_push_front_byte_budget(self):
+        """
+        Test if putting a packet back respects the byte budget.
+        """
+        self.queue.push(("1.2.3.4", 5), b'a' * 80, PRIORITY_NORMAL, 0.0)
+
+        self.assertTrue(self.queue.push_front((("1.2.3.4", 5), b'b' * 40, 0.0), PRIORITY_HIGH))
+        self.assertFalse(self.queue.push_front((("1.2.3.4", 5), b'c' * 80, 0.0), PRIORITY_BULK))
+        self.assertEqual(2, self.queue.dropped_packets)
+        self.assertEqual([b'b' * 40], self.pop_all())
@@ -67,6 +67,28 @@ class NewC(VariablePayload, OldA):
     names = ['a', 'b', 'c']
 
 
+class E(VariablePayload):
+    """
+    A VariablePayload with optional fields.
+    """
+    format_list = ['I']
+    optional_format_list = ['H', 'B']
+    names = ['a', 'b', 'c']
+
+    @classmethod
+    def fix_unpack_c(cls, value):
+        return value * 2
+
+
+class F(A):
+    """
+    A VariablePayload with a custom __init__.
+    """
+
+    def __init__(self, a):
+        super(F, self).__init__(a, a + 1)
+
+
 class TestVariablePayload(TestCase):
 
     def _pack_and_unpack(self, payload, instance):
@@ -163,3 +185,43 @@ class TestVariablePayload(TestCase):
         self.assertEqual(d.a, 0)
         self.assertEqual(deserialized.a, 0)
         self.assertEqual(serialized, b'\x00\x00\x00\x01')
+
+    def test_optional(self):
+        """
+        Check if optional fields are only packed when they are set.
+        """
+        self.assertEqual([('I', 1)], E(1).to_pack_list())
+        self.assertEqual([('I', 1), ('H', 2)], E(1, 2).to_pack_list())
+        self.assertEqual([('I', 1), ('H', 2), ('B', 3)], E(1, b=2, c=3).to_pack_list())
+
+    def test_optional_unpack(self):
+        """
+        Check if the wire-format manipulation rules are only applied to received optional fields.
+        """
+        self.assertFalse(hasattr(E.from_unpack_list(1, 2), 'c'))
+        self.assertEqual(6, E.from_unpack_list(1, 2, 3).c)
+
+    def test_slots(self):
+        """
+        Check if the fields are stored in slots.
+        """
+        self.assertEqual(('a', 'b'), A.__slots__)
+        self.assertEqual(('c',), C.__slots__)
+        self.assertFalse(A(1, 2).__dict__)
+
+    def test_custom_init(self):
+        """
+        Check if a user-defined __init__ is not replaced.
+        """
+        f = F(1)
+
+        deserialized = self._pack_and_unpack(A, f)
+
+        self.assertEqual(1, deserialized.a)
+        self.assertEqual(2, deserialized.b)
+
+    def test_missing_argument(self):
+        """
+        Check if a KeyError is raised when a field is not given.
+        """
+        self.assertRaises(KeyError, A, 1)
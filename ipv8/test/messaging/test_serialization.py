@@ -20,6 +20,55 @@ class TestSerializable(Serializable):
         return TestSerializable(*args)
 
 
+class TestMixedSerializable(Serializable):
+    format_list = ["I", "H", "bits", "4SH", "varlenH", "Q"]
+    optional_format_list = ["B", "H"]
+
+    def __init__(self, *args):
+        self.args = list(args)
+
+    def to_pack_list(self):
+        return [("I", self.args[0]),
+                ("H", self.args[1]),
+                ("bits",) + tuple(self.args[2:10]),
+                ("4SH",) + tuple(self.args[10]),
+                ("varlenH", self.args[11]),
+                ("Q", self.args[12])] + [(fmt, value) for fmt, value in zip(self.optional_format_list,
+                                                                              self.args[13:])]
+
+    @classmethod
+    def from_unpack_list(cls, *args):
+        return TestMixedSerializable(*args)
+
+
+class TestNestedSerializable(Serializable):
+    format_list = [TestSerializable]
+
+    def __init__(self, nested):
+        self.nested = nested
+
+    def to_pack_list(self):
+        return [("payload", self.nested)]
+
+    @classmethod
+    def from_unpack_list(cls, *args):
+        return TestNestedSerializable(*args)
+
+
+class TestVarLenSerializable(Serializable):
+    format_list = ["varlenH"]
+
+    def __init__(self, data):
+        self.data = data
+
+    def to_pack_list(self):
+        return [("varlenH", self.data)]
+
+    @classmethod
+    def from_unpack_list(cls, *args):
+        return TestVarLenSerializable(*args)
+
+
 class TestSerializer(TestCase):
 
     def setUp(self):
@@ -192,3 +241,246 @@ class TestSerializer(TestCase):
         data = self.serializer.ez_pack_serializables([instance1, instance2])
         self.assertRaises(PackError, self.serializer.ez_unpack_serializables, [TestSerializable, TestSerializable],
                           data + b"Nope.avi")
+
+    def test_pack_plan_identical(self):
+        """
+        Check if a compiled pack plan produces the same data as packing field-by-field.
+        """
+        instance = TestMixedSerializable(1, 2, 1, 0, 0, 1, 0, 0, 1, 1, [b"abcd", 3], b"varlen", 4, 5, 6)
+
+        data, size = self.serializer.pack_multiple(instance.to_pack_list())
+        expected, expected_size = self.serializer._pack_multiple_fields(instance.to_pack_list())
+
+        self.assertEqual(expected, data)
+        self.assertEqual(expected_size, size)
+
+    def test_unpack_plan_identical(self):
+        """
+        Check if a compiled unpack plan produces the same values as unpacking field-by-field.
+        """
+        instance = TestMixedSerializable(1, 2, 1, 0, 0, 1, 0, 0, 1, 1, [b"abcd", 3], b"varlen", 4, 5, 6)
+        data = self.serializer.ez_pack_serializables([instance])
+
+        deserialized, = self.serializer.ez_unpack_serializables([TestMixedSerializable], data)
+        expected, _ = self.serializer.unpack_multiple(TestMixedSerializable.format_list, data,
+                                                      TestMixedSerializable.optional_format_list)
+
+        self.assertListEqual(expected, deserialized.args)
+        self.assertListEqual(instance.args, deserialized.args)
+
+    def test_unpack_plan_optional(self):
+        """
+        Check if a compiled unpack plan stops cleanly in the optional formats.
+        """
+        instance = TestMixedSerializable(1, 2, 1, 0, 0, 1, 0, 0, 1, 1, [b"abcd", 3], b"varlen", 4, 5)
+        data = self.serializer.ez_pack_serializables([instance])
+
+        deserialized, = self.serializer.ez_unpack_serializables([TestMixedSerializable], data)
+
+        self.assertListEqual(instance.args, deserialized.args)
+
+    def test_unpack_plan_merges_fixed(self):
+        """
+        Check if adjacent fixed-size formats are merged into a single step.
+        """
+        plan = self.serializer.get_unpack_plan(TestMixedSerializable)
+
+        # [I, H, bits, 4SH], [varlenH], [Q], [B], [H]
+        self.assertEqual(5, len(plan.steps))
+
+    def test_unpack_plan_cached(self):
+        """
+        Check if unpack plans are only compiled once per class.
+        """
+        self.assertIs(self.serializer.get_unpack_plan(TestSerializable),
+                      self.serializer.get_unpack_plan(TestSerializable))
+
+    def test_add_format_plan(self):
+        """
+        Check if a format with a different byte order is not merged with big-endian formats.
+        """
+        self.serializer.add_packing_format("my_cool_format", "<H")
+
+        data, _ = self.serializer.pack_multiple([("H", 1), ("my_cool_format", 1), ("H", 1)])
+
+        self.assertEqual(b"\x00\x01\x01\x00\x00\x01", data)
+
+    def test_pack_plan_error(self):
+        """
+        Check if a failing compiled pack plan still reports the failing item.
+        """
+        with self.assertRaises(PackError) as context:
+            self.serializer.pack_multiple([("H", 1), ("B", 256)])
+
+        self.assertIn("Could not pack item 1", str(context.exception))
+
+    def test_unpack_offset(self):
+        """
+        Check if we can unpack serializables from an offset in the data.
+        """
+        instance = TestMixedSerializable(1, 2, 1, 0, 0, 1, 0, 0, 1, 1, [b"abcd", 3], b"varlen", 4, 5, 6)
+        data = self.serializer.ez_pack_serializables([instance])
+
+        deserialized, = self.serializer.ez_unpack_serializables([TestMixedSerializable], b"header" + data, 6)
+
+        self.assertListEqual(instance.args, deserialized.args)
+
+    def test_memoryview_mode(self):
+        """
+        Check if memoryview mode materializes the unpacked fields and not the remainder.
+        """
+        serializer = Serializer(memoryview_mode=True)
+        instance = TestMixedSerializable(1, 2, 1, 0, 0, 1, 0, 0, 1, 1, [b"abcd", 3], b"varlen", 4, 5, 6)
+        data = self.serializer.ez_pack_serializables([instance])
+
+        deserialized, remainder = serializer.unpack_to_serializables([TestMixedSerializable], data + b"rest")
+
+        self.assertListEqual(instance.args, deserialized.args)
+        self.assertIsInstance(deserialized.args[11], bytes)
+        self.assertIsInstance(remainder, memoryview)
+        self.assertEqual(b"rest", remainder.tobytes())
+
+    def test_memoryview_mode_nested(self):
+        """
+        Check if memoryview mode unpacks nested serializables.
+        """
+        serializer = Serializer(memoryview_mode=True)
+        instance = TestSerializable(123)
+        data, _ = serializer.pack('payload', instance)
+
+        output, = serializer.ez_unpack_serializables([TestNestedSerializable], data)
+
+        self.assertEqual(instance.number, output.nested.number)
+
+    def test_memoryview_mode_truncated_varlen(self):
+        """
+        Check if memoryview mode does not accept a truncated varlen.
+        """
+        serializer = Serializer(memoryview_mode=True)
+        data, _ = serializer.pack('varlenH', b"varlen")
+
+        self.assertRaises(PackError, serializer.unpack_to_serializables, [TestVarLenSerializable], data[:-1])
+
+    def test_pack_multiple_into(self):
+        """
+        Check if packing into a preallocated buffer produces the same data as pack_multiple.
+        """
+        instance = TestMixedSerializable(1, 2, 1, 0, 0, 1, 0, 0, 1, 1, [b"abcd", 3], b"varlen", 4, 5, 6)
+        nested = TestNestedSerializable(TestSerializable(123))
+        pack_list = instance.to_pack_list() + nested.to_pack_list() + [("raw", b"a", b"bc")]
+        expected, size = self.serializer.pack_multiple(pack_list)
+
+        buffer = bytearray(self.serializer.get_packed_size(pack_list) + 2)
+        end = self.serializer.pack_multiple_into(buffer, 2, pack_list)
+
+        self.assertEqual(size + 2, len(buffer))
+        self.assertEqual(size + 2, end)
+        self.assertEqual(expected, bytes(buffer[2:]))
+
+    def test_pack_multiple_into_error(self):
+        """
+        Check if packing into a preallocated buffer still reports the failing item.
+        """
+        buffer = bytearray(3)
+
+        with self.assertRaises(PackError) as context:
+            self.serializer.pack_multiple_into(buffer, 0, [("H", 1), ("B", 256)])
+
+        self.assertIn("Could not pack item 1", str(context.exception))
+
+    def test_pack_multiple_lists(self):
+        """
+        Check if multiple pack lists are packed after the prefix, with the requested bytes reserved.
+        """
+        first = TestSerializable(True).to_pack_list()
+        second = [("varlenH", b"abc"), ("Q", 7)]
+        expected = b"pre" + self.serializer.pack_multiple(first)[0] + self.serializer.pack_multiple(second)[0]
+
+        buffer, offset = self.serializer.pack_multiple_lists([first, second], b"pre", 4)
+
+        self.assertEqual(len(expected), offset)
+        self.assertEqual(len(expected) + 4, len(buffer))
+        self.assertEqual(expected, bytes(buffer[:offset]))
+
+    def test_pack_multiple_lists_error(self):
+        """
+        Check if packing multiple pack lists still reports the failing item.
+        """
+        with self.assertRaises(PackError) as context:
+            self.serializer.pack_multiple_lists([[("H", 1)], [("H", 1), ("B", 256)]])
+
+        self.assertIn("Could not pack item 1", str(context.exception))
+
+    def test_bits_all_bytes(self):
+        """
+        Check if every byte value can be unpacked to bits and packed back again.
+        """
+        for byte in range(256):
+            data = struct.pack(">B", byte)
+
+            bits, size = self.serializer.unpack("bits", data)
+
+            self.assertEqual(1, size)
+            self.assertEqual([(byte >> shift) & 1 for shift in range(7, -1, -1)], list(bits))
+            self.assertEqual((data, 1), self.serializer.pack("bits", *bits))
+
+    def test_bits_offset(self):
+        """
+        Check if bits are unpacked from the given offset, also from memoryviews.
+        """
+        data = b"\x00\x81"
+
+        self.assertEqual((1, 0, 0, 0, 0, 0, 0, 1), self.serializer.unpack("bits", data, 1)[0])
+        self.assertEqual((1, 0, 0, 0, 0, 0, 0, 1), self.serializer.unpack("bits", memoryview(data), 1)[0])
+
+    def test_bits_truncated(self):
+        """
+        Check if unpacking bits from too little data fails.
+        """
+        self.assertRaises(struct.error, self.serializer.unpack, "bits", b"\x00", 1)
+
+    def test_flags(self):
+        """
+        Check if named flags are packed into a single byte and unpacked again.
+        """
+        self.serializer.add_flags_format("my_flags", ["a", "b", "c"])
+
+        data, size = self.serializer.pack_multiple([("my_flags", {"a": True, "c": 1}), ("H", 1)])
+        unpacked, _ = self.serializer.unpack_multiple(["my_flags", "H"], data)
+
+        self.assertEqual(3, size)
+        self.assertEqual(b"\x05\x00\x01", data)
+        self.assertEqual([{"a": True, "b": False, "c": True}, 1], unpacked)
+
+    def test_flags_plan(self):
+        """
+        Check if named flags are merged with adjacent fixed-size formats in a plan.
+        """
+        self.serializer.add_flags_format("my_flags", ["a", "b"])
+        plan = self.serializer.get_pack_plan(("H", "my_flags", "H"))
+
+        data = plan.pack([("H", 1), ("my_flags", {"b": True}), ("H", 2)])
+
+        self.assertEqual(1, len(plan.pack_steps))
+        self.assertEqual(b"\x00\x01\x02\x00\x02", data)
+        self.assertEqual([1, {"a": False, "b": True}, 2], plan.unpack(data)[0])
+
+    def test_flags_width(self):
+        """
+        Check if the bitmask of named flags grows with the number of flags, up to 64 flags.
+        """
+        self.serializer.add_flags_format("my_flags", ["flag%d" % i for i in range(64)])
+
+        data, size = self.serializer.pack("my_flags", {"flag0": True, "flag63": True})
+
+        self.assertEqual(8, size)
+        self.assertEqual(b"\x80\x00\x00\x00\x00\x00\x00\x01", data)
+        self.assertRaises(ValueError, self.serializer.add_flags_format, "too_many", ["flag%d" % i for i in range(65)])
+
+    def test_flags_unknown(self):
+        """
+        Check if packing an unknown flag fails.
+        """
+        self.serializer.add_flags_format("my_flags", ["a"])
+
+        self.assertRaises(PackError, self.serializer.pack_multiple, [("my_flags", {"b": True})])
@@ -0,0 +1,205 @@
+from __future__ import absolute_import
+
+import os
+import random
+from threading import Timer
+
+from twisted.internet.defer import inlineCallbacks
+from twisted.internet.task import Clock
+
+from ...keyvault.crypto import default_eccrypto
+from ...peer import Peer
+from ...peerdiscovery.graph_snapshot import (ADDRESS_RECORD, GraphSnapshot, NetworkSnapshotter, SNAPSHOT_VERSION,
+                                             open_graph_snapshot)
+from ...peerdiscovery.network import Network
+from ..base import TestBase
+
+
+def _generate_peer():
+    key = default_eccrypto.generate_key(u'very-low')
+    address = (".".join([str(random.randint(0, 255)) for _ in range(4)]), random.randint(1, 65535))
+    return Peer(key, address)
+
+
+class TestGraphSnapshot(TestBase):
+    """
+    This class contains various tests for the binary snapshot of the network graph.
+    """
+
+    peers = [_generate_peer() for _ in range(4)]
+    services = [b"a" * 20, b"b" * 20]
+
+    def setUp(self):
+        super(TestGraphSnapshot, self).setUp()
+        self.network = Network()
+        self.network.discover_address(self.peers[0], self.peers[1].address, self.services[0])
+        self.network.discover_address(self.peers[0], ("1.1.1.1", 1))
+        self.network.discover_address(self.peers[2], ("1.1.1.2", 2))
+        self.network.discover_services(self.peers[0], [self.services[1]])
+        self.network.discover_services(self.peers[2], self.services)
+
+    def test_round_trip(self):
+        """
+        Check if all addresses and verified peers are read back from a snapshot.
+        """
+        snapshot = GraphSnapshot(self.network.graph_snapshot())
+
+        self.assertEqual(5, snapshot.address_count)
+        self.assertEqual(2, snapshot.peer_count)
+        self.assertSetEqual({(self.peers[1].address, self.peers[0].mid, self.services[0]),
+                             (("1.1.1.1", 1), self.peers[0].mid, None),
+                             (("1.1.1.2", 2), self.peers[2].mid, None),
+                             (self.peers[0].address, '', None),
+                             (self.peers[2].address, '', None)},
+                            {(address, mid, service) for address, mid, service, _ in snapshot.get_addresses()})
+        self.assertSetEqual({(self.peers[0].public_key.key_to_bin(), self.peers[0].address, (self.services[1],)),
+                             (self.peers[2].public_key.key_to_bin(), self.peers[2].address, tuple(self.services))},
+                            {(key, address, tuple(sorted(services)))
+                             for key, address, _, services in snapshot.get_peers()})
+
+    def test_fixed_size_addresses(self):
+        """
+        Check if any address record can be read directly.
+        """
+        data = self.network.graph_snapshot()
+        snapshot = GraphSnapshot(data)
+
+        self.assertEqual(snapshot.peers_offset - snapshot.addresses_offset, 5 * ADDRESS_RECORD.size)
+        self.assertListEqual(list(snapshot.get_addresses()), [snapshot.get_address(i) for i in range(5)])
+
+    def test_load(self):
+        """
+        Check if a loaded snapshot makes all addresses walkable, for the services of their introducers.
+        """
+        network = Network()
+        network.load_graph_snapshot(GraphSnapshot(self.network.graph_snapshot()))
+
+        self.assertSetEqual({self.peers[0].address, self.peers[1].address, self.peers[2].address, ("1.1.1.1", 1),
+                             ("1.1.1.2", 2)},
+                            set(network.get_walkable_addresses()))
+        self.assertSetEqual({self.peers[1].address, ("1.1.1.1", 1), ("1.1.1.2", 2)},
+                            set(network.get_walkable_addresses(self.services[1])))
+        self.assertSetEqual({self.peers[1].address, ("1.1.1.2", 2)},
+                            set(network.get_walkable_addresses(self.services[0])))
+        self.assertListEqual([], network.verified_peers)
+
+    def test_load_keeps_known(self):
+        """
+        Check if loading a snapshot does not overwrite the addresses we already know.
+        """
+        network = Network()
+        network.discover_address(self.peers[3], self.peers[1].address)
+        network.load_graph_snapshot(GraphSnapshot(self.network.graph_snapshot()))
+
+        self.assertIn(self.peers[1].address, network.get_introductions_from(self.peers[3]))
+        self.assertNotIn(self.peers[1].address, network.get_introductions_from(self.peers[0]))
+
+    def test_invalid(self):
+        """
+        Check if data of another format or version is not loaded.
+        """
+        data = self.network.graph_snapshot()
+
+        self.assertRaises(ValueError, GraphSnapshot, b"")
+        self.assertRaises(ValueError, GraphSnapshot, b"IPv6" + data[4:])
+        self.assertRaises(ValueError, GraphSnapshot, data[:4] + bytes(bytearray([SNAPSHOT_VERSION + 1])) + data[5:])
+        self.assertRaises(ValueError, GraphSnapshot, data[:-(len(data) - GraphSnapshot(data).peers_offset) - 1])
+        self.assertRaises(ValueError, lambda: list(GraphSnapshot(data[:-1]).get_peers()))
+
+    def create_snapshotter(self, network):
+        """
+        Write the network of this test to a snapshot file and create a snapshotter which loads two records at a time.
+        """
+        file_path = os.path.join(self.temporary_directory(), "network.snapshot")
+        NetworkSnapshotter(self.network, file_path).write()
+        snapshotter = NetworkSnapshotter(network, file_path)
+        snapshotter.chunk_size = 2
+        snapshotter._reactor = Clock()
+        self.addCleanup(snapshotter.shutdown_task_manager)
+        return snapshotter
+
+    @inlineCallbacks
+    def test_snapshotter(self):
+        """
+        Check if a snapshot file is written and memory mapped to load it into a network.
+        """
+        file_path = os.path.join(self.temporary_directory(), "network.snapshot")
+        network = Network()
+        snapshotter = NetworkSnapshotter(network, file_path)
+
+        loaded = yield snapshotter.load()
+        self.assertFalse(loaded)
+        NetworkSnapshotter(self.network, file_path).write()
+        loaded = yield snapshotter.load()
+        self.assertTrue(loaded)
+        self.assertEqual(5, len(network.get_walkable_addresses()))
+        with open_graph_snapshot(file_path) as snapshot:
+            self.assertEqual(2, snapshot.peer_count)
+
+    def test_snapshotter_chunks(self):
+        """
+        Check if a snapshot file is loaded one chunk of records per reactor iteration, starting with the addresses.
+        """
+        network = Network()
+        snapshotter = self.create_snapshotter(network)
+        results = []
+
+        snapshotter.load().addCallback(results.append)
+        self.assertEqual(2, len(network.get_walkable_addresses()))
+        self.assertEqual(1, len(snapshotter._reactor.getDelayedCalls()))
+        self.assertListEqual([], results)
+        snapshotter._reactor.advance(0)
+
+        self.assertListEqual([True], results)
+        self.assertEqual(5, len(network.get_walkable_addresses()))
+        self.assertFalse(snapshotter.partial)
+        self.assertEqual(3, len(network.get_walkable_addresses(self.services[1])))
+
+    def test_snapshotter_interrupted(self):
+        """
+        Check if the snapshot file is not overwritten when the snapshotter is stopped while loading it.
+        """
+        network = Network()
+        snapshotter = self.create_snapshotter(network)
+        with open(snapshotter.file_path, 'rb') as f:
+            data = f.read()
+        results = []
+
+        snapshotter.load().addCallback(results.append)
+        snapshotter.shutdown_task_manager()
+        snapshotter.write(blocking=True)
+
+        self.assertListEqual([False], results)
+        self.assertTrue(snapshotter.partial)
+        self.assertEqual(2, len(network.get_walkable_addresses()))
+        with open(snapshotter.file_path, 'rb') as f:
+            self.assertEqual(data, f.read())
+
+    def test_snapshotter_invalid_file(self):
+        """
+        Check if an invalid snapshot file is not loaded, but may be overwritten.
+        """
+        file_path = os.path.join(self.temporary_directory(), "network.snapshot")
+        with open(file_path, 'wb') as f:
+            f.write(b"garbage")
+        snapshotter = NetworkSnapshotter(Network(), file_path)
+        results = []
+
+        snapshotter.load().addCallback(results.append)
+
+        self.assertListEqual([False], results)
+        self.assertFalse(snapshotter.partial)
+
+    def test_write_blocking(self):
+        """
+        Check if a blocking write waits for the snapshot which is being written, instead of skipping its snapshot.
+        """
+        file_path = os.path.join(self.temporary_directory(), "network.snapshot")
+        snapshotter = NetworkSnapshotter(self.network, file_path)
+        snapshotter.write_lock.acquire()
+
+        snapshotter.write()
+        self.assertFalse(os.path.isfile(file_path))
+        Timer(0.05, snapshotter.write_lock.release).start()
+        snapshotter.write(blocking=True)
+        self.assertTrue(os.path.isfile(file_path))
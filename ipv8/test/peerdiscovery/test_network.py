@@ -224,6 +224,43 @@ class TestNetwork(unittest.TestCase):
         self.assertEqual(self.peers[0],
                          self.network.get_verified_by_public_key_bin(self.peers[0].public_key.key_to_bin()))
 
+    def test_get_verified_peers_with_key_bin(self):
+        """
+        Check if we can list the verified peers with their public key, except for the excluded keys.
+        """
+        self.network.add_verified_peer(self.peers[0])
+        self.network.add_verified_peer(self.peers[1])
+        keys = [peer.public_key.key_to_bin() for peer in self.peers]
+
+        self.assertSetEqual({(keys[0], self.peers[0]), (keys[1], self.peers[1])},
+                            set(self.network.get_verified_peers_with_key_bin()))
+        self.assertListEqual([(keys[1], self.peers[1])], self.network.get_verified_peers_with_key_bin({keys[0]}))
+
+    def test_get_verified_by_address_update(self):
+        """
+        Check if we find a peer by its new address, after its address changed.
+        """
+        peer = Peer(self.peers[0].key, ("1.2.3.4", 5))
+        self.network.add_verified_peer(peer)
+        self.network.add_verified_peer(Peer(self.peers[0].key, ("1.2.3.4", 6)))
+
+        self.assertEqual(("1.2.3.4", 6), peer.address)
+        self.assertIsNone(self.network.get_verified_by_address(("1.2.3.4", 5)))
+        self.assertIs(peer, self.network.get_verified_by_address(("1.2.3.4", 6)))
+
+    def test_get_verified_removed(self):
+        """
+        Check if removed peers can no longer be found by their address or public key.
+        """
+        self.network.add_verified_peer(self.peers[0])
+        self.network.add_verified_peer(self.peers[1])
+        self.network.remove_peer(self.peers[0])
+
+        self.assertIsNone(self.network.get_verified_by_address(self.peers[0].address))
+        self.assertIsNone(self.network.get_verified_by_public_key_bin(self.peers[0].public_key.key_to_bin()))
+        self.assertEqual(self.peers[1], self.network.get_verified_by_address(self.peers[1].address))
+        self.assertListEqual([self.peers[1]], self.network.verified_peers)
+
     def test_remove_by_address(self):
         """
         Check if we can remove a peer from our network by its address.
@@ -259,6 +296,23 @@ class TestNetwork(unittest.TestCase):
         self.assertEqual(previous_walkable, self.network.get_walkable_addresses())
         self.assertEqual(previous_verified, self.network.verified_peers)
 
+    def test_remove_by_address_shared(self):
+        """
+        Check if all peers using an address are removed.
+        """
+        peer1 = Peer(self.peers[0].key, ("1.2.3.4", 5))
+        peer2 = Peer(self.peers[1].key, ("1.2.3.4", 5))
+        self.network.add_verified_peer(peer1)
+        self.network.add_verified_peer(peer2)
+        self.network.add_verified_peer(self.peers[2])
+
+        self.assertIs(peer1, self.network.get_verified_by_address(("1.2.3.4", 5)))
+
+        self.network.remove_by_address(("1.2.3.4", 5))
+
+        self.assertIsNone(self.network.get_verified_by_address(("1.2.3.4", 5)))
+        self.assertListEqual([self.peers[2]], self.network.verified_peers)
+
     def test_remove_by_address_no_services(self):
         """
         Check if we can remove a peer from our network if it doesn't have services by address.
@@ -315,6 +369,162 @@ class TestNetwork(unittest.TestCase):
 
         self.assertEqual([self.peers[1].address], self.network.get_walkable_addresses(service))
 
+    def test_get_walkable_by_discovery_service(self):
+        """
+        Check if addresses are walkable for the service they were discovered through, until verified with it.
+        """
+        service = b"a" * 20
+        self.network.discover_address(self.peers[0], self.peers[1].address, service)
+
+        self.assertEqual([self.peers[1].address], self.network.get_walkable_addresses(service))
+
+        self.network.add_verified_peer(self.peers[1])
+
+        self.assertEqual([self.peers[1].address], self.network.get_walkable_addresses(service))
+        self.assertEqual([], self.network.get_walkable_addresses())
+
+        self.network.discover_services(self.peers[1], [service])
+
+        self.assertEqual([], self.network.get_walkable_addresses(service))
+
+    def test_get_random_walkable_address(self):
+        """
+        Check if excluded addresses are not returned as random walkable address.
+        """
+        self.network.discover_address(self.peers[0], self.peers[1].address)
+        self.network.discover_address(self.peers[0], self.peers[2].address)
+
+        for _ in range(10):
+            self.assertEqual(self.peers[2].address,
+                             self.network.get_random_walkable_address(exclude={self.peers[1].address}))
+        self.assertIsNone(self.network.get_random_walkable_address(exclude={self.peers[1].address,
+                                                                             self.peers[2].address}))
+        self.assertIsNone(self.network.get_random_walkable_address(b"a" * 20))
+
+    def test_evict_old_address(self):
+        """
+        Check if the oldest address is evicted when the address book is full.
+        """
+        self.network.max_addresses = 3
+        self.network.discover_address(self.peers[0], self.peers[1].address)
+        self.network.discover_address(self.peers[0], self.peers[2].address)
+        mid, service, discovered = self.network._all_addresses[self.peers[2].address]
+        self.network._all_addresses[self.peers[2].address] = (mid, service, discovered - 600)
+        self.network.discover_address(self.peers[0], self.peers[3].address)
+
+        self.assertSetEqual({self.peers[1].address, self.peers[3].address},
+                            set(self.network.get_walkable_addresses()))
+
+    def test_evict_unreputable_introducer(self):
+        """
+        Check if the address introduced by the peer with the most failed introductions is evicted.
+        """
+        self.network.max_addresses = 3
+        self.network.add_verified_peer(self.peers[1])
+        self.network.discover_address(self.peers[0], ("1.1.1.1", 1))
+        self.network.register_walk_failure(("1.1.1.1", 1))
+        self.network.discover_address(self.peers[0], ("1.1.1.2", 1))
+        self.network.remove_by_address(("1.1.1.1", 1))
+        self.network.discover_address(self.peers[1], ("1.1.1.3", 1))
+
+        self.assertSetEqual({("1.1.1.3", 1)}, set(self.network.get_walkable_addresses()))
+
+    def test_evict_keeps_verified(self):
+        """
+        Check if the addresses of verified peers are not evicted, even if the address book is full.
+        """
+        self.network.max_addresses = 2
+        for peer in self.peers:
+            self.network.add_verified_peer(peer)
+        self.network.discover_address(self.peers[0], ("1.1.1.1", 1))
+
+        self.assertListEqual([], self.network.get_walkable_addresses())
+        self.assertSetEqual(set(self.peers), set(self.network.verified_peers))
+
+    def test_introducer_reputation(self):
+        """
+        Check if the successful and failed walks to the introduced addresses are counted for the introducer.
+        """
+        self.network.add_verified_peer(self.peers[0])
+        self.network.discover_address(self.peers[0], self.peers[1].address)
+        self.network.discover_address(self.peers[0], ("1.1.1.1", 1))
+        self.network.register_walk_failure(self.peers[1].address)
+        self.network.register_walk_failure(("1.1.1.1", 1))
+        self.network.remove_by_address(("1.1.1.1", 1))
+        self.network.add_verified_peer(self.peers[1])
+
+        self.assertListEqual([1, 2], self.network._introducer_reputation[self.peers[0].mid])
+
+    def test_address_book_statistics(self):
+        """
+        Check if the address book statistics count the known addresses.
+        """
+        self.network.max_addresses = 2
+        self.network.discover_address(self.peers[0], self.peers[1].address)
+        self.network.discover_address(self.peers[0], self.peers[2].address)
+        statistics = self.network.get_address_book_statistics()
+
+        self.assertEqual(2, statistics['addresses'])
+        self.assertEqual(1, statistics['walkable'])
+        self.assertEqual(1, statistics['verified'])
+        self.assertEqual(2, statistics['max_addresses'])
+        self.assertEqual(1, statistics['evicted'])
+        self.assertLess(0, statistics['memory'])
+
+    def get_walkable_reference(self, service_id=None):
+        """
+        Compute the walkable addresses of the network from scratch.
+        """
+        services_per_peer = self.network.services_per_peer
+        verified = [peer.address for peer in self.network.verified_peers
+                    if service_id is None or service_id in services_per_peer.get(peer.mid, ())]
+        out = set(self.network._all_addresses) - set(verified)
+        if service_id:
+            out = {address for address in out
+                   if service_id in services_per_peer.get(self.network._all_addresses[address][0], set())
+                   or service_id == self.network._all_addresses[address][1]}
+        return out
+
+    def test_indexes_consistent(self):
+        """
+        Check if the walkable addresses and peers per service stay consistent with the network during random updates.
+        """
+        self.network.max_addresses = 4
+        rng = random.Random(42)
+        addresses = [("1.1.1.%d" % i, 1) for i in range(6)]
+        services = [b"a" * 20, b"b" * 20]
+        for _ in range(500):
+            key = rng.choice(self.peers).key
+            operation = rng.randint(0, 5)
+            if operation == 0:
+                self.network.discover_address(Peer(key, rng.choice(addresses)), rng.choice(addresses),
+                                              rng.choice(services + [None]))
+            elif operation == 1:
+                self.network.add_verified_peer(Peer(key, rng.choice(addresses)))
+            elif operation == 2:
+                self.network.discover_services(Peer(key), [rng.choice(services)])
+            elif operation == 3:
+                self.network.remove_peer(Peer(key, rng.choice(addresses)))
+            elif operation == 4:
+                self.network.remove_by_address(rng.choice(addresses))
+            else:
+                self.network.register_walk_failure(rng.choice(addresses))
+
+            self.assertSetEqual(self.get_walkable_reference(), set(self.network.get_walkable_addresses()))
+            for service in services:
+                self.assertSetEqual(self.get_walkable_reference(service),
+                                    set(self.network.get_walkable_addresses(service)))
+                self.assertSetEqual({peer for peer in self.network.verified_peers
+                                     if service in self.network.services_per_peer.get(peer.mid, ())},
+                                    set(self.network.get_peers_for_service(service)))
+            for peer in self.network.verified_peers:
+                self.assertSetEqual({address for address, (mid, _, _) in self.network._all_addresses.items()
+                                     if mid == peer.mid},
+                                    set(self.network.get_introductions_from(peer)))
+            self.assertTrue(len(self.network._all_addresses) <= 4 or not self.network.get_walkable_addresses())
+            self.assertSetEqual({peer.mid for peer in self.network.verified_peers},
+                                set(self.network._introducer_reputation))
+
     def test_snapshot_only_verified(self):
         """
         Check if a snapshot poperly serializes verified peers.
@@ -0,0 +1,186 @@
+from __future__ import absolute_import
+
+from twisted.internet.defer import inlineCallbacks
+
+from .base import TestBase
+from .mocking.community import MockCommunity
+from ..lazy_community import lazy_wrapper, lazy_wrapper_batch, lazy_wrapper_unsigned_batch
+from ..messaging.payload import PuncturePayload
+from ..messaging.payload_headers import GlobalTimeDistributionPayload
+
+
+class BatchCommunity(MockCommunity):
+
+    def __init__(self):
+        super(BatchCommunity, self).__init__()
+        self.batches = []
+        self.unsigned_batches = []
+        self.single_messages = []
+        # The message identifiers of the handler calls, in order
+        self.calls = []
+        self.add_batch_message_handler(100, self.on_signed_batch)
+        self.add_batch_message_handler(101, self.on_unsigned_batch)
+        self.add_message_handler(102, self.on_single)
+
+    @lazy_wrapper_batch(GlobalTimeDistributionPayload, PuncturePayload)
+    def on_signed_batch(self, messages):
+        self.batches.append(messages)
+        self.calls.append(100)
+
+    @lazy_wrapper_unsigned_batch(GlobalTimeDistributionPayload, PuncturePayload)
+    def on_unsigned_batch(self, messages):
+        self.unsigned_batches.append(messages)
+
+    @lazy_wrapper(GlobalTimeDistributionPayload, PuncturePayload)
+    def on_single(self, peer, dist, payload):
+        self.single_messages.append((peer, dist, payload))
+        self.calls.append(102)
+
+
+class TestCommunityBatch(TestBase):
+
+    def setUp(self):
+        super(TestCommunityBatch, self).setUp()
+        self.sender = BatchCommunity()
+        self.receiver = BatchCommunity()
+        self.address = self.sender.endpoint.wan_address
+
+    def tearDown(self):
+        self.sender.unload()
+        self.receiver.unload()
+        return super(TestCommunityBatch, self).tearDown()
+
+    def create_packet(self, msg_num, identifier, sig=True):
+        return self.sender.ezr_pack(msg_num, GlobalTimeDistributionPayload(identifier),
+                                    PuncturePayload(("1.2.3.4", 5), ("2.3.4.5", 6), identifier), sig=sig)
+
+    def test_batch_grouped(self):
+        """
+        Check if a batch handler receives consecutive messages in a single call, in order.
+        """
+        packets = [(self.address, self.create_packet(100, i)) for i in range(3)]
+
+        self.receiver.on_packets(packets)
+
+        self.assertEqual(1, len(self.receiver.batches))
+        self.assertEqual([0, 1, 2], [payload.identifier for _, _, payload in self.receiver.batches[0]])
+        self.assertEqual([self.sender.my_peer.mid] * 3, [peer.mid for peer, _, _ in self.receiver.batches[0]])
+
+    def test_batch_arrival_order(self):
+        """
+        Check if the messages of a batch are handled in the order of arrival, across handlers.
+        """
+        packets = [(self.address, self.create_packet(100, i)) for i in range(3)]
+        packets.insert(1, (self.address, self.create_packet(102, 3)))
+
+        self.receiver.on_packets(packets)
+
+        self.assertEqual([100, 102, 100], self.receiver.calls)
+        self.assertEqual([[0], [1, 2]], [[payload.identifier for _, _, payload in batch]
+                                         for batch in self.receiver.batches])
+        self.assertEqual(1, len(self.receiver.single_messages))
+
+    def test_batch_unsigned(self):
+        """
+        Check if an unsigned batch handler receives the source address of its messages.
+        """
+        packets = [(self.address, self.create_packet(101, i, False)) for i in range(2)]
+
+        self.receiver.on_packets(packets)
+
+        self.assertEqual(1, len(self.receiver.unsigned_batches))
+        self.assertEqual([self.address] * 2, [address for address, _, _ in self.receiver.unsigned_batches[0]])
+
+    def test_batch_drop_invalid(self):
+        """
+        Check if messages with an invalid signature are dropped from a batch.
+        """
+        packet = self.create_packet(100, 1)
+        invalid = packet[:-1] + (b'\x00' if packet[-1:] != b'\x00' else b'\x01')
+
+        self.receiver.on_packets([(self.address, invalid), (self.address, packet)])
+
+        self.assertEqual(1, len(self.receiver.batches))
+        self.assertEqual(1, len(self.receiver.batches[0]))
+
+    def test_batch_single_packet(self):
+        """
+        Check if a batch handler receives a message delivered by on_packet as a batch of one.
+        """
+        self.receiver.on_packet((self.address, self.create_packet(100, 1)))
+
+        self.assertEqual(1, len(self.receiver.batches))
+        self.assertEqual(1, len(self.receiver.batches[0]))
+
+    def test_batch_peer_lookup(self):
+        """
+        Check if verified peers are looked up once per source address in a batch.
+        """
+        lookups = []
+        get_verified_by_address = self.receiver.network.get_verified_by_address
+        self.receiver.network.get_verified_by_address = lambda address: (lookups.append(address)
+                                                                         or get_verified_by_address(address))
+        other = ("1.2.3.4", 5)
+
+        self.receiver.on_packets([(self.address, self.create_packet(100, 1)),
+                                  (other, self.create_packet(100, 2)),
+                                  (self.address, self.create_packet(100, 3))])
+
+        self.assertEqual([self.address, other], lookups)
+
+    def test_batch_foreign_prefix(self):
+        """
+        Check if packets of other overlays are ignored in a batch.
+        """
+        packet = self.create_packet(100, 1)
+
+        self.receiver.on_packets([(self.address, b'\x01' + packet[1:])])
+
+        self.assertEqual([], self.receiver.batches)
+
+    def test_batch_duplicate_signature(self):
+        """
+        Check if the signature of a duplicate packet is only verified once.
+        """
+        packet = self.create_packet(100, 1)
+
+        self.receiver.on_packets([(self.address, packet), (self.address, packet)])
+
+        self.assertEqual(2, len(self.receiver.batches[0]))
+        self.assertEqual(1, self.receiver.signature_cache.signature_misses)
+        self.assertEqual(1, self.receiver.signature_cache.signature_hits)
+
+
+class TestCommunityFragmentation(TestBase):
+
+    def setUp(self):
+        super(TestCommunityFragmentation, self).setUp()
+        self.sender = MockCommunity()
+        self.receiver = MockCommunity()
+        self.received = []
+        self.receiver.add_message_handler(103, lambda source_address, data: self.received.append(data))
+
+    def tearDown(self):
+        self.sender.unload()
+        self.receiver.unload()
+        return super(TestCommunityFragmentation, self).tearDown()
+
+    @inlineCallbacks
+    def test_send_fragmented(self):
+        """
+        Check if a packet which is too large for a datagram is handled like any other packet.
+        """
+        packet = self.sender.get_prefix() + b'\x67' + b'a' * 10000
+
+        delivered = yield self.sender.send_fragmented(self.receiver.endpoint.wan_address, packet)
+
+        self.assertTrue(delivered)
+        self.assertEqual([packet], self.received)
+
+    def test_nested_fragment(self):
+        """
+        Check if a reassembled packet is not processed as a fragment again.
+        """
+        self.receiver.on_reassembled(self.sender.endpoint.wan_address, self.sender.fragmenter.header + b'\x00')
+
+        self.assertEqual({}, self.receiver.fragmenter.incoming)
@@ -0,0 +1,109 @@
+from __future__ import absolute_import
+
+from twisted.trial import unittest
+
+from ..keyvault.crypto import default_eccrypto
+from ..peer import Peer
+from ..peerdiscovery.network import Network
+from ..sharding import (MSG_PEERS, FrameBuffer, ShardCoordinator, frame, get_unshardable_overlays,
+                        get_worker_configuration, prepare_configuration, unframe)
+
+
+class MockChannel(object):
+    """
+    An IPC channel which stores the messages that are sent over it.
+    """
+
+    def __init__(self):
+        self.coordinator = None
+        self.sent = []
+
+    def send(self, message_type, payload):
+        self.sent.append((message_type, payload))
+
+
+class TestSharding(unittest.TestCase):
+
+    def setUp(self):
+        super(TestSharding, self).setUp()
+        self.network = Network()
+        self.channel = MockChannel()
+        self.coordinator = ShardCoordinator(self.network, self.channel)
+        self.peer = Peer(default_eccrypto.generate_key(u"very-low"), ("1.2.3.4", 5))
+
+    def tearDown(self):
+        self.coordinator.shutdown_task_manager()
+        super(TestSharding, self).tearDown()
+
+    def test_frame(self):
+        """
+        Check if a framed message can be unframed.
+        """
+        self.assertEqual((MSG_PEERS, [b"a", b"b"]), unframe(frame(MSG_PEERS, [b"a", b"b"])))
+
+    def test_frame_buffer(self):
+        """
+        Check if the frame buffer only returns completed frames.
+        """
+        frame_buffer = FrameBuffer()
+        message = frame(MSG_PEERS, [])
+
+        self.assertEqual([], frame_buffer.feed(message[:3]))
+        self.assertEqual([message, message], frame_buffer.feed(message[3:] + message + message[:1]))
+        self.assertEqual(message[:1], frame_buffer.buffer)
+
+    def test_worker_configuration(self):
+        """
+        Check if TrustChain overlays get a database per worker.
+        """
+        configuration = {'working_directory': u"state",
+                         'overlays': [{'class': 'TrustChainCommunity', 'initialize': {}},
+                                      {'class': 'DiscoveryCommunity', 'initialize': {}}]}
+
+        get_worker_configuration(configuration, 1)
+
+        self.assertEqual(u"state", configuration['overlays'][0]['initialize']['working_directory'][:5])
+        self.assertTrue(configuration['overlays'][0]['initialize']['working_directory'].endswith(u"worker_1"))
+        self.assertNotIn('working_directory', configuration['overlays'][1]['initialize'])
+
+    def test_unshardable_overlays(self):
+        """
+        Check if overlays which start requests are not shardable.
+        """
+        configuration = {'keys': [],
+                         'overlays': [{'class': 'DiscoveryCommunity', 'initialize': {}},
+                                      {'class': 'DHTDiscoveryCommunity', 'initialize': {}},
+                                      {'class': 'HiddenTunnelCommunity',
+                                       'initialize': {'settings': {'max_circuits': 1}}},
+                                      {'class': 'TunnelCommunity', 'initialize': {'settings': {'max_circuits': 0}}}]}
+
+        self.assertEqual(configuration['overlays'][1:3], get_unshardable_overlays(configuration))
+        self.assertRaises(ValueError, prepare_configuration, configuration, u".")
+
+        configuration['overlays'] = [configuration['overlays'][0], configuration['overlays'][3]]
+        self.assertEqual(u".", prepare_configuration(configuration, u".")['working_directory'])
+
+    def test_sync_peers(self):
+        """
+        Check if verified peers are shared once.
+        """
+        self.network.add_verified_peer(self.peer)
+        self.network.discover_services(self.peer, [b"a" * 20])
+
+        self.coordinator.sync_peers()
+        self.coordinator.sync_peers()
+
+        self.assertEqual([(MSG_PEERS, [(self.peer.public_key.key_to_bin(), self.peer.address, [b"a" * 20])])],
+                         self.channel.sent)
+
+    def test_receive_peers(self):
+        """
+        Check if peers shared by other workers are added, and not shared back.
+        """
+        self.coordinator.on_message(MSG_PEERS, [(self.peer.public_key.key_to_bin(), list(self.peer.address),
+                                                 [b"a" * 20])])
+        self.coordinator.sync_peers()
+
+        self.assertIn(self.peer, self.network.verified_peers)
+        self.assertEqual([self.peer], self.network.get_peers_for_service(b"a" * 20))
+        self.assertEqual([], self.channel.sent)
@@ -0,0 +1,139 @@
+from __future__ import absolute_import
+
+from threading import Event
+from time import sleep
+
+from twisted.internet.defer import inlineCallbacks
+
+from .base import TestBase
+from .mocking.community import MockCommunity
+from ..lazy_community import lazy_wrapper, lazy_wrapper_wd
+from ..messaging.payload import PuncturePayload
+from ..messaging.payload_headers import GlobalTimeDistributionPayload
+from ..verification_pool import VerificationPool
+
+
+class PoolCommunity(MockCommunity):
+
+    def __init__(self):
+        super(PoolCommunity, self).__init__()
+        self.received = []
+        self.add_message_handler(100, self.on_message)
+        self.add_message_handler(101, self.on_message_wd)
+
+    def get_verification_pool(self):
+        return VerificationPool(self.signature_cache.is_valid_signature)
+
+    @lazy_wrapper(GlobalTimeDistributionPayload, PuncturePayload)
+    def on_message(self, peer, dist, payload):
+        self.received.append((peer, payload.identifier))
+
+    @lazy_wrapper_wd(GlobalTimeDistributionPayload, PuncturePayload)
+    def on_message_wd(self, peer, dist, payload, data):
+        self.received.append((peer, payload.identifier, data))
+
+
+class TestVerificationPool(TestBase):
+
+    def setUp(self):
+        super(TestVerificationPool, self).setUp()
+        self.pools = []
+
+    def tearDown(self):
+        for pool in self.pools:
+            pool.stop()
+        return super(TestVerificationPool, self).tearDown()
+
+    def create_pool(self, verify, **kwargs):
+        pool = VerificationPool(verify, **kwargs)
+        self.pools.append(pool)
+        return pool
+
+    @inlineCallbacks
+    def wait_for(self, condition, timeout=2.0):
+        """
+        Wait until the condition is met, or fail after the timeout.
+        """
+        for _ in range(int(timeout / 0.01)):
+            if condition():
+                return
+            yield self.sleep(0.01)
+        self.fail("Condition not met within %.1f seconds" % timeout)
+
+    @inlineCallbacks
+    def test_order_per_key(self):
+        """
+        Check if results are delivered in submission order per order key.
+        """
+        results = []
+        pool = self.create_pool(lambda key, data, signature: sleep(data) or True, workers=2)
+
+        pool.submit(b"peer", None, 0.1, None, lambda valid: results.append(1))
+        pool.submit(b"peer", None, 0.0, None, lambda valid: results.append(2))
+        yield self.wait_for(lambda: len(results) == 2)
+
+        self.assertEqual([1, 2], results)
+
+    @inlineCallbacks
+    def test_invalid(self):
+        """
+        Check if invalid signatures and failing verifications are delivered as invalid.
+        """
+        results = []
+
+        def verify(key, data, signature):
+            if data:
+                raise RuntimeError("Verification failed")
+            return False
+
+        pool = self.create_pool(verify)
+        pool.submit(b"peer", None, True, None, results.append)
+        pool.submit(b"peer", None, False, None, results.append)
+        yield self.wait_for(lambda: len(results) == 2)
+
+        self.assertEqual([False, False], results)
+
+    @inlineCallbacks
+    def test_queue_full(self):
+        """
+        Check if submissions are dropped when the queue is full.
+        """
+        results = []
+        event = Event()
+        pool = self.create_pool(lambda key, data, signature: event.wait(2) and True, workers=1, max_queue_size=1)
+
+        self.assertTrue(pool.submit(b"peer", None, None, None, results.append))
+        self.assertFalse(pool.submit(b"peer", None, None, None, results.append))
+        self.assertEqual(1, pool.get_statistics()["pending"])
+        event.set()
+        yield self.wait_for(lambda: results)
+
+        statistics = pool.get_statistics()
+        self.assertEqual([True], results)
+        self.assertEqual(0, statistics["pending"])
+        self.assertEqual(1, statistics["max_pending"])
+        self.assertEqual(1, statistics["verified"])
+        self.assertEqual(1, statistics["dropped"])
+
+    @inlineCallbacks
+    def test_community(self):
+        """
+        Check if lazy_wrapper handlers are called in order for packets verified on the pool.
+        """
+        sender = MockCommunity()
+        receiver = PoolCommunity()
+        self.addCleanup(sender.unload)
+        self.addCleanup(receiver.unload)
+        packets = [sender.ezr_pack(100 + i % 2, GlobalTimeDistributionPayload(i),
+                                   PuncturePayload(("1.2.3.4", 5), ("2.3.4.5", 6), i)) for i in range(4)]
+        invalid = packets[0][:-1] + (b'\x00' if packets[0][-1:] != b'\x00' else b'\x01')
+
+        for packet in [invalid] + packets:
+            receiver.on_packet((sender.endpoint.wan_address, packet))
+        yield self.wait_for(lambda: len(receiver.received) == 4)
+        yield self.sleep(0.05)
+
+        self.assertEqual([0, 1, 2, 3], [message[1] for message in receiver.received])
+        self.assertEqual([sender.my_peer.mid] * 4, [message[0].mid for message in receiver.received])
+        self.assertEqual(packets[1], receiver.received[1][2])
+        self.assertEqual(5, receiver.verification_pool.get_statistics()["verified"])
@@ -5,9 +5,10 @@ import traceback
 
 from six import PY3
 from six.moves.queue import Queue
-from twisted.internet import reactor, defer
+from twisted.internet import defer
 from twisted.python.failure import Failure
-from twisted.python.threadable import isInIOThread
+
+from .scheduler import get_scheduler, is_in_io_thread
 
 logger = logging.getLogger(__name__)
 maximum_integer = 2147483647
@@ -32,7 +33,7 @@ else:
 
 def blocking_call_on_reactor_thread(func):
     def helper(*args, **kargs):
-        return blockingCallFromThread(reactor, func, *args, **kargs)
+        return blockingCallFromThread(get_scheduler(), func, *args, **kargs)
     helper.__name__ = func.__name__
     return helper
 
@@ -43,7 +44,7 @@ def blockingCallFromThread(reactor, f, *args, **kwargs):
     stacktrace when an exception is raised on the reactor's thread.
     If being called from the reactor thread already, just return the result of execution of the callable.
     """
-    if isInIOThread():
+    if is_in_io_thread(reactor):
         return f(*args, **kwargs)
     else:
         queue = Queue()
@@ -0,0 +1,137 @@
+from __future__ import absolute_import
+
+import logging
+import sys
+from collections import deque
+from functools import partial
+from threading import Lock
+from time import time
+from traceback import format_exception
+
+from twisted.python.threadpool import ThreadPool
+
+from .scheduler import get_scheduler
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_QUEUE_SIZE = 1000
+
+
+class VerificationPool(object):
+    """
+    Verifies signatures on a pool of worker threads.
+
+    The crypto libraries release the GIL while verifying, so multiple signatures can be verified in parallel. This is
+    where verification gets faster: at most the number of workers (and cores) times. Verifying a list of signatures
+    with verify_signatures only saves the signatures which were already verified.
+    The results are delivered on the scheduler thread, in submission order per order key (e.g. per peer).
+    When more than max_queue_size verifications are pending, new submissions are dropped.
+    """
+
+    def __init__(self, verify, workers=DEFAULT_WORKERS, max_queue_size=DEFAULT_MAX_QUEUE_SIZE):
+        """
+        Create a new pool and start its worker threads.
+
+        :param verify: the function to verify with, taking a key, data and signature and returning a bool
+        :param workers: the number of worker threads
+        :param max_queue_size: the maximum number of pending verifications
+        """
+        self.verify = verify
+        self.max_queue_size = max_queue_size
+
+        self.pending = 0
+        self.max_pending = 0
+        self.verified = 0
+        self.dropped = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self._scheduler = get_scheduler()
+        self._lock = Lock()
+        self._ordered = {}
+        self._threadpool = ThreadPool(workers, workers, name=self.__class__.__name__)
+        self._threadpool.start()
+
+    def stop(self):
+        """
+        Stop the worker threads, pending verifications are not delivered.
+        """
+        self._threadpool.stop()
+
+    def submit(self, order_key, key, data, signature, callback):
+        """
+        Schedule the verification of a signature.
+
+        The callback is called on the scheduler thread with the validity of the signature, after the callbacks of all
+        earlier submissions with the same order key.
+
+        :param order_key: the hashable to order the callbacks by
+        :param key: the key to verify the signature with
+        :param data: the signed data
+        :param signature: the signature to verify
+        :param callback: the function to call with the validity of the signature
+        :return: False if the verification was dropped because the queue is full, True otherwise
+        """
+        with self._lock:
+            if self.pending >= self.max_queue_size:
+                self.dropped += 1
+                return False
+            self.pending += 1
+            self.max_pending = max(self.max_pending, self.pending)
+            entry = [callback, None]
+            if order_key not in self._ordered:
+                self._ordered[order_key] = deque()
+            self._ordered[order_key].append(entry)
+        self._threadpool.callInThreadWithCallback(partial(self._on_verified, order_key, entry, time()),
+                                                  self.verify, key, data, signature)
+        return True
+
+    def _on_verified(self, order_key, entry, start_time, success, result):
+        """
+        Called on the worker thread with the result of a verification.
+        """
+        if not success:
+            self._logger.error("Exception occurred while verifying signature!\n%s", result.getTraceback())
+        self._scheduler.callFromThread(self._deliver, order_key, entry, start_time, success and result)
+
+    def _deliver(self, order_key, entry, start_time, valid):
+        """
+        Called on the scheduler thread with the result of a verification: deliver all results in order.
+        """
+        latency = time() - start_time
+        with self._lock:
+            entry[1] = bool(valid)
+            self.pending -= 1
+            self.verified += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+
+            queue = self._ordered[order_key]
+            ready = []
+            while queue and queue[0][1] is not None:
+                ready.append(queue.popleft())
+            if not queue:
+                del self._ordered[order_key]
+
+        for callback, result in ready:
+            try:
+                callback(result)
+            except:
+                self._logger.error("Exception occurred while handling verified packet!\n"
+                                   + ''.join(format_exception(*sys.exc_info())))
+
+    def get_statistics(self):
+        """
+        Get the queue depth, drop counter and verification latency (in seconds) of this pool.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "verified": self.verified,
+                "dropped": self.dropped,
+                "average_latency": self.total_latency / self.verified if self.verified else 0.0,
+                "max_latency": self.max_latency
+            }
@@ -30,7 +30,8 @@ else:
         from ipv8.peer import Peer
         from ipv8.peerdiscovery.community import DiscoveryCommunity
         from ipv8.peerdiscovery.discovery import EdgeWalk, RandomWalk
-        from ipv8.peerdiscovery.network import Network
+        from ipv8.peerdiscovery.graph_snapshot import NetworkSnapshotter, SNAPSHOT_INTERVAL
+        from ipv8.peerdiscovery.network import DEFAULT_MAX_ADDRESSES, Network
         from ipv8.dht.discovery import DHTDiscoveryCommunity
     else:
         from .ipv8.messaging.interfaces.statistics_endpoint import StatisticsEndpoint
@@ -46,7 +47,8 @@ else:
         from .ipv8.peer import Peer
         from .ipv8.peerdiscovery.community import DiscoveryCommunity
         from .ipv8.peerdiscovery.discovery import EdgeWalk, RandomWalk
-        from .ipv8.peerdiscovery.network import Network
+        from .ipv8.peerdiscovery.graph_snapshot import NetworkSnapshotter, SNAPSHOT_INTERVAL
+        from .ipv8.peerdiscovery.network import DEFAULT_MAX_ADDRESSES, Network
         from .ipv8.dht.discovery import DHTDiscoveryCommunity
 
     _COMMUNITIES = {
@@ -78,7 +80,17 @@ else:
                 if any([overlay.get('initialize', {}).get('anonymize') for overlay in configuration['overlays']]):
                     self.endpoint = TunnelEndpoint(self.endpoint)
 
-            self.network = Network()
+            self.network = Network(configuration.get('address_book_size', DEFAULT_MAX_ADDRESSES))
+
+            # Restore the network from the previous run, before we start walking
+            self.network_snapshotter = None
+            snapshot_config = configuration.get('network_snapshot') or {}
+            if snapshot_config.get('file'):
+                self.network_snapshotter = NetworkSnapshotter(self.network, snapshot_config['file'],
+                                                              snapshot_config.get('interval', SNAPSHOT_INTERVAL))
+                # The snapshot is loaded in chunks, while the overlays start walking
+                self.network_snapshotter.load()
+                self.network_snapshotter.start()
 
             # Load/generate keys
             self.keys = {}
@@ -160,6 +172,9 @@ else:
         @inlineCallbacks
         def stop(self, stop_reactor=True):
             self.state_machine_lc.stop()
+            if self.network_snapshotter:
+                self.network_snapshotter.shutdown_task_manager()
+                self.network_snapshotter.write(blocking=True)
             with self.overlay_lock:
                 unload_list = [self.unload_overlay(overlay) for overlay in self.overlays[:]]
                 yield DeferredList(unload_list)
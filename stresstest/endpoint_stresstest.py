@@ -6,7 +6,7 @@ from os import makedirs, path, rename
 from random import randint
 from shutil import rmtree
 from subprocess import call
-from sys import exit as _exit
+from sys import argv, exit as _exit
 from time import sleep, time
 
 from six.moves import xrange
@@ -25,10 +25,16 @@ except ImportError:
 from ipv8_service import IPv8
 from ipv8.configuration import get_default_configuration
 from ipv8.keyvault.crypto import default_eccrypto
+from ipv8.messaging.interfaces.udp.mmsg_endpoint import MMsgUDPEndpoint
 from ipv8.overlay import Overlay
 from ipv8.peer import Peer
 
 
+# Run with ``--mmsg`` to benchmark the recvmmsg/sendmmsg endpoint instead of the regular UDP endpoint.
+USE_MMSG = '--mmsg' in argv
+# Run with ``--batch-delivery`` to coalesce the packets of one reactor iteration into one callback per listener.
+USE_BATCH_DELIVERY = '--batch-delivery' in argv
+
 test_results = {}
 TestResult = namedtuple('TestResult', ['bytes_received', 'bytes_sent', 'packets_received', 'packets_sent'])
 TestResultPair = namedtuple('TestResultPair', ['initiator', 'counterparty'])
@@ -54,7 +60,7 @@ class LoadOverlay(Overlay):
 
         self.window = window
         self.packets = packets
-        self.packet_content = "".join(chr(randint(0,255)) for _ in range(packet_size))
+        self.packet_content = bytes(bytearray(randint(0, 255) for _ in range(packet_size)))
         self.packet_size = packet_size
 
         self.done = Deferred()
@@ -89,6 +95,23 @@ class LoadOverlay(Overlay):
     def get_peers(self):
         return []
 
+    def get_walkable_addresses(self):
+        return []
+
+
+def create_ipv8(configuration):
+    """
+    Create an IPv8 instance, with the endpoint to benchmark.
+    """
+    if USE_MMSG:
+        endpoint = MMsgUDPEndpoint(port=configuration['port'], ip=configuration['address'])
+        endpoint.open()
+        ipv8 = IPv8(configuration, endpoint_override=endpoint)
+    else:
+        ipv8 = IPv8(configuration)
+    ipv8.endpoint.set_batch_delivery(USE_BATCH_DELIVERY)
+    return ipv8
+
 
 def setup_test(window=1, packet_size=1000, packets=10000):
     """
@@ -105,12 +128,12 @@ def setup_test(window=1, packet_size=1000, packets=10000):
 
     master_peer = Peer(default_eccrypto.generate_key(u"low"))
 
-    peer_ipv8 = IPv8(configuration)
+    peer_ipv8 = create_ipv8(configuration)
     peer_ipv8.keys = {'my_peer': Peer(default_eccrypto.generate_key(u"low"))}
     peer_ipv8.overlays = [LoadOverlay(master_peer, peer_ipv8.keys['my_peer'], peer_ipv8.endpoint, peer_ipv8.network,
                                       window, packet_size, packets)]
 
-    counterparty_ipv8 = IPv8(configuration)
+    counterparty_ipv8 = create_ipv8(configuration)
     counterparty_ipv8.keys = {'my_peer': Peer(default_eccrypto.generate_key(u"low"))}
     counterparty_ipv8.overlays = [LoadOverlay(master_peer, counterparty_ipv8.keys['my_peer'],
                                               counterparty_ipv8.endpoint, counterparty_ipv8.network, 0,
@@ -198,6 +221,14 @@ for experiment, pair in test_results.items():
                 for time, count in value:
                     f.write("%f,%d\n" % (time, count))
 
+# Report the throughput and, for the synchronous experiment (window of 1), the round trip time of the initiator.
+for experiment, pair in sorted(test_results.items()):
+    received = pair.initiator.packets_received
+    duration = received[-1][0] - received[0][0]
+    print("%s: %.0f packets/s" % (experiment, received[-1][1] / duration))
+    if experiment == "synchronous":
+        print("%s: %.1f us per round trip" % (experiment, duration / received[-1][1] * 1e6))
+
 # Allow the operating system to properly close the files and use R to plot.
 sleep(2.0)
 rcmd = "Rscript --vanilla %s \"%s\"" % (path.join(path.dirname(__file__), "endpoint_stresstest_plot.R"),
@@ -0,0 +1,110 @@
+"""
+Benchmark of the peer table of the Network, with many verified peers.
+
+Per network size this measures the time it takes to add all peers and the time per lookup of a peer by address and by
+public key, as done for every incoming packet and every introduction, and the time to pick an address to walk to.
+It also measures the time per introduction when the address book is full and an address has to be evicted, and the
+time to write and load a snapshot of the whole graph.
+Only a sample of the peers uses the benchmarked service, like a single overlay on a node running many overlays.
+
+Run from the root directory: ``python stresstest/network_benchmark.py [--sizes 10000 100000]``
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import random
+import sys
+from os import path
+from timeit import default_timer
+
+# Check if we are running from the root directory
+# If not, modify our path so that we can import IPv8
+try:
+    import ipv8
+    del ipv8
+except ImportError:
+    sys.path.append(path.abspath(path.join(path.dirname(__file__), "..")))
+
+from ipv8.keyvault.crypto import default_eccrypto
+from ipv8.peer import Peer
+from ipv8.peerdiscovery.graph_snapshot import GraphSnapshot
+from ipv8.peerdiscovery.network import Network
+
+SERVICE = b"\x01" * 20
+
+
+def generate_peers(count):
+    """
+    Generate peers with unique keys and addresses.
+    """
+    return [Peer(default_eccrypto.generate_key(u"curve25519").pub(),
+                 ("%d.%d.%d.%d" % (10, i >> 16 & 0xFF, i >> 8 & 0xFF, i & 0xFF), 1 + i % 65535))
+            for i in range(count)]
+
+
+def measure(function, arguments):
+    """
+    Call a function once for every argument.
+
+    :return: the average time per call, in microseconds
+    """
+    start = default_timer()
+    for argument in arguments:
+        function(argument)
+    return (default_timer() - start) * 1e6 / len(arguments)
+
+
+def benchmark(peers, lookups):
+    """
+    Fill a network with the peers and measure the lookups.
+
+    :return: the dict of the average time per operation, in microseconds
+    """
+    network = Network()
+    sample = random.sample(peers, min(lookups, len(peers)))
+    unknown = [("192.168.%d.%d" % (i >> 8 & 0xFF, i & 0xFF), 1) for i in range(len(sample))]
+    public_key_bins = [peer.public_key.key_to_bin() for peer in sample]
+
+    results = {"add_verified_peer": measure(network.add_verified_peer, peers)}
+    results["get_verified_by_address"] = measure(network.get_verified_by_address, [peer.address for peer in sample])
+    results["get_verified_by_address (unknown)"] = measure(network.get_verified_by_address, unknown)
+    results["get_verified_by_public_key_bin"] = measure(network.get_verified_by_public_key_bin, public_key_bins)
+    results["add_verified_peer (known)"] = measure(network.add_verified_peer, sample)
+    results["discover_address"] = measure(lambda address: network.discover_address(sample[0], address), unknown)
+    for peer in sample:
+        network.discover_services(peer, [SERVICE])
+    results["get_peers_for_service"] = measure(network.get_peers_for_service, [SERVICE] * 100)
+    results["get_random_walkable_address"] = measure(lambda _: network.get_random_walkable_address(), sample)
+    results["get_random_walkable_address (service)"] = measure(
+        lambda _: network.get_random_walkable_address(SERVICE), sample)
+    snapshot = network.graph_snapshot()
+    results["graph_snapshot (whole graph)"] = measure(lambda _: network.graph_snapshot(), [None])
+    results["load_graph_snapshot (whole graph)"] = measure(
+        lambda _: Network().load_graph_snapshot(GraphSnapshot(snapshot)), [None])
+    results["remove_peer"] = measure(network.remove_peer, sample)
+
+    full = Network(max_addresses=len(peers))
+    for peer in peers:
+        full.discover_address(sample[0], peer.address)
+    results["discover_address (full, evicting)"] = measure(lambda address: full.discover_address(sample[0], address),
+                                                           unknown)
+    return results
+
+
+def run(sizes, lookups):
+    print("Generating %d peers" % max(sizes))
+    peers = generate_peers(max(sizes))
+    for size in sizes:
+        print("\n%d peers" % size)
+        for operation, duration in benchmark(peers[:size], lookups).items():
+            print("%-40s %10.2f us" % (operation, duration))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the peer table of the Network')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000], help='the numbers of peers to test')
+    parser.add_argument('--lookups', type=int, default=1000, help='the number of lookups per operation')
+    args = parser.parse_args()
+    run(args.sizes, args.lookups)
@@ -0,0 +1,106 @@
+"""
+Micro-benchmark of the construction and parse time of the tunnel and DHT payloads.
+
+For the VariablePayload classes (the tunnel payloads) the methods generated by VariablePayloadMeta (new) are
+compared to the generic VariablePayload implementation (old).
+The DHT payloads are handwritten Payload classes and are only measured.
+
+Run from the root directory: ``python stresstest/payload_stresstest.py``
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+from os import path
+from timeit import timeit
+
+# Check if we are running from the root directory
+# If not, modify our path so that we can import IPv8
+try:
+    import ipv8
+    del ipv8
+except ImportError:
+    sys.path.append(path.abspath(path.join(path.dirname(__file__), "..")))
+
+from ipv8.dht.payload import FindRequestPayload, PingRequestPayload, StoreRequestPayload
+from ipv8.messaging.anonymization.payload import CreatedPayload, CreatePayload, DestroyPayload, PingPayload,\
+    PeersResponsePayload
+from ipv8.messaging.lazy_payload import VariablePayload
+from ipv8.messaging.serialization import Serializer
+
+ITERATIONS = 50000
+
+TUNNEL_PAYLOADS = [
+    (CreatePayload, (1234, b"n" * 74, b"k" * 32)),
+    (CreatedPayload, (1234, b"k" * 32, b"a" * 32, b"c" * 300)),
+    (PingPayload, (1234, 42)),
+    (DestroyPayload, (1234, 0)),
+    (PeersResponsePayload, (1234, 42, b"i" * 20, b"p" * 100)),
+]
+
+DHT_PAYLOADS = [
+    (PingRequestPayload, (1234,)),
+    (StoreRequestPayload, (1234, b"t" * 20, b"k" * 20, [b"v" * 100])),
+    (FindRequestPayload, (1234, ("1.2.3.4", 5), b"k" * 20, False)),
+]
+
+
+def construct_generic(payload_class, args):
+    instance = payload_class.__new__(payload_class)
+    VariablePayload.__init__(instance, *args)
+    return instance
+
+
+def parse_generic(serializer, payload_class, data):
+    unpack_list, _ = serializer.unpack_multiple(payload_class.format_list, data, payload_class.optional_format_list)
+    for name in payload_class.names[:len(unpack_list)]:
+        hasattr(payload_class, "fix_unpack_" + name)
+    return construct_generic(payload_class, unpack_list)
+
+
+def parse(serializer, payload_class, data):
+    return serializer.unpack_to_serializables([payload_class], data)[0]
+
+
+def instance_size(instance):
+    """
+    Get the size of an instance, including its __dict__ (if it has one).
+    """
+    size = sys.getsizeof(instance)
+    if '__dict__' in dir(instance) and vars(instance):
+        size += sys.getsizeof(vars(instance))
+    return size
+
+
+def measure(function):
+    return timeit(function, number=ITERATIONS) / ITERATIONS * 1e6
+
+
+def run():
+    serializer = Serializer()
+
+    print("%-26s %10s %10s %10s %10s %8s" % ("Payload", "init old", "init new", "parse old", "parse new", "size"))
+    for payload_class, args in TUNNEL_PAYLOADS:
+        data = serializer.pack_multiple(payload_class(*args).to_pack_list())[0]
+        assert data == serializer.pack_multiple(VariablePayload.to_pack_list(construct_generic(payload_class,
+                                                                                               args)))[0]
+        print("%-26s %7.2f us %7.2f us %7.2f us %7.2f us %6d B"
+              % (payload_class.__name__,
+                 measure(lambda: construct_generic(payload_class, args)),
+                 measure(lambda: payload_class(*args)),
+                 measure(lambda: parse_generic(serializer, payload_class, data)),
+                 measure(lambda: parse(serializer, payload_class, data)),
+                 instance_size(payload_class(*args))))
+    for payload_class, args in DHT_PAYLOADS:
+        data = serializer.pack_multiple(payload_class(*args).to_pack_list())[0]
+        print("%-26s %10s %7.2f us %10s %7.2f us %6d B"
+              % (payload_class.__name__, "-",
+                 measure(lambda: payload_class(*args)),
+                 "-",
+                 measure(lambda: parse(serializer, payload_class, data)),
+                 instance_size(payload_class(*args))))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,49 @@
+"""
+Replay a capture file, recorded with the CaptureEndpoint, into the default overlays and report their processing time.
+
+Usage: python replay_capture.py <capture file> [speed]
+
+The speed is the factor to speed up the original timing with, use ``max`` to replay as fast as possible.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+
+import json
+from os import path
+from sys import argv, exit as _exit
+
+from twisted.internet import reactor
+
+# Check if we are running from the root directory
+# If not, modify our path so that we can import IPv8
+try:
+    import ipv8
+    del ipv8
+except ImportError:
+    import sys
+    sys.path.append(path.abspath(path.join(path.dirname(__file__), "..")))
+
+from ipv8_service import IPv8
+from ipv8.configuration import get_default_configuration
+from ipv8.messaging.interfaces.replay_endpoint import ReplayEndpoint
+
+
+def on_report(report, ipv8):
+    print(json.dumps(report, indent=2, sort_keys=True))
+    ipv8.stop()
+
+
+def start_replay(capture_file, speed):
+    endpoint = ReplayEndpoint(capture_file)
+    endpoint.open()
+    ipv8 = IPv8(get_default_configuration(), endpoint_override=endpoint)
+    endpoint.replay(speed).addCallback(on_report, ipv8)
+
+
+if __name__ == '__main__':
+    if len(argv) < 2:
+        print(__doc__)
+        _exit(1)
+    replay_speed = None if argv[2:] == ['max'] else float((argv[2:] or [1.0])[0])
+    reactor.callWhenRunning(start_replay, argv[1], replay_speed)
+    reactor.run()
@@ -0,0 +1,261 @@
+"""
+Benchmark of the serialization cost of every Payload class in IPv8.
+
+All Payload (and VariablePayload) subclasses under ``ipv8/`` are discovered and instantiated from generated wire data.
+Per class this measures packing, unpacking and the full sign+pack and verify+unpack round-trip of a message (as sent
+by the lazy_wrapper messages of a community), in operations per second and in bytes allocated per operation.
+The results are written to a JSON file, which can be compared to the results of an earlier run.
+
+Run from the root directory: ``python stresstest/serialization_benchmark.py [--output results.json]``
+Compare to an earlier run: ``python stresstest/serialization_benchmark.py --compare old_results.json``
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import argparse
+import importlib
+import json
+import pkgutil
+import platform
+import sys
+from os import path
+from struct import pack
+from time import time
+from timeit import Timer
+
+# Check if we are running from the root directory
+# If not, modify our path so that we can import IPv8
+try:
+    import ipv8
+except ImportError:
+    sys.path.append(path.abspath(path.join(path.dirname(__file__), "..")))
+    import ipv8
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2 can only measure time.
+    tracemalloc = None
+
+from ipv8.keyvault.crypto import default_eccrypto
+from ipv8.messaging.payload import Payload
+from ipv8.messaging.payload_headers import BinMemberAuthenticationPayload, GlobalTimeDistributionPayload
+from ipv8.messaging.serialization import DefaultStruct, Serializable, VarLen, default_serializer
+
+PREFIX = b'\x00' * 22 + b'\x01'
+# Sizes of the content to try for variable length fields, until the Payload accepts the generated data.
+VARLEN_CONTENT_SIZES = [32, 0]
+# The minimum duration of a measurement (in seconds) and the number of measurements to take the fastest of.
+MEASURE_TIME = 0.1
+REPEAT = 3
+
+
+def find_payload_classes():
+    """
+    Import every module under ipv8/ (except the tests) and find all Payload subclasses defined in them.
+
+    :return: the sorted list of (qualified name, class) tuples and the dict of modules which could not be imported
+    """
+    failed_imports = {}
+    for _, module_name, _ in pkgutil.walk_packages(ipv8.__path__, 'ipv8.'):
+        if '.test' in module_name:
+            continue
+        try:
+            importlib.import_module(module_name)
+        except Exception as e:
+            failed_imports[module_name] = "%s: %s" % (type(e).__name__, e)
+
+    found = {}
+    pending = [Payload]
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        if cls.format_list and cls.__module__.startswith('ipv8.') and '.test' not in cls.__module__:
+            found["%s.%s" % (cls.__module__, cls.__name__)] = cls
+    return sorted(found.items()), failed_imports
+
+
+def generate_field(fmt, content_size):
+    """
+    Generate representative wire data for a single format.
+
+    :param fmt: the format from a format_list
+    :param content_size: the size of the content of variable length fields
+    :return: the generated data
+    """
+    if isinstance(fmt, type) and issubclass(fmt, Serializable):
+        data = generate_data(fmt, content_size)
+        return pack('>H', len(data)) + data
+    packer = default_serializer.get_packer_for(fmt)
+    if isinstance(packer, DefaultStruct):
+        return b'\x01' * packer.size
+    if isinstance(packer, VarLen):
+        return pack(packer.length_format, content_size // packer.base) + b'\x01' * content_size
+    if fmt in ('bits', 'raw'):
+        return b'\x01' * (1 if fmt == 'bits' else content_size)
+    raise KeyError(fmt)
+
+
+def generate_data(payload_class, content_size):
+    """
+    Generate representative wire data for a Payload class, including its optional fields.
+    """
+    return b''.join(generate_field(fmt, content_size)
+                    for fmt in payload_class.format_list + payload_class.optional_format_list)
+
+
+def generate_instance(payload_class):
+    """
+    Generate a representative instance of a Payload class.
+
+    :return: the instance and its serialized form
+    :raises Exception: if no instance could be generated
+    """
+    error = None
+    for content_size in VARLEN_CONTENT_SIZES:
+        try:
+            instance = default_serializer.ez_unpack_serializables([payload_class],
+                                                                   generate_data(payload_class, content_size))[0]
+            return instance, default_serializer.pack_multiple(instance.to_pack_list())[0]
+        except Exception as e:
+            error = e
+    raise error
+
+
+def sign_and_pack(key, payload):
+    """
+    Serialize and sign a message, like EZPackOverlay._ez_pack.
+    """
+    format_list = [BinMemberAuthenticationPayload(key.pub().key_to_bin()).to_pack_list(),
+                   GlobalTimeDistributionPayload(1).to_pack_list(),
+                   payload.to_pack_list()]
+    packet, offset = default_serializer.pack_multiple_lists(format_list, PREFIX,
+                                                            default_eccrypto.get_signature_length(key))
+    packet[offset:] = default_eccrypto.create_signature(key, memoryview(packet)[:offset])
+    return bytes(packet)
+
+
+def verify_and_unpack(payload_class, packet):
+    """
+    Verify and unserialize a message, like lazy_wrapper.
+    """
+    auth, remainder = default_serializer.unpack_to_serializables([BinMemberAuthenticationPayload], packet[23:])
+    public_key = default_eccrypto.key_from_public_bin(auth.public_key_bin)
+    signature_length = default_eccrypto.get_signature_length(public_key)
+    signed, signature = packet[:-signature_length], packet[-signature_length:]
+    if not default_eccrypto.is_valid_signature(public_key, signed, signature):
+        raise RuntimeError("Invalid signature")
+    return default_serializer.ez_unpack_serializables([GlobalTimeDistributionPayload, payload_class],
+                                                      remainder[:-signature_length])
+
+
+def measure(function):
+    """
+    Measure the throughput and allocations of an operation.
+
+    :return: the dict with the operations per second and the peak bytes allocated during one operation (if available)
+    """
+    timer = Timer(function)
+    number = 1
+    while True:
+        duration = timer.timeit(number)
+        if duration >= MEASURE_TIME:
+            break
+        number *= 2 if duration < MEASURE_TIME / 4 else 1 + int(MEASURE_TIME / max(duration, 1e-9))
+    ops_per_sec = number / min([duration] + timer.repeat(REPEAT - 1, number))
+
+    bytes_allocated = None
+    if tracemalloc:
+        tracemalloc.start()
+        function()
+        _, bytes_allocated = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"ops_per_sec": ops_per_sec, "bytes_allocated": bytes_allocated}
+
+
+def benchmark(payload_class, key):
+    """
+    Measure all operations for a Payload class.
+
+    :raises Exception: if the Payload class cannot be instantiated or does not survive a round-trip
+    """
+    instance, data = generate_instance(payload_class)
+    packet = sign_and_pack(key, instance)
+    verify_and_unpack(payload_class, packet)
+    return {
+        "size": len(data),
+        "pack": measure(lambda: default_serializer.pack_multiple(instance.to_pack_list())),
+        "unpack": measure(lambda: default_serializer.ez_unpack_serializables([payload_class], data)),
+        "sign_pack": measure(lambda: sign_and_pack(key, instance)),
+        "verify_unpack": measure(lambda: verify_and_unpack(payload_class, packet))
+    }
+
+
+def compare(results, old_results, threshold):
+    """
+    Print the operations which are slower than in an earlier run.
+
+    :return: the number of regressions
+    """
+    regressions = 0
+    for name, measurements in sorted(results["payloads"].items()):
+        old_measurements = old_results["payloads"].get(name, {})
+        for operation in ("pack", "unpack", "sign_pack", "verify_unpack"):
+            if operation not in old_measurements:
+                continue
+            ratio = measurements[operation]["ops_per_sec"] / old_measurements[operation]["ops_per_sec"]
+            if ratio < 1 - threshold:
+                regressions += 1
+                print("REGRESSION %-70s %-14s %6.1f%% slower" % (name, operation, (1 - ratio) * 100))
+    return regressions
+
+
+def run(output, old_results_file=None, threshold=0.1):
+    key = default_eccrypto.generate_key(u"curve25519")
+    payload_classes, failed_imports = find_payload_classes()
+    results = {
+        "python": platform.python_version(),
+        "timestamp": time(),
+        "key": "curve25519",
+        "payloads": {},
+        "skipped": {},
+        "failed_imports": failed_imports
+    }
+
+    print("%-70s %6s %12s %12s %12s %12s" % ("Payload", "size", "pack/s", "unpack/s", "sign+pack/s",
+                                             "verify+unp/s"))
+    for name, payload_class in payload_classes:
+        try:
+            measurements = benchmark(payload_class, key)
+        except Exception as e:
+            results["skipped"][name] = "%s: %s" % (type(e).__name__, e)
+            continue
+        results["payloads"][name] = measurements
+        print("%-70s %6d %12.0f %12.0f %12.0f %12.0f" % (name, measurements["size"],
+                                                         measurements["pack"]["ops_per_sec"],
+                                                         measurements["unpack"]["ops_per_sec"],
+                                                         measurements["sign_pack"]["ops_per_sec"],
+                                                         measurements["verify_unpack"]["ops_per_sec"]))
+    for name, reason in sorted(results["skipped"].items()):
+        print("Skipped %s (%s)" % (name, reason))
+
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print("Wrote results to", output)
+
+    if old_results_file:
+        with open(old_results_file) as f:
+            regressions = compare(results, json.load(f), threshold)
+        print("%d regressions of more than %d%%" % (regressions, threshold * 100))
+        return regressions
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the serialization of all IPv8 payloads')
+    parser.add_argument('--output', default='serialization_benchmark.json', help='the JSON file to write to')
+    parser.add_argument('--compare', help='the JSON file of an earlier run to compare to')
+    parser.add_argument('--threshold', type=float, default=0.1, help='the slowdown to report as a regression')
+    args = parser.parse_args()
+    sys.exit(1 if run(args.output, args.compare, args.threshold) else 0)
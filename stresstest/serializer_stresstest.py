@@ -0,0 +1,108 @@
+"""
+Micro-benchmark of the compiled Serializer plans versus the field-by-field (un)packing.
+
+Run from the root directory: ``python stresstest/serializer_stresstest.py``
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from os import path
+from struct import pack
+from timeit import timeit
+
+# Check if we are running from the root directory
+# If not, modify our path so that we can import IPv8
+try:
+    import ipv8
+    del ipv8
+except ImportError:
+    import sys
+    sys.path.append(path.abspath(path.join(path.dirname(__file__), "..")))
+
+from ipv8.attestation.trustchain.payload import HalfBlockPayload
+from ipv8.messaging.anonymization.payload import CellPayload, CreatedPayload
+from ipv8.messaging.payload import IntroductionRequestPayload
+from ipv8.messaging.serialization import Serializer
+
+ITERATIONS = 20000
+PREFIX = b'\x00' * 22
+
+
+def pack_old(serializer, payload):
+    return serializer._pack_multiple_fields(payload.to_pack_list())[0]
+
+
+def pack_new(serializer, payload):
+    return serializer.pack_multiple(payload.to_pack_list())[0]
+
+
+def unpack_old(serializer, payload_class, data):
+    unpack_list, _ = serializer.unpack_multiple(payload_class.format_list, data, payload_class.optional_format_list)
+    return payload_class.from_unpack_list(*unpack_list)
+
+
+def unpack_new(serializer, payload_class, data):
+    return serializer.unpack_to_serializables([payload_class], data)[0]
+
+
+def pack_cell_old(serializer, payload):
+    message = pack('!B', 2) + serializer._pack_multiple_fields(payload.to_pack_list()[1:])[0]
+    return CellPayload(payload.circuit_id, message, True).to_bin(PREFIX)
+
+
+def pack_cell_new(serializer, payload):
+    message = pack('!B', 2) + serializer.pack_multiple(payload.to_pack_list()[1:])[0]
+    return CellPayload(payload.circuit_id, message, True).to_bin(PREFIX)
+
+
+def unpack_cell_old(serializer, data):
+    return unpack_old(serializer, CreatedPayload, CellPayload.from_bin(data).unwrap(PREFIX)[23:])
+
+
+def unpack_cell_new(serializer, data):
+    return unpack_new(serializer, CreatedPayload, CellPayload.from_bin(data).unwrap(PREFIX)[23:])
+
+
+def measure(name, old, new):
+    """
+    Measure and print the time per operation of the old and new implementation.
+    """
+    old_time = timeit(old, number=ITERATIONS) / ITERATIONS * 1e6
+    new_time = timeit(new, number=ITERATIONS) / ITERATIONS * 1e6
+    print("%-40s old: %7.2f us   new: %7.2f us   speedup: %.2fx" % (name, old_time, new_time, old_time / new_time))
+
+
+def run():
+    serializer = Serializer()
+
+    introduction = IntroductionRequestPayload(("1.2.3.4", 5), ("2.3.4.5", 6), ("3.4.5.6", 7), True, u"public", 42,
+                                              b"")
+    introduction_data = pack_new(serializer, introduction)
+    assert introduction_data == pack_old(serializer, introduction)
+
+    half_block = HalfBlockPayload(b"a" * 74, 1, b"b" * 74, 2, b"c" * 32, b"d" * 64, b"tx", b"\x00" * 200, 123)
+    half_block_data = pack_new(serializer, half_block)
+    assert half_block_data == pack_old(serializer, half_block)
+
+    created = CreatedPayload(1234, b"k" * 32, b"a" * 32, b"c" * 300)
+    cell_data = pack_cell_new(serializer, created)
+    assert cell_data == pack_cell_old(serializer, created)
+
+    measure("IntroductionRequestPayload pack", lambda: pack_old(serializer, introduction),
+            lambda: pack_new(serializer, introduction))
+    measure("IntroductionRequestPayload unpack",
+            lambda: unpack_old(serializer, IntroductionRequestPayload, introduction_data),
+            lambda: unpack_new(serializer, IntroductionRequestPayload, introduction_data))
+    measure("HalfBlockPayload pack", lambda: pack_old(serializer, half_block),
+            lambda: pack_new(serializer, half_block))
+    measure("HalfBlockPayload unpack", lambda: unpack_old(serializer, HalfBlockPayload, half_block_data),
+            lambda: unpack_new(serializer, HalfBlockPayload, half_block_data))
+    measure("CellPayload(CreatedPayload) pack", lambda: pack_cell_old(serializer, created),
+            lambda: pack_cell_new(serializer, created))
+    measure("CellPayload(CreatedPayload) unpack", lambda: unpack_cell_old(serializer, cell_data),
+            lambda: unpack_cell_new(serializer, cell_data))
+
+
+if __name__ == "__main__":
+    run()
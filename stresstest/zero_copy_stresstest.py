@@ -0,0 +1,117 @@
+"""
+Allocation benchmark of the memoryview (zero-copy) Serializer mode versus the default mode.
+
+For a 1.4 KB signed and a 1.4 KB unsigned packet, this measures (using tracemalloc):
+ - the number of packet-sized buffers alive when the message handler is called;
+ - the peak amount of memory traced while unpacking and handling the packet.
+
+Run from the root directory: ``python stresstest/zero_copy_stresstest.py``
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import tracemalloc
+from os import path
+
+# Check if we are running from the root directory
+# If not, modify our path so that we can import IPv8
+try:
+    import ipv8
+    del ipv8
+except ImportError:
+    import sys
+    sys.path.append(path.abspath(path.join(path.dirname(__file__), "..")))
+
+from ipv8.attestation.trustchain.payload import CrawlResponsePayload, HalfBlockPayload
+from ipv8.community import Community
+from ipv8.keyvault.crypto import default_eccrypto
+from ipv8.lazy_community import lazy_wrapper, lazy_wrapper_unsigned
+from ipv8.messaging.interfaces.udp.endpoint import UDPEndpoint
+from ipv8.messaging.payload_headers import BinMemberAuthenticationPayload, GlobalTimeDistributionPayload
+from ipv8.messaging.serialization import Serializer
+from ipv8.peer import Peer
+from ipv8.peerdiscovery.network import Network
+
+
+# Buffers of at least this size are considered to be (partial) copies of the packet
+COPY_THRESHOLD = 512
+PACKETS = 1000
+
+
+class AllocationCommunity(Community):
+    master_peer = Peer(default_eccrypto.generate_key(u"very-low"))
+
+    def __init__(self, my_peer, endpoint, network, memoryview_mode):
+        self.memoryview_mode = memoryview_mode
+        super(AllocationCommunity, self).__init__(my_peer, endpoint, network)
+        self.decode_map[chr(1)] = self.on_half_block
+        self.decode_map[chr(2)] = self.on_crawl_response
+        self.copies = []
+
+    def get_serializer(self):
+        return Serializer(memoryview_mode=self.memoryview_mode)
+
+    def count_copies(self):
+        if not tracemalloc.is_tracing():
+            return
+        snapshot = tracemalloc.take_snapshot()
+        self.copies.append(sum(1 for trace in snapshot.traces if trace.size >= COPY_THRESHOLD))
+
+    @lazy_wrapper(GlobalTimeDistributionPayload, HalfBlockPayload)
+    def on_half_block(self, peer, dist, payload):
+        self.count_copies()
+
+    @lazy_wrapper_unsigned(GlobalTimeDistributionPayload, CrawlResponsePayload)
+    def on_crawl_response(self, source_address, dist, payload):
+        self.count_copies()
+
+
+def create_packets(community):
+    """
+    Create a signed half block packet and an unsigned crawl response packet of about 1.4 KB.
+    """
+    args = [b"a" * 74, 1, b"b" * 74, 2, b"c" * 32, b"d" * 64, b"tx", b"\x00" * 1050, 123]
+    auth = BinMemberAuthenticationPayload(community.my_peer.public_key.key_to_bin()).to_pack_list()
+    dist = GlobalTimeDistributionPayload(1).to_pack_list()
+    signed = community._ez_pack(community._prefix, 1, [auth, dist, HalfBlockPayload(*args).to_pack_list()])
+    unsigned = community._ez_pack(community._prefix, 2, [dist, CrawlResponsePayload(*(args + [1, 1, 1]))
+                                                         .to_pack_list()], False)
+    return signed, unsigned
+
+
+def measure(memoryview_mode):
+    endpoint = UDPEndpoint(0)  # never opened, the packets are handed to the handlers directly
+    community = AllocationCommunity(Peer(default_eccrypto.generate_key(u"curve25519")), endpoint, Network(),
+                                    memoryview_mode)
+    results = []
+    for packet in create_packets(community):
+        handler = community.decode_map[chr(ord(packet[22:23]))]
+        handler(("1.2.3.4", 5), packet)  # Warm up the compiled serialization plans
+        community.copies = []
+        peak = 0
+        tracemalloc.start()
+        for _ in range(PACKETS):
+            tracemalloc.clear_traces()
+            baseline, _ = tracemalloc.get_traced_memory()
+            handler(("1.2.3.4", 5), packet)
+            peak += tracemalloc.get_traced_memory()[1] - baseline
+        tracemalloc.stop()
+        results.append((len(packet), sum(community.copies) / PACKETS, peak / PACKETS))
+    community.unload()
+    return results
+
+
+def run():
+    default_results = measure(False)
+    memoryview_results = measure(True)
+    for name, default, memview in zip(["signed", "unsigned"], default_results, memoryview_results):
+        print("%s packet (%d bytes):" % (name, default[0]))
+        print("    default mode:    %4.1f packet copies alive in handler, %8.1f bytes peak per packet"
+              % default[1:])
+        print("    memoryview mode: %4.1f packet copies alive in handler, %8.1f bytes peak per packet"
+              % memview[1:])
+
+
+if __name__ == "__main__":
+    run()
@@ -21,10 +21,12 @@ from ipv8.configuration import get_default_configuration
 from ipv8_service import IPv8
 from ipv8.REST.rest_manager import RESTManager
 from ipv8.messaging.anonymization.tunnel import PEER_FLAG_EXIT_IPV8
+from ipv8.sharding import ShardSupervisor, get_unshardable_overlays
 
 
 class ExitnodeOptions(usage.Options):
-    optParameters = [["listen_port", None, 8090, "Use an alternative port", int]]
+    optParameters = [["listen_port", None, 8090, "Use an alternative port", int],
+                     ["workers", "w", 1, "Handle packets in this many processes, sharing the port (Linux only)", int]]
     optFlags = [
         ["no-rest-api", "a", "Autonomous: disable the REST api"],
         ["statistics", "s", "Enable IPv8 overlay statistics"],
@@ -43,6 +45,7 @@ class ExitnodeIPv8ServiceMaker(object):
         """
         self.ipv8 = None
         self.restapi = None
+        self.supervisor = None
         self._stopping = False
 
     def start_ipv8(self, options):
@@ -65,6 +68,11 @@ class ExitnodeIPv8ServiceMaker(object):
                 overlay['initialize']['settings']['max_relays_or_exits'] = 1000
                 overlay['initialize']['settings']['peer_flags'] = PEER_FLAG_EXIT_IPV8
 
+        if options['workers'] > 1:
+            # The workers have their own signal handlers, the supervisor waits for them to end.
+            self.start_workers(configuration, options)
+            return
+
         self.ipv8 = IPv8(configuration, enable_statistics=options['statistics'])
 
         def signal_handler(sig, _):
@@ -84,6 +92,31 @@ class ExitnodeIPv8ServiceMaker(object):
             self.restapi = RESTManager(self.ipv8)
             reactor.callLater(0.0, self.restapi.start)
 
+    def start_workers(self, configuration, options):
+        """
+        Start IPv8 in multiple worker processes, which share the listen port.
+        """
+        if options['statistics']:
+            msg("Statistics are not supported with multiple workers")
+        unshardable = get_unshardable_overlays(configuration)
+        if unshardable:
+            msg("Disabling %s, these are not supported with multiple workers"
+                % ", ".join(overlay['class'] for overlay in unshardable))
+            configuration['overlays'] = [overlay for overlay in configuration['overlays'] if overlay not in unshardable]
+        self.supervisor = ShardSupervisor(configuration, options['workers'], rest_api=not options['no-rest-api'])
+
+        def signal_handler(sig, _):
+            msg("Received shut down signal %s" % sig)
+            if not self._stopping:
+                self._stopping = True
+                self.supervisor.stop().addCallback(lambda _: reactor.stop())
+
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+
+        msg("Starting IPv8 with %d workers" % options['workers'])
+        self.supervisor.start()
+
     def makeService(self, options):
         """
         Construct a IPv8 service.